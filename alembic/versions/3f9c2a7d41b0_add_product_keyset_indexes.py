@@ -0,0 +1,26 @@
+"""Add (sort key, id) indexes for keyset pagination of products
+
+Revision ID: 3f9c2a7d41b0
+Revises: dd6123d8d014
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d41b0'
+down_revision = 'dd6123d8d014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_product_name_id', 'products', ['product_name', 'id'], unique=False)
+    op.create_index('ix_products_price_id', 'products', [sa.text('coalesce(price, 0)'), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_price_id', table_name='products')
+    op.drop_index('ix_products_product_name_id', table_name='products')
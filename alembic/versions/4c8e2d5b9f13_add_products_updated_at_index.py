@@ -0,0 +1,23 @@
+"""Add (updated_at, id) index on products
+
+Revision ID: 4c8e2d5b9f13
+Revises: 9d3e6f1a7b25
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e2d5b9f13'
+down_revision = '9d3e6f1a7b25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_updated_at_id', 'products', ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_updated_at_id', table_name='products')
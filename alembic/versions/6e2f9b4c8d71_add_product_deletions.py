@@ -0,0 +1,48 @@
+"""Record deleted product IDs with a trigger
+
+Revision ID: 6e2f9b4c8d71
+Revises: 4c8e2d5b9f13
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2f9b4c8d71'
+down_revision = '4c8e2d5b9f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'product_deletions',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('product_id'),
+    )
+    op.create_index(
+        'ix_product_deletions_deleted_at_product_id', 'product_deletions', ['deleted_at', 'product_id'], unique=False
+    )
+    # A trigger rather than application code, so deletions made in SQL or
+    # through cascades are recorded too
+    op.execute(
+        "CREATE OR REPLACE FUNCTION record_product_deletion() RETURNS trigger "
+        "LANGUAGE plpgsql AS $$ BEGIN "
+        "INSERT INTO product_deletions (product_id, deleted_at) VALUES (OLD.id, now()) "
+        "ON CONFLICT (product_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at; "
+        "RETURN OLD; END $$"
+    )
+    op.execute(
+        "CREATE TRIGGER products_record_deletion AFTER DELETE ON products "
+        "FOR EACH ROW EXECUTE FUNCTION record_product_deletion()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS products_record_deletion ON products")
+    op.execute("DROP FUNCTION IF EXISTS record_product_deletion()")
+    op.drop_index('ix_product_deletions_deleted_at_product_id', table_name='product_deletions')
+    op.drop_table('product_deletions')
@@ -0,0 +1,35 @@
+"""Add unique constraints used as conflict targets by the bulk product import
+
+Revision ID: 7c4e1b9a2f63
+Revises: 3f9c2a7d41b0
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e1b9a2f63'
+down_revision = '3f9c2a7d41b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep the oldest row of any existing duplicates so the constraints can be created
+    op.execute(
+        "DELETE FROM product_variants a USING product_variants b "
+        "WHERE a.product_id = b.product_id AND a.size = b.size AND a.id > b.id"
+    )
+    op.execute(
+        "DELETE FROM product_images a USING product_images b "
+        "WHERE a.product_id = b.product_id AND a.image_url = b.image_url AND a.id > b.id"
+    )
+    op.create_unique_constraint('uq_product_variants_product_id_size', 'product_variants', ['product_id', 'size'])
+    op.create_unique_constraint('uq_product_images_product_id_image_url', 'product_images', ['product_id', 'image_url'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_product_images_product_id_image_url', 'product_images', type_='unique')
+    op.drop_constraint('uq_product_variants_product_id_size', 'product_variants', type_='unique')
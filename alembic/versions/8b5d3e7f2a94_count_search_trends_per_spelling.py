@@ -0,0 +1,39 @@
+"""Count search trend buckets per spelling
+
+Revision ID: 8b5d3e7f2a94
+Revises: 6e2f9b4c8d71
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5d3e7f2a94'
+down_revision = '6e2f9b4c8d71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows hold one spelling per bucket, so they stay unique
+    op.drop_constraint('search_trend_buckets_pkey', 'search_trend_buckets', type_='primary')
+    op.create_primary_key(
+        'search_trend_buckets_pkey', 'search_trend_buckets', ['search_query', 'bucket_start', 'display_query']
+    )
+
+
+def downgrade() -> None:
+    # Fold the spellings of each bucket back into one row, keeping the most searched one
+    op.execute(
+        "CREATE TEMPORARY TABLE search_trend_buckets_folded AS "
+        "SELECT search_query, bucket_start, "
+        "(array_agg(display_query ORDER BY search_count DESC, display_query))[1] AS display_query, "
+        "sum(search_count)::integer AS search_count "
+        "FROM search_trend_buckets GROUP BY search_query, bucket_start"
+    )
+    op.execute("DELETE FROM search_trend_buckets")
+    op.execute("INSERT INTO search_trend_buckets SELECT * FROM search_trend_buckets_folded")
+    op.execute("DROP TABLE search_trend_buckets_folded")
+    op.drop_constraint('search_trend_buckets_pkey', 'search_trend_buckets', type_='primary')
+    op.create_primary_key('search_trend_buckets_pkey', 'search_trend_buckets', ['search_query', 'bucket_start'])
@@ -0,0 +1,33 @@
+"""Add hourly search trend rollup table
+
+Revision ID: 9d3e6f1a7b25
+Revises: e2b7a9c4d318
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3e6f1a7b25'
+down_revision = 'e2b7a9c4d318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'search_trend_buckets',
+        sa.Column('search_query', sa.String(length=255), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('display_query', sa.String(length=255), nullable=False),
+        sa.Column('search_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('search_query', 'bucket_start'),
+    )
+    op.create_index('ix_search_trend_buckets_bucket_start', 'search_trend_buckets', ['bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_search_trend_buckets_bucket_start', table_name='search_trend_buckets')
+    op.drop_table('search_trend_buckets')
@@ -0,0 +1,54 @@
+"""Fold accents in the product search vector with unaccent
+
+Revision ID: c81f4d2e9a57
+Revises: a5d83e0c6b12
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4d2e9a57'
+down_revision = 'a5d83e0c6b12'
+branch_labels = None
+depends_on = None
+
+
+def _replace_search_vector(expression: str) -> None:
+    # A generated column's expression cannot be altered, so the column is recreated
+    op.drop_index('ix_products_search_vector', table_name='products', postgresql_using='gin')
+    op.drop_column('products', 'search_vector')
+    op.add_column('products', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(expression, persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() is only STABLE because its dictionary can change; pinning the
+    # dictionary makes the wrapper safe to declare IMMUTABLE for indexes and
+    # generated columns
+    op.execute(
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+    _replace_search_vector(
+        "setweight(to_tsvector('simple', f_unaccent(coalesce(product_name, ''))), 'A') || "
+        "setweight(to_tsvector('simple', f_unaccent(coalesce(description, ''))), 'B')"
+    )
+
+
+def downgrade() -> None:
+    _replace_search_vector(
+        "setweight(to_tsvector('simple', coalesce(product_name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+    )
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,31 @@
+"""Add trigram index on the accent-folded product name for fuzzy search
+
+Revision ID: e2b7a9c4d318
+Revises: c81f4d2e9a57
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7a9c4d318'
+down_revision = 'c81f4d2e9a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_products_product_name_trgm',
+        'products',
+        [sa.text('f_unaccent(lower(product_name)) gin_trgm_ops')],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_product_name_trgm', table_name='products', postgresql_using='gin')
@@ -0,0 +1,45 @@
+"""
+Rebuild the hourly trending search rollup from search history
+
+Usage:
+    python -m app.cli.backfill_search_trends
+    python -m app.cli.backfill_search_trends --hours 720
+
+Buckets from the start of the range onwards are replaced, so the command can be
+rerun at any time, e.g. after deploying the rollup table or after a gap.
+Defaults to the trending window (TRENDING_WINDOW_HOURS).
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.services.trending import backfill_trend_buckets
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=int, default=settings.TRENDING_WINDOW_HOURS, help="How far back to rebuild")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        async with session_factory() as db:
+            buckets = await backfill_trend_buckets(db, datetime.utcnow() - timedelta(hours=args.hours))
+    finally:
+        await engine.dispose()
+
+    print(f"Wrote {buckets} trend buckets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
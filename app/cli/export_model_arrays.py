@@ -0,0 +1,67 @@
+"""
+Export a recommendation model version to memory-mapped arrays
+
+Usage:
+    python -m app.cli.export_model_arrays
+    python -m app.cli.export_model_arrays --version 20240601120000
+    python -m app.cli.export_model_arrays --output staging/ && python -m app.cli.publish_model staging/ --activate
+
+Reads product_tfidf_matrix.joblib and product_info_df.pkl of a model version
+(the current one by default) and writes the L2-normalized product and term
+matrices (float32 values, int32 indices), the sorted product ID lookup and the
+product names as .npy files (see app.services.model_artifacts). Workers then
+memory-map them instead of each unpickling its own copy, and serving no longer
+imports pandas. Without --output the arrays are added to the version directory
+itself; reload the model (POST /recommendation/model/reload) to switch to them.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from app.services.model_artifacts import export_array_artifacts
+from app.services.recommendation import (
+    VECTORIZER_FILE,
+    load_pickled_artifacts,
+    model_version_dir,
+    read_current_version,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--version", help="Model version (default: the one named by CURRENT)")
+    parser.add_argument("--output", help="Directory to write to (default: the version directory)")
+    args = parser.parse_args()
+
+    directory = model_version_dir(args.version or read_current_version())
+    output = args.output or directory
+    started = time.perf_counter()
+    try:
+        artifacts = load_pickled_artifacts(directory)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    os.makedirs(output, exist_ok=True)
+    if os.path.abspath(output) != os.path.abspath(directory):
+        # A complete version without the pickled artifacts, ready to publish
+        if os.path.isfile(os.path.join(directory, VECTORIZER_FILE)):
+            shutil.copy2(os.path.join(directory, VECTORIZER_FILE), os.path.join(output, VECTORIZER_FILE))
+
+    manifest = export_array_artifacts(
+        output,
+        artifacts["product_tfidf_matrix"],
+        artifacts["product_term_index"],
+        artifacts["sorted_product_ids"],
+        artifacts["sorted_product_rows"],
+        artifacts["product_names"],
+    )
+    print(json.dumps({**manifest, "export_seconds": round(time.perf_counter() - started, 2), "path": output}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Bulk upsert products from a CSV or JSON Lines feed
+
+Usage:
+    python -m app.cli.import_products feed.csv
+    python -m app.cli.import_products feed.jsonl --batch-size 5000
+    cat feed.jsonl | python -m app.cli.import_products - --format jsonl
+
+Products are matched on barcode; see app.services.product_import for the feed
+layout. Prints the import report as JSON and exits with status 1 if any record
+failed.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.services.product_import import IMPORT_FORMATS, detect_format, import_products
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Feed file, or - to read from stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Feed format, detected from the extension by default")
+    parser.add_argument("--batch-size", type=int, default=settings.PRODUCT_IMPORT_BATCH_SIZE)
+    parser.add_argument("--max-errors", type=int, default=settings.PRODUCT_IMPORT_MAX_ERRORS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    feed_format = args.format or detect_format(args.path)
+
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+    try:
+        async with session_factory() as db:
+            report = await import_products(
+                db, stream, feed_format, batch_size=args.batch_size, max_errors=args.max_errors
+            )
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        await engine.dispose()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,70 @@
+"""
+Precompute search suggestions for many users, e.g. for push campaigns or the home feed
+
+Usage:
+    python -m app.cli.precompute_suggestions contexts.jsonl > suggestions.jsonl
+    cat contexts.jsonl | python -m app.cli.precompute_suggestions - --top-n 20
+
+Each input line is a JSON object with optional "recent_searches" and
+"cart_item_ids" lists, like a /recommendation/suggest request; any other keys
+(such as "user_id") are copied to the output line, which adds "suggestions".
+Contexts are scored --batch-size at a time with the same model components and
+sparse batch scoring as /recommendation/suggest/batch.
+"""
+import argparse
+import json
+import sys
+from contextlib import redirect_stdout
+from itertools import islice
+
+from app.services.recommendation import BATCH_CHUNK_SIZE, get_model_components, load_model_components, suggest_for_contexts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSON Lines file of user contexts, or - to read from stdin")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10000, help="Contexts read and scored per batch")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="Contexts per matrix product")
+    args = parser.parse_args()
+
+    # Diagnostics printed by the model code go to stderr so that stdout stays JSON Lines
+    output_stream = sys.stdout
+    with redirect_stdout(sys.stderr):
+        return run(args, output_stream)
+
+
+def run(args: argparse.Namespace, output_stream) -> int:
+    load_model_components()
+    components = get_model_components()
+    if components is None:
+        print("Model components could not be loaded")
+        return 1
+
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    try:
+        lines = (line for line in stream if line.strip())
+        while True:
+            records = [json.loads(line) for line in islice(lines, args.batch_size)]
+            if not records:
+                break
+            contexts = [
+                (record.get("recent_searches") or [], record.get("cart_item_ids") or [])
+                for record in records
+            ]
+            suggestions = suggest_for_contexts(
+                components, contexts, top_n=args.top_n, chunk_size=args.chunk_size
+            )
+            for record, items in zip(records, suggestions):
+                output = {key: value for key, value in record.items() if key not in ("recent_searches", "cart_item_ids")}
+                output["suggestions"] = items
+                print(json.dumps(output, ensure_ascii=False), file=output_stream)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Publish recommendation model artifacts as a new version
+
+Usage:
+    python -m app.cli.publish_model path/to/artifacts
+    python -m app.cli.publish_model path/to/artifacts --version 2024-06-01 --activate
+
+Copies tfidf_vectorizer.joblib, product_tfidf_matrix.joblib,
+product_info_df.pkl into
+saved_model_components/versions/<version>/. The version directory only appears
+once every file is copied. With --activate the version is loaded and validated
+here first, then saved_model_components/CURRENT is pointed at it and running
+workers load it within RECOMMENDATION_MODEL_WATCH_SECONDS.
+"""
+import argparse
+import json
+import sys
+
+from app.services.recommendation import load_model_bundle, publish_model_version, write_current_version
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory with the model artifacts")
+    parser.add_argument("--version", help="Version name (default: current UTC time)")
+    parser.add_argument("--activate", action="store_true", help="Validate the version and make it current")
+    args = parser.parse_args()
+
+    try:
+        version = publish_model_version(args.source, args.version)
+        if args.activate:
+            bundle = load_model_bundle(version)
+            write_current_version(version)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    result = {"version": version, "activated": args.activate}
+    if args.activate:
+        result["products"] = len(bundle["product_names"])
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Train the search suggestion model on the products table
+
+Usage:
+    python -m app.cli.train_recommender
+    python -m app.cli.train_recommender --min-df 2 --max-df 0.5 --activate
+
+Streams products (name, brand, category, description) from PostgreSQL with a
+server-side cursor, fits the TF-IDF vectorizer on text folded with
+preprocess_text, builds the product matrix and ID lookup and publishes them as
+a new version in saved_model_components/versions/ (vectorizer plus the
+memory-mapped array artifacts). Memory is bounded by the vocabulary and the
+matrix itself, not the catalog text, so a 1M-product catalog trains on a
+regular worker host. Seconds per stage are logged as the job runs.
+
+With --activate the new version is loaded and validated here, then
+saved_model_components/CURRENT is pointed at it and running workers pick it up.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.services.recommendation import load_model_bundle, write_current_version
+from app.services.recommender_training import train_recommender
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--version", help="Version name (default: current UTC time)")
+    parser.add_argument("--min-df", type=int, default=1, help="Minimum number of products a term appears in")
+    parser.add_argument("--max-df", type=float, default=1.0, help="Maximum share of products a term appears in")
+    parser.add_argument("--max-features", type=int, help="Keep only the terms found in the most products")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows fetched per round trip")
+    parser.add_argument("--activate", action="store_true", help="Validate the version and make it current")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # One snapshot for both passes over the catalog
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, isolation_level="REPEATABLE READ")
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        async with session_factory() as db:
+            result = await train_recommender(
+                db,
+                version=args.version,
+                min_df=args.min_df,
+                max_df=args.max_df,
+                max_features=args.max_features,
+                batch_size=args.batch_size,
+            )
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    finally:
+        await engine.dispose()
+
+    if args.activate:
+        try:
+            load_model_bundle(result["version"])
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        write_current_version(result["version"])
+    print(json.dumps({**result, "activated": args.activate}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,97 @@
+import json
+import math
+import re
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.core.text import fold_accents
+
+_MISSING = object()
+
+
+def normalize_search_term(term: Optional[str]) -> Optional[str]:
+    """
+    Normalize a free-text search term for use in cache keys
+
+    Case, accents and repeated whitespace do not change full-text search
+    results, so they are folded.
+    """
+    if term is None:
+        return None
+    term = re.sub(r"\s+", " ", fold_accents(term)).strip().lower()
+    return term or None
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """
+    Serialize a filter set into a stable cache key fragment
+
+    None values are dropped so that omitted and explicitly empty filters share a key.
+    """
+    return json.dumps(
+        {key: value for key, value in params.items() if value is not None},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+
+
+class NamespacedTTLCache:
+    """
+    In-process LRU cache with a TTL whose entries are grouped by namespace
+
+    Invalidating a namespace gives it a new generation number, which is part of
+    every key, so stale entries become unreachable immediately and are evicted
+    by the LRU/TTL policy later.
+
+    Generations expire with the same TTL as entries, so namespaces that are
+    invalidated once (e.g. one per user) do not accumulate. Once a generation
+    expired, every entry written before it was set has expired too; numbers
+    are never reused, so no stale entry becomes reachable again.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Not bounded by size: evicting a live generation early would be unsafe
+        self._generations = TTLCache(maxsize=math.inf, ttl=ttl)
+        self._next_generation = 1
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, namespace: str, params: Dict[str, Any]) -> Tuple[Hashable, ...]:
+        return (namespace, self._generations.get(namespace, 0), normalize_params(params))
+
+    def get(self, namespace: str, params: Dict[str, Any], default: Any = None) -> Any:
+        with self._lock:
+            value = self._entries.get(self._key(namespace, params), _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, namespace: str, params: Dict[str, Any], value: Any) -> None:
+        with self._lock:
+            self._entries[self._key(namespace, params)] = value
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._next_generation
+            self._next_generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "generations": len(self._generations),
+                "max_entries": self._entries.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -36,6 +36,102 @@ class Settings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
 
+    # Pagination count cache
+    COUNT_CACHE_TTL_SECONDS: int = 60
+    COUNT_CACHE_MAX_ENTRIES: int = 10000
+    # In "auto" count mode, totals above this planner estimate are returned as estimates
+    COUNT_ESTIMATE_THRESHOLD: int = 100000
+
+    # Product search result cache; results are also keyed by the catalog version in Redis.
+    # Without Redis nothing is cached, as writes through other workers could not invalidate it
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_TTL_SECONDS: int = 30
+    SEARCH_CACHE_MAX_ENTRIES: int = 2000
+
+    # Product detail / barcode cache (in-process LRU in front of Redis)
+    PRODUCT_CACHE_L1_MAX_ENTRIES: int = 5000
+    PRODUCT_CACHE_L1_TTL_SECONDS: int = 60
+    PRODUCT_CACHE_L2_TTL_SECONDS: int = 900
+
+    # In-memory category tree; rebuilt on local writes and refreshed after this many seconds
+    # so that categories created through other workers become visible
+    CATEGORY_TREE_TTL_SECONDS: int = 300
+
+    # Cache-Control max-age for catalog responses (clients revalidate with ETags afterwards).
+    # The ETags come from the catalog version in Redis; without Redis these responses carry no validators
+    CATALOG_HTTP_MAX_AGE_SECONDS: int = 60
+
+    # Bulk product import: records per upsert statement/commit and per-row errors kept in the report
+    PRODUCT_IMPORT_BATCH_SIZE: int = 1000
+    PRODUCT_IMPORT_MAX_ERRORS: int = 1000
+
+    # Fuzzy (trigram) product search: used when full-text search finds fewer than
+    # SEARCH_FUZZY_MIN_RESULTS products; matches need this word similarity to the name
+    SEARCH_FUZZY_MIN_RESULTS: int = 3
+    SEARCH_FUZZY_SIMILARITY_THRESHOLD: float = 0.4
+
+    # In-memory inverted index for search-as-you-type. Local writes update it
+    # incrementally; the periodic rebuild picks up writes from other workers
+    SEARCH_INDEX_ENABLED: bool = True
+    SEARCH_INDEX_REBUILD_SECONDS: int = 900
+
+    # Price facet bucket boundaries (ascending); products are counted in [min, max) ranges
+    FACET_PRICE_BUCKETS: List[int] = [100000, 500000, 1000000, 5000000]
+
+    # Trending searches: hourly rollup buckets merged over the window with an
+    # exponential decay; the top TRENDING_TOP_N are kept in memory per worker
+    TRENDING_WINDOW_HOURS: int = 168
+    TRENDING_HALF_LIFE_HOURS: float = 24
+    TRENDING_TOP_N: int = 100
+    TRENDING_REFRESH_SECONDS: int = 60
+
+    # Search history is written behind the request in batches: every
+    # SEARCH_LOG_FLUSH_SECONDS or once SEARCH_LOG_BATCH_SIZE entries are queued.
+    # Entries beyond SEARCH_LOG_MAX_PENDING are dropped while the database is down
+    SEARCH_LOG_BATCH_SIZE: int = 500
+    SEARCH_LOG_FLUSH_SECONDS: float = 2
+    SEARCH_LOG_MAX_PENDING: int = 10000
+
+    # Prefix autocomplete over product names and popular queries. Queries count
+    # when searched at least AUTOCOMPLETE_MIN_QUERY_COUNT times (with results)
+    # in the last AUTOCOMPLETE_HISTORY_DAYS days
+    AUTOCOMPLETE_ENABLED: bool = True
+    AUTOCOMPLETE_REFRESH_SECONDS: int = 600
+    AUTOCOMPLETE_HISTORY_DAYS: int = 30
+    AUTOCOMPLETE_MIN_QUERY_COUNT: int = 2
+    AUTOCOMPLETE_MAX_QUERIES: int = 50000
+
+    # The recommendation model is loaded in the background at startup. After
+    # that, reload it when saved_model_components/CURRENT names another
+    # version, checked every RECOMMENDATION_MODEL_WATCH_SECONDS
+    RECOMMENDATION_MODEL_WATCH_ENABLED: bool = True
+    RECOMMENDATION_MODEL_WATCH_SECONDS: int = 10
+
+    # Products written since the loaded model version was trained are
+    # vectorized with its vocabulary into small delta segments: at once for
+    # writes made by this worker, and by polling products.updated_at and
+    # product_deletions every RECOMMENDATION_DELTA_POLL_SECONDS for the
+    # others. Rows are read again from
+    # RECOMMENDATION_DELTA_OVERLAP_SECONDS before the newest change seen, for
+    # transactions that commit late. Segments are merged every
+    # RECOMMENDATION_DELTA_MERGE_SECONDS or once there are more than
+    # RECOMMENDATION_DELTA_MAX_SEGMENTS
+    RECOMMENDATION_DELTA_ENABLED: bool = True
+    RECOMMENDATION_DELTA_POLL_SECONDS: int = 5
+    RECOMMENDATION_DELTA_OVERLAP_SECONDS: int = 30
+    RECOMMENDATION_DELTA_MERGE_SECONDS: int = 300
+    RECOMMENDATION_DELTA_MAX_SEGMENTS: int = 16
+    RECOMMENDATION_DELTA_BATCH_SIZE: int = 1000
+
+    # /recommendation/suggest scores in a pool of
+    # RECOMMENDATION_SCORING_THREADS threads instead of on the event loop (0
+    # scores inline). Up to RECOMMENDATION_SCORING_QUEUE_SIZE more requests
+    # may wait for a thread; further ones get 503 at once. Scoring mostly holds
+    # the GIL, so extra threads compete with the event loop rather than add
+    # throughput: scale with more workers instead
+    RECOMMENDATION_SCORING_THREADS: int = 1
+    RECOMMENDATION_SCORING_QUEUE_SIZE: int = 16
+
     # Email Configuration
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = None
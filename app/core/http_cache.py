@@ -0,0 +1,79 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from the values that determine a response body
+    """
+    digest = hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    # Timestamps are stored as naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluate If-None-Match (or, without it, If-Modified-Since) against the current validators
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as required for If-None-Match
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since.replace(tzinfo=None)
+
+    return False
+
+
+def set_cache_headers(
+    response: Response,
+    etag: str,
+    max_age: int,
+    last_modified: Optional[datetime] = None,
+    public: bool = False
+) -> None:
+    """
+    Attach validators and Cache-Control to a response
+
+    Responses are private unless public is set, which only suits routes that
+    also answer anonymous requests: shared caches would otherwise hand a
+    response to clients that never authenticated. Vary: Authorization keeps
+    shared caches from serving a response across different credentials.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"{'public' if public else 'private'}, max-age={max_age}, must-revalidate"
+    response.headers["Vary"] = "Authorization"
+    if last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+
+
+def not_modified_response(
+    etag: str,
+    max_age: int,
+    last_modified: Optional[datetime] = None,
+    public: bool = False
+) -> Response:
+    """
+    Empty 304 response carrying the same validators as a full response would
+    """
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, max_age, last_modified, public)
+    return response
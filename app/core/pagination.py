@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional
+
+# Cursor integers are compared with INTEGER columns; larger values would make
+# the driver fail instead of matching nothing
+_INT_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """
+    Encode keyset pagination state as an opaque, URL-safe cursor
+
+    Args:
+        payload: JSON-serialisable pagination state (sort key, last values)
+
+    Returns:
+        Cursor string to hand back to the client
+    """
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, field_types: Optional[Dict[str, type]] = None) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from the client
+        field_types: Required fields and the Python type of the column each is
+            compared with; a tampered or stale cursor must not reach the query
+
+    Raises:
+        ValueError: If the cursor is malformed or a field is missing or has the wrong type
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid pagination cursor")
+    for field, expected in (field_types or {}).items():
+        value = payload.get(field)
+        # bool is an int subclass but never a valid key
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError("Invalid pagination cursor")
+        if isinstance(value, int) and not _INT_RANGE[0] <= value <= _INT_RANGE[1]:
+            raise ValueError("Invalid pagination cursor")
+        # PostgreSQL rejects NUL characters in text parameters
+        if isinstance(value, str) and "\x00" in value:
+            raise ValueError("Invalid pagination cursor")
+    return payload
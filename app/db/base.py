@@ -4,13 +4,14 @@ from app.db.base_class import Base
 from app.models.user import User
 # from app.models.favorite import Favorite
 from app.models.address import Address
-from app.models.product import Product, ProductVariant, ProductImage
+from app.models.product import Product, ProductVariant, ProductImage, ProductDeletion
 from app.models.category import Category
 from app.models.brand import Brand
 # from app.models.store import Store
 from app.models.cart import Cart, CartItem
 from app.models.order import Order, OrderItem, OrderStatus, PaymentStatus
 from app.models.search_history import SearchHistory
+from app.models.search_trend import SearchTrendBucket
 from app.models.barcode_scan_history import BarcodeScanHistory
 from app.models.product_recommendation import ProductRecommendation, RecommendationType
 # from app.models.product_review import ProductReview
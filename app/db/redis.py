@@ -10,11 +10,20 @@ async def connect_to_redis():
     Connect to Redis
     """
     global redis_client
-    redis_client = redis.Redis(
+    client = redis.Redis(
         host=settings.REDIS_HOST,
         port=settings.REDIS_PORT,
         decode_responses=True
     )
+    try:
+        await client.ping()
+    except Exception as e:
+        # Redis is optional: callers fall back to in-process caching when it is unavailable
+        print(f"WARNING: Could not connect to Redis, continuing without it - {e}")
+        await client.close()
+        redis_client = None
+        return
+    redis_client = client
     print("Connected to Redis")
 
 
@@ -25,6 +34,7 @@ async def close_redis_connection():
     global redis_client
     if redis_client:
         await redis_client.close()
+        redis_client = None
         print("Closed Redis connection")
 
 
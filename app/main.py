@@ -1,14 +1,23 @@
+import asyncio
 import logging
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.openapi.utils import get_openapi
 
 from app.core.config import settings
 # from app.db.mongo import connect_to_mongo, close_mongo_connection
-# from app.db.redis import connect_to_redis, close_redis_connection
+from app.db.redis import connect_to_redis, close_redis_connection
 from app.routers import api_router
+from app.services.autocomplete import run_autocomplete
+from app.services.product_cache import listen_for_invalidations
+from app.services.recommendation import get_model_info, run_model_watcher, shutdown_scoring_executor
+from app.services.recommendation_delta import run_recommendation_delta
+from app.services.search_index import run_search_index
+from app.services.search_log import flush_search_log, run_search_log_writer
+from app.services.trending import run_search_trends
 
 # Setup logging
 logging.basicConfig(
@@ -88,15 +97,32 @@ app.add_middleware(
 async def startup_event():
     logger.info("Starting up application")
     # await connect_to_mongo()
-    # await connect_to_redis()
-    pass
+    await connect_to_redis()
+    app.state.background_tasks = [
+        asyncio.create_task(listen_for_invalidations()),
+        asyncio.create_task(run_search_trends()),
+        asyncio.create_task(run_search_log_writer()),
+    ]
+    if settings.SEARCH_INDEX_ENABLED:
+        app.state.background_tasks.append(asyncio.create_task(run_search_index()))
+    if settings.AUTOCOMPLETE_ENABLED:
+        app.state.background_tasks.append(asyncio.create_task(run_autocomplete()))
+    # Loads the recommendation model without blocking startup
+    app.state.background_tasks.append(asyncio.create_task(run_model_watcher()))
+    if settings.RECOMMENDATION_DELTA_ENABLED:
+        app.state.background_tasks.append(asyncio.create_task(run_recommendation_delta()))
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down application")
+    for task in app.state.background_tasks:
+        task.cancel()
+    await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
+    shutdown_scoring_executor()
+    # Write search history still queued by the background writer
+    await flush_search_log()
     # await close_mongo_connection()
-    # await close_redis_connection()
-    pass
+    await close_redis_connection()
 
 
 # Include API router
@@ -109,6 +135,21 @@ async def health_check():
     return {"status": "ok", "message": "Service is healthy"}
 
 
+# Readiness endpoint: unlike /health, reports whether models loaded in the
+# background are available yet
+@app.get("/ready", tags=["Health Check"])
+async def readiness_check():
+    recommendation = get_model_info()
+    if recommendation["ready"]:
+        status = "ready"
+    else:
+        status = "failed" if recommendation["last_error"] and not recommendation["reloading"] else "loading"
+    return JSONResponse(
+        status_code=200 if recommendation["ready"] else 503,
+        content={"status": status, "recommendation": recommendation},
+    )
+
+
 # Test endpoint for debugging auth headers
 @app.get("/test-auth-headers", tags=["Debug"])
 async def test_auth_headers(request: Request):
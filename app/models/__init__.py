@@ -9,12 +9,14 @@ from app.models.payment import PaymentSettings, Payment
 from app.models.product import (
     Product,
     ProductVariant,
-    ProductImage
+    ProductImage,
+    ProductDeletion
 )
 from app.models.product_recommendation import ProductRecommendation, RecommendationType
 from app.models.promotion import DiscountType, Promotion
 from app.models.purchase_history import PurchaseHistory
 from app.models.search_history import SearchHistory
+from app.models.search_trend import SearchTrendBucket
 from app.models.shipment import Shipment, ShipmentTrackingEvent, ShipmentStatus
 from app.models.transaction import TransactionHistory, TransactionStatus, TransactionType
 from app.models.user import User
@@ -1,8 +1,12 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text, Boolean
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy import (
+    Column, Computed, DateTime, Float, ForeignKey, Integer, String, Text, Boolean, Index, UniqueConstraint,
+    literal_column, text
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, backref, deferred
 from sqlalchemy.sql import func
 
 from app.db.base_class import Base
@@ -22,6 +26,16 @@ class Product(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     quantity = Column(Integer, default=0)
+    # Maintained by PostgreSQL from the accent-folded name (weight A) and
+    # description (weight B). Deferred so that regular product loads do not transfer it.
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', f_unaccent(coalesce(product_name, ''))), 'A') || "
+            "setweight(to_tsvector('simple', f_unaccent(coalesce(description, ''))), 'B')",
+            persisted=True,
+        ),
+    ))
 
     # Relationships
     images = relationship("ProductImage", back_populates="product", cascade="all, delete-orphan")
@@ -34,6 +48,21 @@ class Product(Base):
     category = relationship("Category", back_populates="products")
     brand = relationship("Brand", back_populates="products")
 
+    __table_args__ = (
+        # Keyset pagination indexes: (sort key, id) for each supported sort key
+        Index("ix_products_product_name_id", product_name, id),
+        Index("ix_products_price_id", func.coalesce(price, literal_column("0")), id),
+        # Changed products, read in (updated_at, id) order by the recommendation delta
+        Index("ix_products_updated_at_id", updated_at, id),
+        Index("ix_products_search_vector", search_vector, postgresql_using="gin"),
+        # Trigram index for typo-tolerant search on the accent-folded name
+        Index(
+            "ix_products_product_name_trgm",
+            text("f_unaccent(lower(product_name)) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+    )
+
 
 class ProductVariant(Base):
     """Product variants for different sizes with stock quantity"""
@@ -49,6 +78,11 @@ class ProductVariant(Base):
     # Relationships
     product = relationship("Product", back_populates="variants")
 
+    __table_args__ = (
+        # Conflict target for bulk upserts
+        UniqueConstraint("product_id", "size", name="uq_product_variants_product_id_size"),
+    )
+
 class ProductImage(Base):
     """Product images"""
     __tablename__ = "product_images"
@@ -59,4 +93,23 @@ class ProductImage(Base):
     upload_date = Column(DateTime, default=func.now())
 
     # Relationships
-    product = relationship("Product", back_populates="images")
\ No newline at end of file
+    product = relationship("Product", back_populates="images")
+
+    __table_args__ = (
+        # Conflict target for bulk upserts
+        UniqueConstraint("product_id", "image_url", name="uq_product_images_product_id_image_url"),
+    )
+
+
+class ProductDeletion(Base):
+    """Deleted product IDs, written by a trigger on products"""
+    __tablename__ = "product_deletions"
+
+    # Lets derived state (the recommendation delta) find deletions since a
+    # point in time without comparing every product ID
+    product_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_product_deletions_deleted_at_product_id", "deleted_at", "product_id"),
+    )
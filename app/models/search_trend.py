@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+from app.db.base_class import Base
+
+
+class SearchTrendBucket(Base):
+    """Hourly search counts per normalized query and spelling, rolled up from search history"""
+    __tablename__ = "search_trend_buckets"
+
+    # Query folded with normalize_search_term; display_query is one spelling of
+    # it as searched, so the most searched spelling can be displayed
+    search_query = Column(String(255), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    display_query = Column(String(255), primary_key=True)
+    search_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_search_trend_buckets_bucket_start", "bucket_start"),
+    )
@@ -69,7 +69,7 @@ async def process_barcode_string(
         if result.barcode:
             scan_in = BarcodeScanCreate(
                 barcode=result.barcode,
-                product_id=result.product.id if result.product_found else None,
+                product_id=result.product["id"] if result.product_found else None,
             )
             await create_barcode_scan_history(db=db, user_id=current_user.id, scan_in=scan_in)
 
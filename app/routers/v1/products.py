@@ -1,12 +1,17 @@
-from typing import Any, List, Optional
+import io
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Body
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status, Body
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.deps import get_current_active_user, get_current_superuser, get_current_active_user_optional
+from app.core.config import settings
+from app.core.http_cache import is_not_modified, make_etag, not_modified_response, set_cache_headers
 from app.db.session import get_db
 from app.models.user import User
-from app.models.product import ProductImage
+from app.models.product import Product as ProductModel, ProductVariant as ProductVariantModel
 from app.schemas.base import PaginationParams
 from app.schemas.product import (
     Product,
@@ -29,6 +34,9 @@ from app.services.product import (
     get_product_variant,
     get_product,
     get_products,
+    get_products_by_cursor,
+    get_product_fingerprint,
+    product_payload_fingerprint,
     get_product_by_barcode,
     get_product_by_category,
     update_product_variant,
@@ -41,12 +49,52 @@ from app.services.product import (
     get_parent_categories,
     get_all_categories,
 )
+from app.services.autocomplete import MAX_SUGGESTIONS, autocomplete
+from app.services.catalog_version import get_catalog_version
+from app.services.count_cache import count_cache
+from app.services.product_import import IMPORT_FORMATS, detect_format, import_products
+from app.services.product_cache import (
+    get_cache_stats, get_cached_product, get_cached_product_by_barcode, peek_cached_product
+)
+from app.services.search import get_trending_searches, search_products
+from app.services.search_cache import get_search_cache_stats
+from app.services.search_log import get_search_log_stats
+from app.services.search_index import (
+    SEARCH_MODES, get_search_index_stats, instant_search, rebuild_search_index
+)
 from app.services.product import get_all_brands as service_get_all_brands
 from app.services.product import get_all_categories as service_get_all_categories
 from app.core.security import create_access_token
 
 router = APIRouter()
 
+
+async def _catalog_etag(request: Request) -> Optional[str]:
+    """
+    ETag for catalog responses that only change when the catalog version changes
+
+    None when the version is not shared through Redis; the response then goes
+    out without validators, since a write on another worker would not change
+    the ETag.
+    """
+    version = await get_catalog_version()
+    if version is None:
+        return None
+    return make_etag(request.url.path, sorted(request.query_params.multi_items()), version)
+
+
+def _product_validators(product_id: int, fingerprint: Dict[str, Any]) -> Tuple[str, Optional[datetime]]:
+    """
+    ETag and Last-Modified for a product detail response
+    """
+    encoded = jsonable_encoder(fingerprint)
+    timestamps = [
+        datetime.fromisoformat(encoded[key])
+        for key in ("updated_at", "variants_updated_at", "images_updated_at")
+        if encoded[key] is not None
+    ]
+    return make_etag("product", product_id, encoded), max(timestamps) if timestamps else None
+
 # async def create_brand_endpoint(
 #     brand_in: BrandCreate,
 #     db: AsyncSession = Depends(get_db),
@@ -70,27 +118,49 @@ router = APIRouter()
 
 @router.get("/brands")
 async def get_all_brands(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Get all brands
+
+    Supports conditional requests with If-None-Match.
     """
+    etag = await _catalog_etag(request)
+    if etag is not None and is_not_modified(request, etag):
+        return not_modified_response(etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS)
+
+    if etag is not None:
+        set_cache_headers(response, etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS)
     return await service_get_all_brands(db=db)
 
 @router.get("/categories")
 async def get_all_categories(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Get all categories
+
+    Supports conditional requests with If-None-Match.
     """
+    etag = await _catalog_etag(request)
+    if etag is not None and is_not_modified(request, etag):
+        return not_modified_response(etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS)
+
+    if etag is not None:
+        set_cache_headers(response, etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS)
     return await service_get_all_categories(db=db)
 
 
 @router.get("/", response_model=Any)
 async def read_products(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 10,
@@ -99,6 +169,13 @@ async def read_products(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     search: Optional[str] = Query(None, min_length=1),
+    sort_by: str = Query("id", pattern="^(id|name|price)$"),
+    sort_order: str = Query("asc", pattern="^(asc|desc)$"),
+    pagination_mode: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    count_mode: str = Query("exact", pattern="^(exact|estimated|auto)$"),
+    include_facets: bool = False,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
@@ -111,10 +188,85 @@ async def read_products(
     - **min_price**: Filter by minimum price
     - **max_price**: Filter by maximum price
     - **search**: Search term to filter products
+    - **sort_by**: Sort key (id, name or price)
+    - **sort_order**: Sort direction (asc or desc)
+    - **pagination_mode**: "offset" (default) or "cursor"; a cursor implies cursor mode
+    - **cursor**: next_cursor value from the previous page in cursor mode
+    - **include_total**: Whether to count all matching products (defaults to true in offset mode, false in cursor mode)
+    - **count_mode**: "exact", "estimated" (planner statistics) or "auto" (estimate only for very large results);
+      total_exact in the response tells which one was returned
+    - **include_facets**: Also return product counts per brand, category and price bucket
+
+    Supports conditional requests with If-None-Match.
+    """
+    etag = await _catalog_etag(request)
+    if etag is not None and is_not_modified(request, etag):
+        return not_modified_response(etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS)
+    if etag is not None:
+        set_cache_headers(response, etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS)
+
+    try:
+        if pagination_mode == "cursor" or cursor:
+            return await get_products_by_cursor(
+                db,
+                cursor=cursor,
+                limit=limit,
+                category_id=category_id,
+                brand_id=brand_id,
+                min_price=min_price,
+                max_price=max_price,
+                search=search,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                include_total=bool(include_total),
+                count_mode=count_mode,
+                include_facets=include_facets,
+            )
+
+        return await get_products(
+            db, skip, limit, category_id, brand_id, min_price, max_price, search,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            include_total=include_total is not False,
+            count_mode=count_mode,
+            include_facets=include_facets,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/import", response_model=None, dependencies=[Depends(get_current_superuser)])
+async def import_product_feed(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(
+        None, pattern=f"^({'|'.join(IMPORT_FORMATS)})$",
+        description="Feed format; detected from the file extension when omitted"
+    ),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+) -> Any:
     """
-    return await get_products(
-        db, skip, limit, category_id, brand_id, min_price, max_price, search
-    )
+    Bulk upsert products from a CSV or JSON Lines feed (admin only)
+
+    Products are matched on barcode; variants and images listed in the feed are
+    upserted as well. CSV feeds use the columns barcode, product_name,
+    description, price, category_id, brand_id, variants ("S:10|M:5") and
+    images ("url1|url2", first one primary).
+
+    Returns totals and the per-row errors of records that were skipped.
+    """
+    try:
+        feed_format = format or detect_format(file.filename)
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        return await import_products(db=db, stream=stream, format=feed_format, batch_size=batch_size)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 
 @router.post(
@@ -141,22 +293,137 @@ async def create_new_product(
         )
 
 
+@router.get("/cache/stats", response_model=None)
+async def read_cache_stats(
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    """
+    Hit/miss counters of the catalog caches (admin only)
+    """
+    return {
+        "product_cache": get_cache_stats(),
+        "count_cache": count_cache.stats(),
+        "search_cache": get_search_cache_stats(),
+        "search_log": get_search_log_stats(),
+    }
+
+
+@router.get("/search/trending", response_model=None)
+async def read_trending_searches(
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_active_user_optional),
+) -> Any:
+    """
+    Most searched queries of the last week, with recent searches weighted higher
+    """
+    return {"items": await get_trending_searches(db, limit=limit)}
+
+
+@router.get("/search/instant", response_model=None)
+async def instant_search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    mode: str = Query("and", pattern=f"^({'|'.join(SEARCH_MODES)})$"),
+    current_user: Optional[User] = Depends(get_current_active_user_optional),
+) -> Any:
+    """
+    Search-as-you-type over the in-memory product index
+
+    The last word of q is matched as a prefix. Results are ranked with BM25
+    over name, brand, category and description without querying the database.
+    """
+    items = instant_search(q, limit=limit, mode=mode)
+    if items is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search index is not ready",
+        )
+    return {"items": items, "query": q, "mode": mode}
+
+
+@router.get("/autocomplete", response_model=None)
+async def autocomplete_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(MAX_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS),
+    current_user: Optional[User] = Depends(get_current_active_user_optional),
+) -> Any:
+    """
+    Complete a typed prefix with popular searches and product names
+
+    Case and accents are ignored. Suggestions are ranked by how often they were
+    searched or picked from search results recently.
+    """
+    items = autocomplete(q, limit=limit)
+    if items is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Autocomplete index is not ready",
+        )
+    return {"items": items, "query": q}
+
+
+@router.get("/search-index/stats", response_model=None)
+async def read_search_index_stats(
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    """
+    Size, memory use and build time of the in-memory search index (admin only)
+    """
+    return get_search_index_stats()
+
+
+@router.post("/search-index/rebuild", response_model=None)
+async def rebuild_product_search_index(
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    """
+    Rebuild the in-memory search index of this worker from the database (admin only)
+    """
+    return await rebuild_search_index()
+
+
 @router.get("/{product_id}", response_model=None)
 async def read_product(
     product_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_active_user_optional),
 ) -> Any:
     """
     Get product by ID
+
+    Supports conditional requests with If-None-Match / If-Modified-Since. The
+    validators come from the cached payload or from a single fingerprint query,
+    so a 304 never hydrates the product.
     """
-    product = await get_product(db=db, product_id=product_id)
-    if not product:
+    product = await peek_cached_product(product_id)
+    fingerprint = (
+        product_payload_fingerprint(product) if product is not None
+        else await get_product_fingerprint(db=db, product_id=product_id)
+    )
+    if fingerprint is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found",
         )
 
+    etag, last_modified = _product_validators(product_id, fingerprint)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS, last_modified, public=True)
+
+    if product is None:
+        product = await get_cached_product(db=db, product_id=product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found",
+            )
+        # The product may have changed between the fingerprint query and the load
+        etag, last_modified = _product_validators(product_id, product_payload_fingerprint(product))
+
+    set_cache_headers(response, etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS, last_modified, public=True)
     return product
 
 
@@ -173,7 +440,7 @@ async def update_product_details(
     """
     Update a product (admin only)
     """
-    product = await get_product(db=db, product_id=product_id)
+    product = await db.get(ProductModel, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -207,7 +474,7 @@ async def delete_product_item(
     """
     Delete a product (admin only)
     """
-    product = await get_product(db=db, product_id=product_id)
+    product = await db.get(ProductModel, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -274,7 +541,7 @@ async def update_product_variant_endpoint(
     """
     Update a product variant (admin only)
     """
-    variant = await get_product_variant(db=db, variant_id=variant_id)
+    variant = await db.get(ProductVariantModel, variant_id)
     if not variant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -313,7 +580,7 @@ async def delete_product_variant_endpoint(
     """
     Delete a product variant (admin only)
     """
-    variant = await get_product_variant(db=db, variant_id=variant_id)
+    variant = await db.get(ProductVariantModel, variant_id)
     if not variant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -376,23 +643,12 @@ async def add_product_image_endpoint(
         )
 
     try:
-        # Create a new ProductImage instance
-        db_image = ProductImage(
+        return await add_product_image(
+            db=db,
             product_id=product_id,
             image_url=image_data.image_url,
             is_primary=image_data.is_primary
         )
-        db.add(db_image)
-        await db.commit()
-        await db.refresh(db_image)
-
-        return {
-            "id": db_image.id,
-            "product_id": db_image.product_id,
-            "image_url": db_image.image_url,
-            "is_primary": db_image.is_primary,
-            "upload_date": db_image.upload_date
-        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -409,7 +665,7 @@ async def read_product_by_barcode(
     """
     Get product by barcode
     """
-    product = await get_product_by_barcode(db=db, barcode=barcode)
+    product = await get_cached_product_by_barcode(db=db, barcode=barcode)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -454,6 +710,8 @@ async def search_product(
     sort_by: Optional[str] = "name",
     sort_order: Optional[str] = "asc",
     include_details: bool = False,
+    count_mode: str = Query("exact", pattern="^(exact|estimated|auto)$"),
+    include_facets: bool = False,
     pagination: PaginationParams = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_active_user_optional),
@@ -461,6 +719,10 @@ async def search_product(
     """
     Search for products with detailed filtering
     """
+    # Combine sort field and direction into the sort keys understood by the search service
+    if sort_by in ("name", "price"):
+        sort_by = f"{sort_by}_{'desc' if sort_order == 'desc' else 'asc'}"
+
     return await search_products(
         db=db,
         query=query,
@@ -469,8 +731,9 @@ async def search_product(
         min_price=min_price,
         max_price=max_price,
         sort_by=sort_by,
-        sort_order=sort_order,
         include_details=include_details,
+        count_mode=count_mode,
+        include_facets=include_facets,
         limit=pagination.limit,
         offset=(pagination.page - 1) * pagination.limit,
     )
@@ -479,6 +742,8 @@ async def search_product(
 @router.get("/category/{category_id}", response_model=None)
 async def get_products_by_category(
     category_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_active_user_optional),
 ) -> Any:
@@ -488,9 +753,15 @@ async def get_products_by_category(
     This endpoint returns:
     - Products from the specified category
     - Products from the parent category (if exists)
-    - Products from all subcategories
-    - Information about the category, its parent, and its subcategories
+    - Products from all subcategories, at any depth
+    - Information about the category, its parent, and its direct subcategories
+
+    Supports conditional requests with If-None-Match.
     """
+    etag = await _catalog_etag(request)
+    if etag is not None and is_not_modified(request, etag):
+        return not_modified_response(etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS, public=True)
+
     result = await get_product_by_category(db=db, category_id=category_id)
 
     if not result["category"]:
@@ -499,6 +770,8 @@ async def get_products_by_category(
             detail="Category not found",
         )
 
+    if etag is not None:
+        set_cache_headers(response, etag, settings.CATALOG_HTTP_MAX_AGE_SECONDS, public=True)
     return result
 
 
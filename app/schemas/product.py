@@ -71,6 +71,30 @@ class ProductUpdate(BaseModel):
     brand_id: Optional[int] = None
 
 
+class ProductImportVariant(BaseModel):
+    """Variant row inside a bulk import record"""
+    size: str
+    stock: int = 0
+
+
+class ProductImportImage(BaseModel):
+    """Image row inside a bulk import record"""
+    image_url: str
+    is_primary: bool = False
+
+
+class ProductImportRow(BaseModel):
+    """Schema for one record of a bulk product feed, matched on barcode"""
+    barcode: str
+    product_name: str
+    description: Optional[str] = None
+    price: Optional[float] = None
+    category_id: Optional[int] = None
+    brand_id: Optional[int] = None
+    variants: List[ProductImportVariant] = []
+    images: List[ProductImportImage] = []
+
+
 class Product(ProductBase):
     """Schema for product returned from API"""
     id: int
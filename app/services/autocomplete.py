@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import re
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.core.text import fold_accents
+from app.db.session import async_session
+from app.models.product import Product
+from app.models.search_history import SearchHistory
+
+logger = logging.getLogger(__name__)
+
+# Largest number of completions returned for one prefix
+MAX_SUGGESTIONS = 10
+
+# Prefixes matching more entries than this get their top completions
+# precomputed; smaller ranges are ranked on the fly
+PRECOMPUTE_THRESHOLD = 256
+
+# Sorts after every character, so bisecting for prefix + _HIGHEST finds the
+# end of the prefix range
+_HIGHEST = "\U0010ffff"
+
+
+def normalize_prefix(text: str) -> str:
+    """
+    Fold a typed prefix the way completion keys are folded
+
+    Trailing whitespace is kept since it marks the end of a word.
+    """
+    return re.sub(r"\s+", " ", fold_accents(text).lower()).lstrip()
+
+
+class CompletionIndex:
+    """
+    Prefix completions ranked by popularity
+
+    Completion keys are kept in one sorted list, so the entries starting with a
+    prefix form a contiguous range found by binary search. Each entry also has
+    a global rank (by weight, then key); the best completions of a range are
+    its smallest ranks. Ranges larger than PRECOMPUTE_THRESHOLD, which are the
+    trie nodes near the root, store their top MAX_SUGGESTIONS up front, so no
+    lookup ranks more than PRECOMPUTE_THRESHOLD entries.
+    """
+
+    def __init__(self, entries: Dict[str, Tuple[str, float, Optional[int]]]):
+        """
+        Args:
+            entries: Folded key -> (display text, weight, product ID or None)
+        """
+        self._keys = sorted(entries)
+        self._texts = [entries[key][0] for key in self._keys]
+        self._product_ids = [entries[key][2] for key in self._keys]
+        weights = np.array([entries[key][1] for key in self._keys], dtype=np.float64)
+        self._weights = weights
+
+        # Keys are already sorted, so a stable sort on weight breaks ties by key
+        order = np.argsort(-weights, kind="stable")
+        self._ranks = np.empty(len(order), dtype=np.int32)
+        self._ranks[order] = np.arange(len(order), dtype=np.int32)
+
+        self._top: Dict[str, Tuple[int, ...]] = {}
+        self._precompute("", 0, len(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _range(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        hi = len(self._keys) if hi is None else hi
+        start = bisect_left(self._keys, prefix, lo, hi)
+        return start, bisect_left(self._keys, prefix + _HIGHEST, start, hi)
+
+    def _rank_range(self, lo: int, hi: int, limit: int) -> Tuple[int, ...]:
+        ranks = self._ranks[lo:hi]
+        if len(ranks) > limit:
+            best = np.argpartition(ranks, limit - 1)[:limit]
+        else:
+            best = np.arange(len(ranks))
+        best = best[np.argsort(ranks[best])]
+        return tuple(int(lo + position) for position in best)
+
+    def _precompute(self, prefix: str, lo: int, hi: int) -> None:
+        # Depth-first walk over the trie nodes whose range is too large to rank
+        # per request
+        stack = [(prefix, lo, hi)]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            if hi - lo <= PRECOMPUTE_THRESHOLD:
+                continue
+            self._top[prefix] = self._rank_range(lo, hi, MAX_SUGGESTIONS)
+
+            depth = len(prefix)
+            position = lo
+            while position < hi:
+                key = self._keys[position]
+                if len(key) <= depth:
+                    # The prefix itself is a complete key
+                    position += 1
+                    continue
+                child = key[:depth + 1]
+                _, child_hi = self._range(child, position, hi)
+                stack.append((child, position, child_hi))
+                position = child_hi
+
+    def complete(self, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[Dict[str, Any]]:
+        """
+        Most popular completions of a typed prefix
+        """
+        prefix = normalize_prefix(prefix)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if prefix in self._top:
+            positions = self._top[prefix][:limit]
+        else:
+            lo, hi = self._range(prefix)
+            positions = self._rank_range(lo, hi, limit) if hi > lo else ()
+
+        return [
+            {
+                "text": self._texts[position],
+                "product_id": self._product_ids[position],
+                "score": float(self._weights[position]),
+            }
+            for position in positions
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._keys), "precomputed_prefixes": len(self._top)}
+
+
+_index: Optional[CompletionIndex] = None
+_built_at: Optional[float] = None
+_rebuild_lock = asyncio.Lock()
+
+
+async def _load_entries() -> Dict[str, Tuple[str, float, Optional[int]]]:
+    """
+    Collect completion candidates: popular recent queries and product names
+
+    A query's weight is how often it was searched in the last
+    AUTOCOMPLETE_HISTORY_DAYS days; a product's weight is how often it was
+    picked from search results in that window. A product name that equals a
+    popular query keeps the product ID and adds both weights.
+    """
+    cutoff_date = datetime.utcnow() - timedelta(days=settings.AUTOCOMPLETE_HISTORY_DAYS)
+    entries: Dict[str, Tuple[str, float, Optional[int]]] = {}
+
+    async with async_session() as db:
+        queries = await db.execute(
+            select(SearchHistory.search_query, func.count(SearchHistory.id).label("count"))
+            .where(SearchHistory.search_date >= cutoff_date, SearchHistory.result_count > 0)
+            .group_by(SearchHistory.search_query)
+            .having(func.count(SearchHistory.id) >= settings.AUTOCOMPLETE_MIN_QUERY_COUNT)
+            .order_by(func.count(SearchHistory.id).desc())
+            .limit(settings.AUTOCOMPLETE_MAX_QUERIES)
+        )
+        for search_query, count in queries:
+            key = normalize_prefix(search_query).strip()
+            if not key:
+                continue
+            # Spellings differing only in case or accents share a key; the most
+            # searched one is displayed
+            text, weight, _ = entries.get(key, (search_query.strip(), 0, None))
+            entries[key] = (text, weight + count, None)
+
+        selections = dict((await db.execute(
+            select(SearchHistory.selected_product_id, func.count(SearchHistory.id))
+            .where(SearchHistory.search_date >= cutoff_date, SearchHistory.selected_product_id.is_not(None))
+            .group_by(SearchHistory.selected_product_id)
+        )).all())
+
+        result = await db.stream(select(Product.id, Product.product_name).execution_options(yield_per=5000))
+        async for rows in result.partitions():
+            for product_id, product_name in rows:
+                key = normalize_prefix(product_name or "").strip()
+                if not key:
+                    continue
+                weight = selections.get(product_id, 0)
+                if key in entries:
+                    text, query_weight, existing_id = entries[key]
+                    entries[key] = (product_name, query_weight + weight, existing_id or product_id)
+                else:
+                    entries[key] = (product_name, weight, product_id)
+
+    return entries
+
+
+async def rebuild_autocomplete() -> Dict[str, Any]:
+    """
+    Rebuild the completion index from the database and swap it in
+
+    The index is built in a worker thread; lookups keep using the previous
+    index until the new one is ready.
+    """
+    global _index, _built_at
+
+    async with _rebuild_lock:
+        started = time.perf_counter()
+        entries = await _load_entries()
+        _index = await asyncio.to_thread(CompletionIndex, entries)
+        _built_at = time.time()
+
+    logger.info(f"Autocomplete index built: {len(_index)} entries in {time.perf_counter() - started:.2f}s")
+    return get_autocomplete_stats()
+
+
+def autocomplete(prefix: str, limit: int = MAX_SUGGESTIONS) -> Optional[List[Dict[str, Any]]]:
+    """
+    Top completions for a prefix, or None while the index has not been built yet
+    """
+    index = _index
+    if index is None:
+        return None
+    return index.complete(prefix, limit=limit)
+
+
+def get_autocomplete_stats() -> Dict[str, Any]:
+    """
+    Size and freshness of the completion index
+    """
+    if _index is None:
+        return {"ready": False, "rebuilding": _rebuild_lock.locked()}
+    return {
+        "ready": True,
+        "rebuilding": _rebuild_lock.locked(),
+        "built_at": _built_at,
+        **_index.stats(),
+    }
+
+
+async def run_autocomplete() -> None:
+    """
+    Build the completion index at startup and refresh it every
+    AUTOCOMPLETE_REFRESH_SECONDS, so new products and trending queries show up
+
+    Runs until cancelled; started from the application startup hook.
+    """
+    while True:
+        try:
+            await rebuild_autocomplete()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Autocomplete index build failed: {e}")
+        await asyncio.sleep(settings.AUTOCOMPLETE_REFRESH_SECONDS)
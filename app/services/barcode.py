@@ -12,6 +12,7 @@ from app.models.barcode_scan_history import BarcodeScanHistory
 from app.models.product import Product
 from app.schemas.barcode import BarcodeScan, BarcodeScanCreate, BarcodeScanHistoryPaginated, BarcodeScanResult
 from app.schemas.base import PaginationParams
+from app.services.product_cache import get_cached_product_by_barcode
 
 
 # Replace the image scanning function with one that accepts a string barcode
@@ -23,8 +24,7 @@ async def process_barcode(
     Process barcode string (pre-processed by mobile device)
     """
     # Look up product by barcode
-    result = await db.execute(select(Product).where(Product.barcode == barcode))
-    product = result.scalars().first()
+    product = await get_cached_product_by_barcode(db, barcode)
 
     # Create response
     return BarcodeScanResult(
@@ -0,0 +1,59 @@
+import logging
+from typing import Optional
+
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+# Set when a write could not bump the shared version. Until a later call
+# manages to, this worker reports no version: the other workers cannot know
+# about the write, but at least this one stops handing out stale validators.
+_bump_pending = False
+
+
+async def _flush_pending_bump(redis) -> None:
+    global _bump_pending
+    if _bump_pending:
+        await redis.incr(CATALOG_VERSION_KEY)
+        _bump_pending = False
+
+
+async def get_catalog_version() -> Optional[int]:
+    """
+    Current catalog version, shared across workers through Redis
+
+    Returns:
+        The version counter, or None when it cannot be shared (Redis missing
+        or failing, or a bump still pending). Callers must then not build
+        validators or cache keys from it: a per-worker counter would not
+        change on writes made through other workers.
+    """
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        await _flush_pending_bump(redis)
+        return int(await redis.get(CATALOG_VERSION_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"Could not read catalog version from Redis: {e}")
+        return None
+
+
+async def bump_catalog_version() -> None:
+    """
+    Mark the catalog as changed after a write
+
+    If Redis cannot be reached the bump is retried on the next call of either
+    function in this worker.
+    """
+    global _bump_pending
+    _bump_pending = True
+
+    redis = get_redis()
+    if redis is not None:
+        try:
+            await _flush_pending_bump(redis)
+        except Exception as e:
+            logger.warning(f"Could not bump catalog version in Redis: {e}")
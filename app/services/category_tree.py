@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.category import Category
+
+
+class CategoryTree:
+    """
+    Immutable in-memory view of the category hierarchy
+
+    Descendant and ancestor sets are precomputed for every node, so lookups at
+    any depth are dictionary reads.
+    """
+
+    def __init__(self, categories: Sequence[Category]):
+        self.nodes: Dict[int, Dict[str, Any]] = {
+            category.id: {
+                "id": category.id,
+                "name": category.category_name,
+                "description": category.description,
+                "image_url": category.image_url,
+                "parent_id": category.parent_id,
+            }
+            for category in categories
+        }
+
+        self.children: Dict[Optional[int], List[int]] = defaultdict(list)
+        for node in sorted(self.nodes.values(), key=lambda n: (n["name"] or "", n["id"])):
+            # Categories whose parent is missing are treated as roots
+            parent_id = node["parent_id"] if node["parent_id"] in self.nodes else None
+            self.children[parent_id].append(node["id"])
+
+        self._descendants: Dict[int, FrozenSet[int]] = {}
+        self._ancestors: Dict[int, List[int]] = {}
+        for category_id in self.nodes:
+            self._descendants[category_id] = self._collect_descendants(category_id)
+            self._ancestors[category_id] = self._collect_ancestors(category_id)
+
+    def _collect_descendants(self, category_id: int) -> FrozenSet[int]:
+        seen = {category_id}
+        stack = [category_id]
+        while stack:
+            for child_id in self.children.get(stack.pop(), []):
+                if child_id not in seen:
+                    seen.add(child_id)
+                    stack.append(child_id)
+        return frozenset(seen)
+
+    def _collect_ancestors(self, category_id: int) -> List[int]:
+        ancestors = []
+        seen = {category_id}
+        parent_id = self.nodes[category_id]["parent_id"]
+        # Stop on cycles or dangling parent references
+        while parent_id in self.nodes and parent_id not in seen:
+            ancestors.append(parent_id)
+            seen.add(parent_id)
+            parent_id = self.nodes[parent_id]["parent_id"]
+        return ancestors
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id in self.nodes
+
+    def get(self, category_id: int) -> Optional[Dict[str, Any]]:
+        return self.nodes.get(category_id)
+
+    def descendants(self, category_id: int, include_self: bool = True) -> FrozenSet[int]:
+        """
+        IDs of every category below category_id, at any depth
+        """
+        descendants = self._descendants.get(category_id, frozenset())
+        return descendants if include_self else descendants - {category_id}
+
+    def ancestors(self, category_id: int) -> List[int]:
+        """
+        IDs of the parents of category_id, nearest first
+        """
+        return list(self._ancestors.get(category_id, []))
+
+    def subcategories(self, category_id: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Direct children of a category (or the roots for None), sorted by name
+        """
+        return [self.nodes[child_id] for child_id in self.children.get(category_id, [])]
+
+    def roots(self) -> List[Dict[str, Any]]:
+        return self.subcategories(None)
+
+
+_tree: Optional[CategoryTree] = None
+_loaded_at = 0.0
+_lock = asyncio.Lock()
+
+
+async def rebuild_category_tree(db: AsyncSession) -> CategoryTree:
+    """
+    Load all categories with one query and replace the cached tree
+    """
+    global _tree, _loaded_at
+
+    result = await db.execute(select(Category))
+    tree = CategoryTree(result.scalars().all())
+    _tree, _loaded_at = tree, time.monotonic()
+    return tree
+
+
+async def get_category_tree(db: AsyncSession) -> CategoryTree:
+    """
+    Return the cached category tree, loading it on first use or after it expires
+    """
+    if _tree is not None and time.monotonic() - _loaded_at < settings.CATEGORY_TREE_TTL_SECONDS:
+        return _tree
+
+    async with _lock:
+        if _tree is not None and time.monotonic() - _loaded_at < settings.CATEGORY_TREE_TTL_SECONDS:
+            return _tree
+        return await rebuild_category_tree(db)
@@ -0,0 +1,127 @@
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from app.core.cache import NamespacedTTLCache
+from app.core.config import settings
+from app.services.catalog_version import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS_NAMESPACE = "products"
+
+COUNT_MODES = ("exact", "estimated", "auto")
+
+count_cache = NamespacedTTLCache(
+    maxsize=settings.COUNT_CACHE_MAX_ENTRIES,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+
+def orders_namespace(user_id: int) -> str:
+    """
+    Count cache namespace for one user's orders
+    """
+    return f"orders:{user_id}"
+
+
+def invalidate_counts(namespace: str) -> None:
+    """
+    Drop every cached count in a namespace after a write
+    """
+    count_cache.invalidate(namespace)
+
+
+async def cache_filters(namespace: str, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Filters to cache a count of the namespace under, or None to not cache it
+
+    invalidate_counts only reaches this worker, so product counts also carry
+    the shared catalog version, like search results: a product write on any
+    worker makes them unreachable. Without a shared version (see
+    get_catalog_version) they are not cached at all.
+    """
+    if namespace != PRODUCTS_NAMESPACE:
+        return filters
+    version = await get_catalog_version()
+    if version is None:
+        return None
+    return {**filters, "catalog_version": version}
+
+
+async def estimate_query_rows(db: AsyncSession, query) -> Optional[int]:
+    """
+    Estimate the number of rows a query returns from PostgreSQL planner statistics
+
+    The EXPLAIN runs in a savepoint, so a failure leaves the session's
+    transaction usable for the exact count the caller falls back to.
+
+    Returns:
+        Planner row estimate, or None if no estimate is available
+    """
+    dialect = db.bind.dialect
+    if dialect.name != "postgresql":
+        return None
+
+    try:
+        # Raises for bind values that cannot be rendered as literals
+        compiled = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        async with db.begin_nested():
+            result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+            plan = result.scalar()
+    except Exception as e:
+        logger.warning(f"Could not estimate row count: {e}")
+        return None
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_query_rows(
+    db: AsyncSession,
+    query,
+    namespace: str,
+    filters: Dict[str, Any],
+    mode: str = "exact"
+) -> Tuple[int, bool]:
+    """
+    Count the rows matched by a query, using the count cache
+
+    Args:
+        db: Database session
+        query: Select statement whose rows should be counted
+        namespace: Cache namespace invalidated by writes to the underlying table
+        filters: Normalized filter set identifying the query within the namespace
+        mode: "exact" counts rows, "estimated" uses planner statistics and
+            "auto" uses the estimate only when it exceeds COUNT_ESTIMATE_THRESHOLD
+
+    Returns:
+        Tuple of (total, is_exact)
+
+    Raises:
+        ValueError: If the count mode is not supported
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"Unsupported count mode '{mode}'")
+
+    filters = await cache_filters(namespace, filters)
+    cached = count_cache.get(namespace, filters) if filters is not None else None
+    if cached is not None:
+        return cached, True
+
+    if mode != "exact":
+        estimate = await estimate_query_rows(db, query)
+        if estimate is not None and (mode == "estimated" or estimate >= settings.COUNT_ESTIMATE_THRESHOLD):
+            return estimate, False
+
+    count_query = select(func.count()).select_from(query.subquery())
+    total = await db.scalar(count_query) or 0
+    if filters is not None:
+        count_cache.set(namespace, filters, total)
+    return total, True
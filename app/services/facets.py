@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import case, literal_column, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.brand import Brand
+from app.models.category import Category
+from app.models.product import Product
+from app.services.count_cache import cache_filters, count_cache
+
+
+def price_buckets(boundaries: Sequence[int]) -> List[Dict[str, Optional[int]]]:
+    """
+    Turn ascending bucket boundaries into [min, max) ranges, open at both ends
+    """
+    edges = [None, *boundaries, None]
+    return [{"min": low, "max": high} for low, high in zip(edges, edges[1:])]
+
+
+def _price_bucket(boundaries: Sequence[int]):
+    # Index into price_buckets(boundaries); NULL for products without a price.
+    # Numbers are rendered inline: the expression appears in both the select
+    # list and GROUP BY, which only match when they are textually identical.
+    def number(value):
+        return literal_column(str(int(value)))
+
+    return case(
+        (Product.price.is_(None), None),
+        *[(Product.price < number(boundary), number(index)) for index, boundary in enumerate(boundaries)],
+        else_=number(len(boundaries)),
+    )
+
+
+async def compute_facets(
+    db: AsyncSession,
+    query,
+    namespace: str,
+    filters: Dict[str, Any]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Count the products matched by a query per brand, per category and per price bucket
+
+    All three facets come from one GROUPING SETS query over the query's
+    conditions. Counts follow the current filters, so a selected brand shows
+    only its own count. Results are cached with the other counts of the
+    namespace and are dropped by the same invalidation.
+
+    Args:
+        db: Database session
+        query: Filtered select(Product) statement
+        namespace: Count cache namespace invalidated by product writes
+        filters: Normalized filter set identifying the query within the namespace
+
+    Returns:
+        Dictionary with "brands", "categories" and "price" facet lists
+    """
+    boundaries = sorted(settings.FACET_PRICE_BUCKETS)
+    key_filters = await cache_filters(namespace, {**filters, "facets": True, "price_buckets": boundaries})
+    cached = count_cache.get(namespace, key_filters) if key_filters is not None else None
+    if cached is not None:
+        return cached
+
+    bucket = _price_bucket(boundaries)
+    facet_query = (
+        select(
+            Product.brand_id,
+            Brand.brand_name,
+            Product.category_id,
+            Category.category_name,
+            bucket.label("price_bucket"),
+            func.grouping(Product.brand_id).label("by_brand"),
+            func.grouping(Product.category_id).label("by_category"),
+            func.count().label("count"),
+        )
+        .select_from(Product)
+        .outerjoin(Brand, Brand.id == Product.brand_id)
+        .outerjoin(Category, Category.id == Product.category_id)
+        .group_by(func.grouping_sets(
+            tuple_(Product.brand_id, Brand.brand_name),
+            tuple_(Product.category_id, Category.category_name),
+            bucket,
+        ))
+    )
+    if query.whereclause is not None:
+        facet_query = facet_query.where(query.whereclause)
+
+    ranges = price_buckets(boundaries)
+    price_counts = [0] * len(ranges)
+    brands, categories = [], []
+    for row in (await db.execute(facet_query)).all():
+        if row.by_brand == 0:
+            brands.append({"id": row.brand_id, "name": row.brand_name, "count": row.count})
+        elif row.by_category == 0:
+            categories.append({"id": row.category_id, "name": row.category_name, "count": row.count})
+        elif row.price_bucket is not None:
+            price_counts[row.price_bucket] = row.count
+
+    facets = {
+        "brands": sorted(brands, key=lambda item: (-item["count"], item["name"] or "")),
+        "categories": sorted(categories, key=lambda item: (-item["count"], item["name"] or "")),
+        "price": [{**price_range, "count": count} for price_range, count in zip(ranges, price_counts)],
+    }
+    if key_filters is not None:
+        count_cache.set(namespace, key_filters, facets)
+    return facets
@@ -0,0 +1,80 @@
+from sqlalchemy import literal_column, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from app.models.product import Product
+
+# Text search configuration used by products.search_vector. 'simple' only
+# lowercases, which suits Vietnamese where stemming does not apply; accents
+# are folded separately with unaccent.
+SEARCH_CONFIG = "simple"
+
+
+def unaccent(value):
+    """
+    Accent-folding SQL expression, using the immutable f_unaccent wrapper so
+    that it can be used in generated columns and indexes
+    """
+    return func.f_unaccent(value)
+
+
+def product_tsquery(term: str):
+    """
+    Parse a user search term with web search syntax ("quoted phrases", or, -exclude)
+
+    The term is folded like search_vector, so "dien thoai" finds "điện thoại".
+    """
+    # Rendered inline so that queries can also be compiled with literal binds for EXPLAIN
+    return func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), unaccent(term))
+
+
+def product_search_condition(term: str):
+    """
+    Condition matching products whose name or description contains the term,
+    or whose barcode equals it
+
+    Served by the GIN index on products.search_vector.
+    """
+    return or_(
+        Product.search_vector.op("@@")(product_tsquery(term)),
+        Product.barcode == term,
+    )
+
+
+def product_search_rank(term: str):
+    """
+    Relevance of a product for the term; name matches outweigh description matches
+    """
+    return func.ts_rank(Product.search_vector, product_tsquery(term))
+
+
+def _folded(value):
+    # Must match the expression of the ix_products_product_name_trgm index
+    return unaccent(func.lower(value))
+
+
+def product_fuzzy_condition(term: str):
+    """
+    Condition matching products whose name contains a word similar to the term
+
+    Uses the pg_trgm word similarity operator, served by the trigram GIN index,
+    so misspelled terms ("dien thaoi") still find products. The threshold is set
+    per transaction with set_fuzzy_threshold.
+    """
+    return _folded(term).op("<%")(_folded(Product.product_name))
+
+
+def product_fuzzy_rank(term: str):
+    """
+    Trigram word similarity between the term and the product name
+    """
+    return func.word_similarity(_folded(term), _folded(Product.product_name))
+
+
+async def set_fuzzy_threshold(db: AsyncSession, threshold: float) -> None:
+    """
+    Set the word similarity threshold used by product_fuzzy_condition for the
+    current transaction
+    """
+    await db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True)))
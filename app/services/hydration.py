@@ -0,0 +1,158 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.product import Product, ProductVariant, ProductImage
+
+
+def serialize_variant(variant: ProductVariant) -> Dict[str, Any]:
+    """
+    Convert a ProductVariant row to the dictionary returned by the API
+    """
+    return {
+        "id": variant.id,
+        "product_id": variant.product_id,
+        "size": variant.size,
+        "stock": variant.stock,
+        "created_at": variant.created_at,
+        "updated_at": variant.updated_at
+    }
+
+
+def serialize_image(image: ProductImage) -> Dict[str, Any]:
+    """
+    Convert a ProductImage row to the dictionary returned by the API
+    """
+    return {
+        "id": image.id,
+        "product_id": image.product_id,
+        "image_url": image.image_url,
+        "is_primary": image.is_primary,
+        "upload_date": image.upload_date
+    }
+
+
+def serialize_product(
+    product: Product,
+    variants: Optional[List[Dict[str, Any]]] = None,
+    images: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Convert a Product row to the dictionary returned by the API
+    """
+    return {
+        "id": product.id,
+        "barcode": product.barcode,
+        "product_name": product.product_name,
+        "description": product.description,
+        "price": product.price,
+        "category_id": product.category_id,
+        "brand_id": product.brand_id,
+        "created_at": product.created_at,
+        "updated_at": product.updated_at,
+        "quantity": product.quantity,
+        "variants": variants if variants is not None else [],
+        "images": images if images is not None else []
+    }
+
+
+async def load_variants(db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Load the variants of many products with a single query
+
+    Args:
+        db: Database session
+        product_ids: IDs of the products to load variants for
+
+    Returns:
+        Mapping of product ID to its serialized variants
+    """
+    ids = list(set(product_ids))
+    grouped: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    if not ids:
+        return grouped
+
+    result = await db.execute(
+        select(ProductVariant)
+        .where(ProductVariant.product_id.in_(ids))
+        .order_by(ProductVariant.product_id, ProductVariant.id)
+    )
+    for variant in result.scalars().all():
+        grouped[variant.product_id].append(serialize_variant(variant))
+    return grouped
+
+
+async def load_images(db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Load the images of many products with a single query
+
+    Args:
+        db: Database session
+        product_ids: IDs of the products to load images for
+
+    Returns:
+        Mapping of product ID to its serialized images
+    """
+    ids = list(set(product_ids))
+    grouped: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    if not ids:
+        return grouped
+
+    result = await db.execute(
+        select(ProductImage)
+        .where(ProductImage.product_id.in_(ids))
+        .order_by(ProductImage.product_id, ProductImage.id)
+    )
+    for image in result.scalars().all():
+        grouped[image.product_id].append(serialize_image(image))
+    return grouped
+
+
+async def hydrate_products(
+    db: AsyncSession,
+    products: Sequence[Product],
+    include_variants: bool = True,
+    include_images: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Build API dictionaries for a page of products
+
+    Variants and images for the whole page are fetched with one query each,
+    so the number of round trips does not depend on the page size.
+
+    Args:
+        db: Database session
+        products: Product rows, in the order they should be returned
+        include_variants: Whether to load variants
+        include_images: Whether to load images
+
+    Returns:
+        List of product dictionaries in the same order as ``products``
+    """
+    if not products:
+        return []
+
+    product_ids = [product.id for product in products]
+    variants = await load_variants(db, product_ids) if include_variants else {}
+    images = await load_images(db, product_ids) if include_images else {}
+
+    return [
+        serialize_product(
+            product,
+            variants=variants.get(product.id, []),
+            images=images.get(product.id, [])
+        )
+        for product in products
+    ]
+
+
+async def hydrate_product(db: AsyncSession, product: Optional[Product]) -> Optional[Dict[str, Any]]:
+    """
+    Build the API dictionary for a single product, or None if it is missing
+    """
+    if product is None:
+        return None
+    hydrated = await hydrate_products(db, [product])
+    return hydrated[0]
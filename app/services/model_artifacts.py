@@ -0,0 +1,165 @@
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+# Array artifacts of a model version, written by app.cli.export_model_arrays.
+# Every array is a plain .npy file so that workers can memory-map it: the pages
+# live once in the OS page cache and are shared by all workers on the host.
+MANIFEST_FILE = 'arrays.json'
+ARRAY_FORMAT = 1
+MATRIX_PARTS = ('data', 'indices', 'indptr')
+PRODUCT_MATRIX_PREFIX = 'product_matrix'
+TERM_MATRIX_PREFIX = 'term_matrix'
+SORTED_IDS_FILE = 'product_ids_sorted.npy'
+SORTED_ROWS_FILE = 'product_rows_sorted.npy'
+NAMES_FILE = 'product_names.utf8.npy'
+NAME_OFFSETS_FILE = 'product_names.offsets.npy'
+
+
+class PackedStrings:
+    """
+    Read-only array of strings stored as one UTF-8 buffer and offsets
+
+    Unlike an object array it can be memory-mapped; strings are decoded only
+    when indexed. Indexing with an array of rows returns an object array, so it
+    can stand in for the product_name column of product_info_df.
+    """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer  # uint8
+        self.offsets = offsets  # string i is buffer[offsets[i]:offsets[i + 1]]
+
+    @classmethod
+    def pack(cls, strings: Sequence[str]) -> "PackedStrings":
+        encoded = [str(value).encode('utf-8') for value in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _decode(self, row: int) -> str:
+        return self.buffer[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def __getitem__(self, rows):
+        if np.isscalar(rows):
+            return self._decode(int(rows))
+        return np.array([self._decode(int(row)) for row in np.asarray(rows).ravel()], dtype=object)
+
+
+def _index_dtype(*sizes: int):
+    # int32 indices whenever they fit, like scipy itself; a mismatch makes
+    # scipy convert (copy) the whole index array on every product
+    return np.int32 if max(sizes) < np.iinfo(np.int32).max else np.int64
+
+
+def _save_array(directory: str, name: str, array: np.ndarray) -> None:
+    # Written beside the target and renamed over it: workers that mapped the
+    # previous file keep reading it instead of a half-rewritten one
+    temporary_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    with open(temporary_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(temporary_path, os.path.join(directory, name))
+
+
+def _save_matrix(directory: str, prefix: str, matrix: "csr_matrix") -> None:
+    index_dtype = _index_dtype(matrix.nnz, *matrix.shape)
+    _save_array(directory, f"{prefix}.data.npy", matrix.data.astype(np.float32, copy=False))
+    _save_array(directory, f"{prefix}.indices.npy", matrix.indices.astype(index_dtype, copy=False))
+    _save_array(directory, f"{prefix}.indptr.npy", matrix.indptr.astype(index_dtype, copy=False))
+
+
+def export_array_artifacts(
+    directory: str,
+    product_matrix: "csr_matrix",
+    term_matrix: "csr_matrix",
+    sorted_product_ids: np.ndarray,
+    sorted_product_rows: np.ndarray,
+    product_names: Sequence[str]
+) -> Dict[str, Any]:
+    """
+    Write the serving arrays of a model version as .npy files
+
+    Matrix values are stored as float32. The manifest is written last, so a
+    directory only counts as having array artifacts once all of them exist.
+
+    Returns:
+        The manifest
+    """
+    _save_matrix(directory, PRODUCT_MATRIX_PREFIX, product_matrix)
+    _save_matrix(directory, TERM_MATRIX_PREFIX, term_matrix)
+    _save_array(directory, SORTED_IDS_FILE, np.asarray(sorted_product_ids, dtype=np.int64))
+    _save_array(directory, SORTED_ROWS_FILE, np.asarray(sorted_product_rows, dtype=np.int64))
+    names = product_names if isinstance(product_names, PackedStrings) else PackedStrings.pack(product_names)
+    _save_array(directory, NAMES_FILE, names.buffer)
+    _save_array(directory, NAME_OFFSETS_FILE, names.offsets)
+
+    manifest = {
+        "format": ARRAY_FORMAT,
+        "products": product_matrix.shape[0],
+        "terms": product_matrix.shape[1],
+        "nnz": int(product_matrix.nnz),
+        "bytes": sum(
+            os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory) if name.endswith('.npy') and not name.startswith('.')
+        ),
+    }
+    temporary_path = os.path.join(directory, f".{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(temporary_path, os.path.join(directory, MANIFEST_FILE))
+    return manifest
+
+
+def has_array_artifacts(directory: str) -> bool:
+    return os.path.isfile(os.path.join(directory, MANIFEST_FILE))
+
+
+def _load_matrix(directory: str, prefix: str, shape) -> "csr_matrix":
+    from scipy.sparse import csr_matrix
+
+    data, indices, indptr = (
+        np.load(os.path.join(directory, f"{prefix}.{part}.npy"), mmap_mode='r') for part in MATRIX_PARTS
+    )
+    # copy=False keeps the memory-mapped arrays as the matrix storage
+    return csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def load_array_artifacts(directory: str) -> Dict[str, Any]:
+    """
+    Memory-map the serving arrays of a model version
+
+    Nothing is read eagerly; pages are loaded on first use and shared between
+    all processes mapping the same files. Does not need pandas.
+
+    Raises:
+        ValueError: If the arrays are from another format or inconsistent
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARRAY_FORMAT:
+        raise ValueError(f"Unsupported array artifact format: {manifest.get('format')}")
+
+    products, terms = manifest["products"], manifest["terms"]
+    product_matrix = _load_matrix(directory, PRODUCT_MATRIX_PREFIX, (products, terms))
+    term_matrix = _load_matrix(directory, TERM_MATRIX_PREFIX, (terms, products))
+    product_names = PackedStrings(
+        np.load(os.path.join(directory, NAMES_FILE), mmap_mode='r'),
+        np.load(os.path.join(directory, NAME_OFFSETS_FILE), mmap_mode='r'),
+    )
+    if product_matrix.nnz != manifest["nnz"] or term_matrix.nnz != manifest["nnz"] or len(product_names) != products:
+        raise ValueError("Array artifacts do not match their manifest")
+
+    return {
+        "product_tfidf_matrix": product_matrix,
+        "product_term_index": term_matrix,
+        "product_names": product_names,
+        "sorted_product_ids": np.load(os.path.join(directory, SORTED_IDS_FILE), mmap_mode='r'),
+        "sorted_product_rows": np.load(os.path.join(directory, SORTED_ROWS_FILE), mmap_mode='r'),
+    }
@@ -12,7 +12,10 @@ from app.models.address import Address
 from app.models.product import Product, ProductVariant
 from app.models.shipment import Shipment, ShipmentStatus
 from app.schemas.order import OrderCreate, OrderUpdate, OrderItemCreate, OrderItemUpdate, TransactionCreate
+from app.services.catalog_version import bump_catalog_version
+from app.services.count_cache import count_query_rows, invalidate_counts, orders_namespace
 from app.services.notification import create_notification
+from app.services.product_cache import invalidate_product
 from app.services.shipment import create_shipment_from_order, update_shipment_status
 
 
@@ -114,6 +117,7 @@ async def create_order(db: AsyncSession, order_in: OrderCreate, user_id: int) ->
     order.total_amount = total_amount
     await db.commit()
     await db.refresh(order)
+    invalidate_counts(orders_namespace(user_id))
 
     # Create notification for order creation
     # await create_notification(
@@ -197,6 +201,7 @@ async def create_order_from_cart(
     db.add(db_order)
     await db.commit()
     await db.refresh(db_order)
+    invalidate_counts(orders_namespace(user_id))
 
     # Add order items
     for cart_item in cart_items:
@@ -251,8 +256,9 @@ async def get_user_orders(
         query = query.where(Order.status == status)
 
     # Get total count for pagination
-    count_query = select(func.count()).select_from(query.subquery())
-    total = await db.scalar(count_query) or 0
+    total, total_exact = await count_query_rows(
+        db, query, orders_namespace(user_id), {"status": status}
+    )
 
     # Apply pagination
     if pagination:
@@ -277,6 +283,7 @@ async def get_user_orders(
         "page": pagination.page if pagination else 1,
         "limit": limit_val,
         "total": total,
+        "total_exact": total_exact,
         "pages": total_pages,
         "data": orders
     }
@@ -312,6 +319,7 @@ async def update_order_status(
     order.status = status
     await db.commit()
     await db.refresh(order)
+    invalidate_counts(orders_namespace(order.user_id))
 
     # # Send notification
     # await create_notification(
@@ -372,6 +380,7 @@ async def update_payment_status(
         # For other status changes, just commit
         await db.commit()
         await db.refresh(order)
+    invalidate_counts(orders_namespace(order.user_id))
 
     # Send notification
     await create_notification(
@@ -424,6 +433,8 @@ async def update_shipping_details(
 
     await db.commit()
     await db.refresh(order)
+    if status_changed:
+        invalidate_counts(orders_namespace(order.user_id))
 
     # Create or update shipment
     shipment_result = await db.execute(select(Shipment).where(Shipment.order_id == order.id))
@@ -494,6 +505,7 @@ async def cancel_order(db: AsyncSession, order: Order, user_id: int) -> Order:
     order.status = OrderStatus.CANCELLED
     await db.commit()
     await db.refresh(order)
+    invalidate_counts(orders_namespace(order.user_id))
 
     # Update shipment status if exists
     shipment_result = await db.execute(select(Shipment).where(Shipment.order_id == order.id))
@@ -639,4 +651,9 @@ async def update_product_stock_for_order(db: AsyncSession, order_id: int) -> Non
             product.quantity -= item.quantity
 
     # Commit all stock updates
-    await db.commit()
\ No newline at end of file
+    await db.commit()
+
+    # Stock is part of the cached catalog payloads
+    for product_id in {item.product_id for item in order_items}:
+        await invalidate_product(product_id)
+    await bump_catalog_version()
\ No newline at end of file
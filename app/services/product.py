@@ -2,7 +2,7 @@ import fastapi
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_, and_, func, desc, update, delete
+from sqlalchemy import or_, and_, func, desc, update, delete, literal_column, tuple_
 from sqlalchemy.orm import selectinload
 from math import ceil
 
@@ -10,11 +10,49 @@ from app.models.product import Product, ProductVariant, ProductImage
 from app.models.user import User
 from app.models.category import Category
 from app.models.brand import Brand
+from app.core.cache import normalize_search_term
+from app.core.pagination import decode_cursor, encode_cursor
 from app.schemas.product import (
     ProductCreate, ProductUpdate,
     CategoryCreate, CategoryUpdate, BrandCreate, BrandUpdate,
     ProductVariantCreate, ProductVariantUpdate, ProductVariant as ProductVariantSchema
 )
+from app.services.catalog_version import bump_catalog_version
+from app.services.category_tree import get_category_tree, rebuild_category_tree
+from app.services.count_cache import PRODUCTS_NAMESPACE, count_query_rows, invalidate_counts
+from app.services.facets import compute_facets
+from app.services.full_text import product_search_condition
+from app.services.hydration import (
+    hydrate_product, hydrate_products, load_images, load_variants, serialize_image, serialize_variant
+)
+from app.services.product_cache import invalidate_product
+from app.services.recommendation_delta import refresh_recommendation_delta
+from app.services.search_index import refresh_search_index
+
+
+async def _catalog_changed(
+    product_id: Optional[int] = None,
+    barcodes: List[Optional[str]] = (),
+    counts: bool = False
+) -> None:
+    """
+    Invalidate derived catalog state after a committed write
+
+    Args:
+        product_id: ID of the product whose detail data changed, if any
+        barcodes: Barcodes that pointed at the product before or after the write
+        counts: Whether the write can change which products match list filters
+            (and so their searchable text)
+    """
+    if counts:
+        invalidate_counts(PRODUCTS_NAMESPACE)
+    if product_id is not None:
+        await invalidate_product(product_id, barcodes)
+        if counts:
+            await refresh_search_index([product_id])
+            await refresh_recommendation_delta([product_id])
+    await bump_catalog_version()
+
 
 async def get_all_brands(db: AsyncSession) -> List[Dict[str, Any]]:
     """
@@ -33,17 +71,16 @@ async def get_all_brands(db: AsyncSession) -> List[Dict[str, Any]]:
 
 async def get_all_categories(db: AsyncSession) -> List[Dict[str, Any]]:
     """
-    Get all categories
+    Get all top-level categories, served from the in-memory category tree
     """
-    result = await db.execute(select(Category).where(Category.parent_id == None).order_by(Category.category_name))
-    categories = result.scalars().all()
+    tree = await get_category_tree(db)
     return [
         {
-            "id": category.id,
-            "name": category.category_name,
-            "description": category.description,
+            "id": category["id"],
+            "name": category["name"],
+            "description": category["description"],
         }
-        for category in categories
+        for category in tree.roots()
     ]
 
 
@@ -58,21 +95,8 @@ async def get_product_variants(db: AsyncSession, product_id: int) -> List[Dict[s
     Returns:
         List of dictionaries containing product variant data
     """
-    result = await db.execute(select(ProductVariant).where(ProductVariant.product_id == product_id))
-    variants = result.scalars().all()
-
-    # Convert SQLAlchemy objects to dictionaries
-    return [
-        {
-            "id": variant.id,
-            "product_id": variant.product_id,
-            "size": variant.size,
-            "stock": variant.stock,
-            "created_at": variant.created_at,
-            "updated_at": variant.updated_at
-        }
-        for variant in variants
-    ]
+    variants = await load_variants(db, [product_id])
+    return variants.get(product_id, [])
 
 async def get_product_variant(db: AsyncSession, variant_id: int) -> Optional[Dict[str, Any]]:
     """
@@ -92,14 +116,7 @@ async def get_product_variant(db: AsyncSession, variant_id: int) -> Optional[Dic
         return None
 
     # Convert SQLAlchemy object to dictionary
-    return {
-        "id": variant.id,
-        "product_id": variant.product_id,
-        "size": variant.size,
-        "stock": variant.stock,
-        "created_at": variant.created_at,
-        "updated_at": variant.updated_at
-    }
+    return serialize_variant(variant)
 
 async def add_product_variant(db: AsyncSession, variant: ProductVariantCreate, user_id: int) -> Dict[str, Any]:
     """
@@ -135,16 +152,10 @@ async def add_product_variant(db: AsyncSession, variant: ProductVariantCreate, u
     db.add(db_variant)
     await db.commit()
     await db.refresh(db_variant)
+    await _catalog_changed(db_variant.product_id)
 
     # Convert SQLAlchemy object to dictionary
-    return {
-        "id": db_variant.id,
-        "product_id": db_variant.product_id,
-        "size": db_variant.size,
-        "stock": db_variant.stock,
-        "created_at": db_variant.created_at,
-        "updated_at": db_variant.updated_at
-    }
+    return serialize_variant(db_variant)
 
 async def update_product_variant(
     db: AsyncSession, variant: ProductVariant, variant_update: ProductVariantUpdate, user_id: int
@@ -178,16 +189,10 @@ async def update_product_variant(
 
     await db.commit()
     await db.refresh(variant)
+    await _catalog_changed(variant.product_id)
 
     # Convert SQLAlchemy object to dictionary
-    return {
-        "id": variant.id,
-        "product_id": variant.product_id,
-        "size": variant.size,
-        "stock": variant.stock,
-        "created_at": variant.created_at,
-        "updated_at": variant.updated_at
-    }
+    return serialize_variant(variant)
 
 async def delete_product_variant(db: AsyncSession, variant: ProductVariant, user_id: int) -> None:
     """
@@ -200,6 +205,7 @@ async def delete_product_variant(db: AsyncSession, variant: ProductVariant, user
     """
     await db.execute(delete(ProductVariant).where(ProductVariant.id == variant.id))
     await db.commit()
+    await _catalog_changed(variant.product_id)
 
 # Product methods
 async def create_product(db: AsyncSession, product: ProductCreate, user_id: int) -> Product:
@@ -223,6 +229,7 @@ async def create_product(db: AsyncSession, product: ProductCreate, user_id: int)
     db.add(db_product)
     await db.commit()
     await db.refresh(db_product)
+    await _catalog_changed(db_product.id, counts=True)
 
     # Fetch the newly created product with all related data
     result = await db.execute(
@@ -239,50 +246,90 @@ async def create_product(db: AsyncSession, product: ProductCreate, user_id: int)
     return created_product
 
 
-async def get_product(db: AsyncSession, product_id: int) -> Optional[Product]:
+async def get_product(db: AsyncSession, product_id: int) -> Optional[Dict[str, Any]]:
     """
     Get a product by ID
     """
     result = await db.execute(select(Product).where(Product.id == product_id))
     product = result.scalars().first()
 
-    product_variants = await get_product_variants(db, product.id)
-    product_images = await get_product_image(db, product.id)
-    # Create a dictionary from product
-    product_dict = {
-        "id": product.id,
-        "barcode": product.barcode,
-        "product_name": product.product_name,
-        "description": product.description,
-        "price": product.price,
-        "category_id": product.category_id,
-        "brand_id": product.brand_id,
-        "created_at": product.created_at,
-        "updated_at": product.updated_at,
-        "quantity": product.quantity,
-        "variants": product_variants,
-        "images": product_images
+    return await hydrate_product(db, product)
+
+
+async def get_product_fingerprint(db: AsyncSession, product_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get the values that change whenever a product's detail payload changes
+
+    Used to validate conditional requests without loading and hydrating the
+    product. product_payload_fingerprint derives the same values from a payload.
+
+    Returns:
+        Dictionary of change markers, or None if the product does not exist
+    """
+    variant_stats = (
+        select(
+            func.count(ProductVariant.id).label("variant_count"),
+            func.max(ProductVariant.updated_at).label("variants_updated_at"),
+        )
+        .where(ProductVariant.product_id == product_id)
+        .subquery()
+    )
+    image_stats = (
+        select(
+            func.count(ProductImage.id).label("image_count"),
+            func.max(ProductImage.id).label("last_image_id"),
+            func.max(ProductImage.upload_date).label("images_updated_at"),
+        )
+        .where(ProductImage.product_id == product_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Product.updated_at, variant_stats, image_stats).where(Product.id == product_id)
+    )
+    row = result.mappings().first()
+    return dict(row) if row is not None else None
+
+
+def product_payload_fingerprint(product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Derive the get_product_fingerprint markers from a hydrated product payload
+    """
+    variants = product.get("variants") or []
+    images = product.get("images") or []
+    return {
+        "updated_at": product["updated_at"],
+        "variant_count": len(variants),
+        "variants_updated_at": max(
+            (variant["updated_at"] for variant in variants if variant["updated_at"] is not None), default=None
+        ),
+        "image_count": len(images),
+        "last_image_id": max((image["id"] for image in images), default=None),
+        "images_updated_at": max(
+            (image["upload_date"] for image in images if image["upload_date"] is not None), default=None
+        ),
     }
 
-    return product_dict
 
+# Sort keys for product listings. Every ordering is completed with Product.id so
+# that keyset pagination has a unique, stable position to resume from.
+PRODUCT_SORT_KEYS = {
+    "id": Product.id,
+    "name": Product.product_name,
+    "price": func.coalesce(Product.price, literal_column("0")),
+}
 
-async def get_products(
-    db: AsyncSession,
-    skip: int = 0,
-    limit: int = 10,
+
+def _filter_products_query(
+    query,
     category_id: Optional[int] = None,
     brand_id: Optional[int] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     search: Optional[str] = None
-) -> Dict[str, Any]:
+):
     """
-    Get all products with filtering and pagination
+    Apply the product list filters to a query
     """
-    query = select(Product)
-
-    # Apply filters if provided
     if category_id is not None:
         query = query.where(Product.category_id == category_id)
     if brand_id is not None:
@@ -292,47 +339,128 @@ async def get_products(
     if max_price is not None:
         query = query.where(Product.price <= max_price)
     if search is not None and search.strip():
-        query = query.where(Product.product_name.ilike(f"%{search}%"))
+        query = query.where(product_search_condition(search))
+    return query
+
+
+def _order_products_query(query, sort_by: str, sort_order: str):
+    """
+    Order a product query by (sort key, id)
+
+    Raises:
+        ValueError: If the sort key or direction is not supported
+    """
+    if sort_by not in PRODUCT_SORT_KEYS:
+        raise ValueError(f"Unsupported sort key '{sort_by}'")
+    if sort_order not in ("asc", "desc"):
+        raise ValueError(f"Unsupported sort order '{sort_order}'")
+
+    columns = [PRODUCT_SORT_KEYS[sort_by]]
+    if sort_by != "id":
+        columns.append(Product.id)
+
+    if sort_order == "desc":
+        return query.order_by(*[column.desc() for column in columns])
+    return query.order_by(*[column.asc() for column in columns])
+
+
+def _product_list_filters(
+    category_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    search: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Normalized filter set identifying a product list query in the count cache
+    """
+    return {
+        "scope": "list",
+        "category_id": category_id,
+        "brand_id": brand_id,
+        "min_price": min_price,
+        "max_price": max_price,
+        "search": normalize_search_term(search),
+    }
+
+
+async def _count_products(
+    db: AsyncSession,
+    query,
+    count_mode: str,
+    category_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    search: Optional[str] = None
+):
+    """
+    Count the rows matched by a product list query through the count cache
+
+    Returns:
+        Tuple of (total, is_exact)
+    """
+    filters = _product_list_filters(category_id, brand_id, min_price, max_price, search)
+    return await count_query_rows(db, query, PRODUCTS_NAMESPACE, filters, mode=count_mode)
+
+
+async def get_products(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 10,
+    category_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    search: Optional[str] = None,
+    sort_by: str = "id",
+    sort_order: str = "asc",
+    include_total: bool = True,
+    count_mode: str = "exact",
+    include_facets: bool = False
+) -> Dict[str, Any]:
+    """
+    Get all products with filtering and offset pagination
+
+    With include_facets, the response also carries brand, category and price
+    bucket counts for the filtered products (see compute_facets).
+
+    Raises:
+        ValueError: If the sort key, direction or count mode is not supported
+    """
+    query = _filter_products_query(
+        select(Product), category_id, brand_id, min_price, max_price, search
+    )
 
     # Count total results
-    count_query = select(func.count()).select_from(query.subquery())
-    total_count = await db.execute(count_query)
-    total = total_count.scalar() or 0
+    total, total_exact = None, None
+    if include_total:
+        total, total_exact = await _count_products(
+            db, query, count_mode, category_id, brand_id, min_price, max_price, search
+        )
+
+    facets = None
+    if include_facets:
+        facets = await compute_facets(
+            db, query, PRODUCTS_NAMESPACE,
+            _product_list_filters(category_id, brand_id, min_price, max_price, search)
+        )
 
     # Calculate total pages
-    pages = ceil(total / limit) if limit > 0 else 0
+    if total is None:
+        pages = None
+    else:
+        pages = ceil(total / limit) if limit > 0 else 0
 
-    # Apply pagination
+    # Apply ordering and pagination
+    query = _order_products_query(query, sort_by, sort_order)
     query = query.offset(skip).limit(limit)
 
     result = await db.execute(query)
     products = result.scalars().all()
 
-    # Create a list of products with complete information
-    product_list = []
-    for product in products:
-        # Get variants and images
-        product_variants = await get_product_variants(db, product.id)
-        print("Done get product variants")
-        product_images = await get_product_image(db, product.id)
-        print("Done get product images")
-
-        # Create a dictionary from product
-        product_dict = {
-            "id": product.id,
-            "barcode": product.barcode,
-            "product_name": product.product_name,
-            "description": product.description,
-            "price": product.price,
-            "category_id": product.category_id,
-            "brand_id": product.brand_id,
-            "created_at": product.created_at,
-            "updated_at": product.updated_at,
-            "quantity": product.quantity,
-            "variants": product_variants,
-            "images": product_images
-        }
-        product_list.append(product_dict)
+    # Load variants and images for the whole page at once
+    product_list = await hydrate_products(db, products)
 
     # Format the response to match the expected ProductPaginated schema
     return {
@@ -340,42 +468,151 @@ async def get_products(
         "page": skip // limit + 1 if limit > 0 else 1,
         "limit": limit,
         "total": total,
-        "pages": pages
+        "total_exact": total_exact,
+        "pages": pages,
+        "facets": facets
     }
 
 
-async def add_product_image(db: AsyncSession, product_id: int, image_url: str) -> Product:
+async def get_products_by_cursor(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+    category_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    search: Optional[str] = None,
+    sort_by: str = "id",
+    sort_order: str = "asc",
+    include_total: bool = False,
+    count_mode: str = "exact",
+    include_facets: bool = False
+) -> Dict[str, Any]:
+    """
+    Get products with filtering and keyset (cursor) pagination
+
+    Pages are located with a (sort key, id) comparison instead of OFFSET,
+    so reading page 10,000 costs the same as reading page 1.
+
+    Args:
+        db: Database session
+        cursor: Opaque cursor returned as next_cursor by the previous page, or None for the first page
+        limit: Maximum number of products to return
+        sort_by: One of the keys in PRODUCT_SORT_KEYS
+        sort_order: "asc" or "desc"
+        include_total: Whether to also count all matching products
+        count_mode: "exact", "estimated" or "auto" (see count_query_rows)
+        include_facets: Whether to also return brand, category and price bucket counts
+
+    Returns:
+        Dictionary with the page of products and the cursor for the next page
+
+    Raises:
+        ValueError: If the cursor is invalid or was issued for a different ordering
+    """
+    query = _filter_products_query(
+        select(Product), category_id, brand_id, min_price, max_price, search
+    )
+
+    total, total_exact = None, None
+    if include_total:
+        total, total_exact = await _count_products(
+            db, query, count_mode, category_id, brand_id, min_price, max_price, search
+        )
+
+    facets = None
+    if include_facets:
+        facets = await compute_facets(
+            db, query, PRODUCTS_NAMESPACE,
+            _product_list_filters(category_id, brand_id, min_price, max_price, search)
+        )
+
+    if cursor:
+        sort_column = PRODUCT_SORT_KEYS[sort_by]
+        position = decode_cursor(cursor, {"id": int, "key": sort_column.type.python_type})
+        if position.get("sort_by") != sort_by or position.get("sort_order") != sort_order:
+            raise ValueError("Pagination cursor does not match the requested ordering")
+
+        if sort_by == "id":
+            current, last = Product.id, position["id"]
+        else:
+            current = tuple_(sort_column, Product.id)
+            last = tuple_(position["key"], position["id"])
+        query = query.where(current < last if sort_order == "desc" else current > last)
+
+    # Fetch one extra row to find out whether another page exists
+    query = _order_products_query(query, sort_by, sort_order).limit(limit + 1)
+    result = await db.execute(query)
+    products = result.scalars().all()
+
+    has_more = len(products) > limit
+    products = products[:limit]
+
+    next_cursor = None
+    if has_more and products:
+        last_product = products[-1]
+        if sort_by == "price":
+            key = last_product.price if last_product.price is not None else 0
+        elif sort_by == "name":
+            key = last_product.product_name
+        else:
+            key = last_product.id
+        next_cursor = encode_cursor({
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "key": key,
+            "id": last_product.id,
+        })
+
+    product_list = await hydrate_products(db, products)
+
+    return {
+        "data": product_list,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "total": total,
+        "total_exact": total_exact,
+        "facets": facets
+    }
+
+
+async def add_product_image(
+    db: AsyncSession, product_id: int, image_url: str, is_primary: bool = False
+) -> Dict[str, Any]:
     """
     Add an image to a product
+
+    Returns:
+        Dictionary containing the created image
+
+    Raises:
+        ValueError: If the product does not exist or already has this image
     """
     product = await db.get(Product, product_id)
     if not product:
         raise ValueError(f"Product with ID {product_id} not found")
 
-    db_image = ProductImage(product_id=product_id, image_url=image_url)
+    existing_image = await db.scalar(
+        select(ProductImage.id).where(ProductImage.product_id == product_id, ProductImage.image_url == image_url)
+    )
+    if existing_image:
+        raise ValueError(f"Image '{image_url}' already exists for this product")
+
+    db_image = ProductImage(product_id=product_id, image_url=image_url, is_primary=is_primary)
     db.add(db_image)
     await db.commit()
-    await db.refresh(product)
-    return product
+    await db.refresh(db_image)
+    await _catalog_changed(product_id)
+    return serialize_image(db_image)
 
 async def get_product_image(db: AsyncSession, product_id: int) -> List[Dict[str, Any]]:
     """
     Get images for a product
     """
-    result = await db.execute(select(ProductImage).where(ProductImage.product_id == product_id))
-    images = result.scalars().all()
-
-    # Convert SQLAlchemy objects to dictionaries
-    return [
-        {
-            "id": image.id,
-            "product_id": image.product_id,
-            "image_url": image.image_url,
-            "is_primary": image.is_primary,
-            "upload_date": image.upload_date
-        }
-        for image in images
-    ]
+    images = await load_images(db, [product_id])
+    return images.get(product_id, [])
 
 async def get_product_by_barcode(db: AsyncSession, barcode: str) -> Optional[Dict[str, Any]]:
     """
@@ -391,28 +628,7 @@ async def get_product_by_barcode(db: AsyncSession, barcode: str) -> Optional[Dic
     result = await db.execute(select(Product).where(Product.barcode == barcode))
     product = result.scalars().first()
 
-    if not product:
-        return None
-
-    # Get variants and images
-    variants = await get_product_variants(db, product.id)
-    images = await get_product_image(db, product.id)
-
-    # Create a dictionary with product data
-    return {
-        "id": product.id,
-        "barcode": product.barcode,
-        "product_name": product.product_name,
-        "description": product.description,
-        "price": product.price,
-        "category_id": product.category_id,
-        "brand_id": product.brand_id,
-        "created_at": product.created_at,
-        "updated_at": product.updated_at,
-        "quantity": product.quantity,
-        "variants": variants,
-        "images": images
-    }
+    return await hydrate_product(db, product)
 
 
 async def update_product(
@@ -444,12 +660,16 @@ async def update_product(
             # Set to None if 0 to avoid foreign key constraint violation
             update_data["category_id"] = None
 
+    # Remember the old barcode so its cache mapping can be dropped
+    old_barcode = product.barcode
+
     # Apply updates
     for field, value in update_data.items():
         setattr(product, field, value)
 
     await db.commit()
     await db.refresh(product)
+    await _catalog_changed(product.id, [old_barcode, product.barcode], counts=True)
 
     return product
 
@@ -458,11 +678,12 @@ async def delete_product(db: AsyncSession, product: Product, user_id: int) -> No
     """
     Delete a product
     """
-    product_name = product.product_name
     product_id = product.id
+    barcode = product.barcode
 
     await db.execute(delete(Product).where(Product.id == product_id))
     await db.commit()
+    await _catalog_changed(product_id, [barcode], counts=True)
 
 
 # Comment out favorites-related functions
@@ -594,6 +815,8 @@ async def create_category(db: AsyncSession, category: CategoryCreate, user_id: i
     db.add(db_category)
     await db.commit()
     await db.refresh(db_category)
+    await rebuild_category_tree(db)
+    await _catalog_changed()
 
     return db_category
 
@@ -611,6 +834,7 @@ async def create_brand(db: AsyncSession, brand: BrandCreate, user_id: int) -> Br
     db.add(db_brand)
     await db.commit()
     await db.refresh(db_brand)
+    await _catalog_changed()
 
     return db_brand
 
@@ -680,7 +904,7 @@ async def compare_product_prices(
 
 async def get_product_by_category(db: AsyncSession, category_id: int) -> Dict[str, Any]:
     """
-    Get all products in a category and its subcategories
+    Get all products in a category and its subcategories at any depth
 
     If the category has a parent, also include products from the parent category
 
@@ -691,10 +915,12 @@ async def get_product_by_category(db: AsyncSession, category_id: int) -> Dict[st
     Returns:
         Dictionary with products and category information
     """
-    # First, get the category to check if it has a parent
-    category_result = await db.execute(select(Category).where(Category.id == category_id))
-    category = category_result.scalars().first()
+    tree = await get_category_tree(db)
+    if category_id not in tree:
+        # The category may have been created through another worker since the tree was loaded
+        tree = await rebuild_category_tree(db)
 
+    category = tree.get(category_id)
     if not category:
         return {
             "products": [],
@@ -702,64 +928,26 @@ async def get_product_by_category(db: AsyncSession, category_id: int) -> Dict[st
             "total": 0
         }
 
-    # Initialize list of category IDs to include in the query
-    category_ids = [category_id]
-
-    # Check if category has a parent
-    parent_category = None
-    if category.parent_id:
-        parent_result = await db.execute(select(Category).where(Category.parent_id == category.parent_id))
-        parent_category = parent_result.scalars().first()
-        if parent_category:
-            category_ids.append(parent_category.id)
-
-    # Get all child categories
-    child_result = await db.execute(select(Category).where(Category.parent_id == category_id))
-    child_categories = child_result.scalars().all()
-
-    # Add child category IDs to the list
-    for child in child_categories:
-        category_ids.append(child.id)
+    # The category itself, all of its descendants and its direct parent
+    category_ids = set(tree.descendants(category_id))
+    if category["parent_id"] in tree:
+        category_ids.add(category["parent_id"])
 
     # Query products from all relevant categories
-    query = select(Product).where(Product.category_id.in_(category_ids))
+    query = select(Product).where(Product.category_id.in_(category_ids)).order_by(Product.id)
     result = await db.execute(query)
     products = result.scalars().all()
 
-    # Create a list of products with complete information
-    product_list = []
-    for product in products:
-        # Get variants and images
-        product_variants = await get_product_variants(db, product.id)
-        product_images = await get_product_image(db, product.id)
-
-        # Create a dictionary from product
-        product_dict = {
-            "id": product.id,
-            "barcode": product.barcode,
-            "product_name": product.product_name,
-            "description": product.description,
-            "price": product.price,
-            "category_id": product.category_id,
-            "brand_id": product.brand_id,
-            "created_at": product.created_at,
-            "updated_at": product.updated_at,
-            "quantity": product.quantity,
-            "variants": product_variants,
-            "images": product_images
-        }
-        product_list.append(product_dict)
+    # Load variants and images for all products at once
+    product_list = await hydrate_products(db, products)
 
     # Format category information
     category_info = {
-        "id": category.id,
-        "name": category.category_name,
-        "description": category.description,
-        "image_url": category.image_url,
-        "parent_id": category.parent_id
+        **category,
+        "parent": tree.get(category["parent_id"]) if category["parent_id"] is not None else None,
+        "subcategories": tree.subcategories(category_id)
     }
 
-
     # Return formatted response
     return {
         "products": product_list,
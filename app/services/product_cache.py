@@ -0,0 +1,296 @@
+import asyncio
+import json
+import logging
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis channel used to evict keys from the in-process tier of every worker
+INVALIDATION_CHANNEL = "catalog:invalidate"
+# Incremented by every invalidation. A read-through load records it before
+# reading the database and only stores its result if it did not change, so a
+# write committed meanwhile cannot be overwritten with the old payload.
+GENERATION_KEY = "catalog:product:generation"
+
+# Sets KEYS[1] only while KEYS[2] (the generation) still equals ARGV[2]
+_SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[2] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+end
+"""
+
+_l1 = TTLCache(maxsize=settings.PRODUCT_CACHE_L1_MAX_ENTRIES, ttl=settings.PRODUCT_CACHE_L1_TTL_SECONDS)
+_l1_lock = Lock()
+# Local counterpart of GENERATION_KEY, for the in-process tier; also bumped by
+# invalidations received from other workers
+_local_generation = 0
+_stats = {
+    "l1_hits": 0,
+    "l2_hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+    "stale_loads_skipped": 0,
+    "redis_errors": 0,
+}
+
+
+def product_key(product_id: int) -> str:
+    return f"catalog:product:{product_id}"
+
+
+def barcode_key(barcode: str) -> str:
+    return f"catalog:barcode:{barcode}"
+
+
+def _l1_get(key: str) -> Any:
+    with _l1_lock:
+        return _l1.get(key)
+
+
+def _l1_set(key: str, value: Any) -> None:
+    with _l1_lock:
+        _l1[key] = value
+
+
+def _bump_local_generation() -> None:
+    global _local_generation
+    _local_generation += 1
+
+
+def _l1_evict(keys: Iterable[str]) -> None:
+    with _l1_lock:
+        for key in keys:
+            _l1.pop(key, None)
+
+
+async def _l2_get(key: str) -> Any:
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(key)
+    except Exception as e:
+        _stats["redis_errors"] += 1
+        logger.warning(f"Product cache Redis read failed: {e}")
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+async def _cache_get(key: str, record_miss: bool = True) -> Any:
+    value = _l1_get(key)
+    if value is not None:
+        _stats["l1_hits"] += 1
+        return value
+
+    value = await _l2_get(key)
+    if value is not None:
+        _stats["l2_hits"] += 1
+        _l1_set(key, value)
+        return value
+
+    if record_miss:
+        _stats["misses"] += 1
+    return None
+
+
+async def _read_generation() -> Tuple[int, Optional[str]]:
+    """
+    (local, shared) invalidation generation, read before a database load
+
+    The shared generation is None when Redis is unavailable.
+    """
+    redis = get_redis()
+    if redis is None:
+        return _local_generation, None
+    try:
+        return _local_generation, await redis.get(GENERATION_KEY) or "0"
+    except Exception as e:
+        _stats["redis_errors"] += 1
+        logger.warning(f"Product cache Redis read failed: {e}")
+        return _local_generation, None
+
+
+async def _l2_set_if_current(key: str, value: Any, generation: str) -> None:
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.eval(
+            _SET_IF_GENERATION, 2, key, GENERATION_KEY,
+            json.dumps(value), generation, settings.PRODUCT_CACHE_L2_TTL_SECONDS,
+        )
+    except Exception as e:
+        _stats["redis_errors"] += 1
+        logger.warning(f"Product cache Redis write failed: {e}")
+
+
+async def _store_product(product: Dict[str, Any], generation: Tuple[int, Optional[str]]) -> Dict[str, Any]:
+    """
+    Store a hydrated product under its id and barcode keys
+
+    Values are stored in their JSON form so that both tiers return identical
+    data. Nothing is stored if a product was invalidated since generation was
+    read (see _read_generation): the payload may predate that write.
+    """
+    encoded = jsonable_encoder(product)
+    local, shared = generation
+    if local != _local_generation:
+        _stats["stale_loads_skipped"] += 1
+        return encoded
+
+    entries = [(product_key(encoded["id"]), encoded)]
+    if encoded.get("barcode"):
+        entries.append((barcode_key(encoded["barcode"]), encoded["id"]))
+    # No await before the L1 writes, so no local invalidation can slip in
+    for key, value in entries:
+        _l1_set(key, value)
+    if shared is not None:
+        for key, value in entries:
+            await _l2_set_if_current(key, value, shared)
+    return encoded
+
+
+async def peek_cached_product(product_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Return a cached product without falling back to the database
+
+    A miss is not counted, since callers follow up with get_cached_product.
+    """
+    return await _cache_get(product_key(product_id), record_miss=False)
+
+
+async def get_cached_product(db: AsyncSession, product_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Read-through lookup of a hydrated product by ID
+
+    Missing products are not cached.
+    """
+    from app.services.product import get_product
+
+    cached = await _cache_get(product_key(product_id))
+    if cached is not None:
+        return cached
+
+    generation = await _read_generation()
+    product = await get_product(db, product_id)
+    if product is None:
+        return None
+    return await _store_product(product, generation)
+
+
+async def get_cached_product_by_barcode(db: AsyncSession, barcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Read-through lookup of a hydrated product by barcode
+
+    The barcode key only maps to the product ID, so product data is stored once
+    and a product write needs to invalidate a single detail entry.
+    """
+    from app.services.product import get_product_by_barcode
+
+    product_id = await _cache_get(barcode_key(barcode))
+    if product_id is not None:
+        product = await get_cached_product(db, product_id)
+        if product is not None and product.get("barcode") == barcode:
+            return product
+
+    generation = await _read_generation()
+    product = await get_product_by_barcode(db, barcode)
+    if product is None:
+        return None
+    return await _store_product(product, generation)
+
+
+async def invalidate_product(product_id: Optional[int], barcodes: Iterable[Optional[str]] = ()) -> None:
+    """
+    Remove a product and its barcode mappings from both cache tiers
+
+    Args:
+        product_id: ID of the product that changed
+        barcodes: Barcodes that pointed at the product before or after the write
+    """
+    await invalidate_products([product_id] if product_id is not None else [], barcodes)
+
+
+async def invalidate_products(product_ids: Iterable[int], barcodes: Iterable[Optional[str]] = ()) -> None:
+    """
+    Remove several products and barcode mappings from both cache tiers at once
+
+    Other workers are told to drop the keys from their in-process tier through
+    a single Redis pub/sub message.
+    """
+    keys = [barcode_key(barcode) for barcode in barcodes if barcode]
+    keys.extend(product_key(product_id) for product_id in product_ids)
+    if not keys:
+        return
+
+    _stats["invalidations"] += 1
+    _bump_local_generation()
+    _l1_evict(keys)
+
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        # The generation goes first: a load that stores after the delete
+        # must already see it changed
+        await redis.incr(GENERATION_KEY)
+        await redis.delete(*keys)
+        await redis.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+    except Exception as e:
+        _stats["redis_errors"] += 1
+        logger.warning(f"Product cache Redis invalidation failed: {e}")
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Evict keys published by other workers from the in-process tier
+
+    Runs until cancelled; started from the application startup hook.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+
+    while True:
+        try:
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _bump_local_generation()
+                    _l1_evict(json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _stats["redis_errors"] += 1
+            logger.warning(f"Product cache invalidation listener failed, retrying: {e}")
+            # Entries may have changed while disconnected
+            _bump_local_generation()
+            with _l1_lock:
+                _l1.clear()
+            await asyncio.sleep(1)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters and sizes for the product cache
+    """
+    lookups = _stats["l1_hits"] + _stats["l2_hits"] + _stats["misses"]
+    with _l1_lock:
+        entries = len(_l1)
+    return {
+        **_stats,
+        "lookups": lookups,
+        "hit_ratio": (_stats["l1_hits"] + _stats["l2_hits"]) / lookups if lookups else 0.0,
+        "l1_entries": entries,
+        "l1_max_entries": _l1.maxsize,
+        "redis_enabled": get_redis() is not None,
+    }
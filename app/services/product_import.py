@@ -0,0 +1,411 @@
+import csv
+import json
+import logging
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.brand import Brand
+from app.models.category import Category
+from app.models.product import Product, ProductImage, ProductVariant
+from app.schemas.product import ProductImportRow
+from app.services.catalog_version import bump_catalog_version
+from app.services.count_cache import PRODUCTS_NAMESPACE, invalidate_counts
+from app.services.product_cache import invalidate_products
+from app.services.recommendation_delta import refresh_recommendation_delta
+from app.services.search_index import refresh_search_index
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Product columns overwritten from the feed when a barcode already exists
+PRODUCT_UPDATE_COLUMNS = ("product_name", "description", "price", "category_id", "brand_id")
+
+# PostgreSQL accepts at most 32767 bind parameters per statement
+MAX_BIND_PARAMS = 32767
+
+products_table = Product.__table__
+variants_table = ProductVariant.__table__
+images_table = ProductImage.__table__
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """
+    Guess the feed format from a file name
+
+    Raises:
+        ValueError: If the extension is not a supported feed format
+    """
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return "csv"
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    raise ValueError(f"Cannot detect feed format of '{filename}', expected one of: {', '.join(IMPORT_FORMATS)}")
+
+
+def _split_list(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in value.split("|") if part.strip()] if value else []
+
+
+def _csv_record(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """
+    Convert a CSV row into the shape of ProductImportRow
+
+    Variants are written as "S:10|M:5" and images as "url1|url2", where the
+    first image is the primary one. Empty cells become None.
+    """
+    record: Dict[str, Any] = {
+        key.strip(): value.strip() if value and value.strip() else None
+        for key, value in row.items()
+        if key
+    }
+
+    variants = []
+    for item in _split_list(record.pop("variants", None)):
+        size, _, stock = item.partition(":")
+        variants.append({"size": size.strip(), "stock": stock.strip() or 0})
+    record["variants"] = variants
+
+    record["images"] = [
+        {"image_url": url, "is_primary": index == 0}
+        for index, url in enumerate(_split_list(record.pop("images", None)))
+    ]
+    return record
+
+
+def read_feed(stream: TextIO, format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Stream raw records from a CSV or JSON Lines feed
+
+    Records are parsed lazily so that a malformed line is reported against its
+    line number instead of aborting the import.
+
+    Yields:
+        Tuples of (line number, raw record)
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported feed format '{format}'")
+
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, _csv_record(row)
+    else:
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                yield line_no, line
+
+
+def _parse_record(raw: Any) -> ProductImportRow:
+    if not isinstance(raw, dict):
+        raise ValueError("Record must be an object")
+    return ProductImportRow(**raw)
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+            for detail in error.errors()
+        )
+    if isinstance(error, DBAPIError):
+        return str(error.orig).strip().splitlines()[0]
+    return str(error)
+
+
+def _chunks(values: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Split multi-row VALUES so that a statement stays under the bind parameter limit
+    """
+    if not values:
+        return
+    size = max(1, MAX_BIND_PARAMS // len(values[0]))
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class ImportReport:
+    """
+    Running totals and per-row errors of a bulk import
+    """
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.processed = 0
+        self.products_written = 0
+        self.products_unchanged = 0
+        self.variants_written = 0
+        self.images_written = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+
+    def add_error(self, line: int, barcode: Optional[str], error: Exception) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "barcode": barcode, "error": _error_message(error)})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "products_written": self.products_written,
+            "products_unchanged": self.products_unchanged,
+            "variants_written": self.variants_written,
+            "images_written": self.images_written,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_seconds": round(time.perf_counter() - self._started, 3),
+        }
+
+
+def _product_values(row: ProductImportRow) -> Dict[str, Any]:
+    return {
+        "barcode": row.barcode,
+        "product_name": row.product_name,
+        "description": row.description,
+        "price": int(round(row.price)) if row.price is not None else None,
+        "category_id": row.category_id,
+        "brand_id": row.brand_id,
+    }
+
+
+async def _upsert_products(db: AsyncSession, rows: List[ProductImportRow]) -> Tuple[Dict[str, int], Set[int]]:
+    """
+    Insert or update products by barcode
+
+    Rows whose columns already match are left untouched, so updated_at (and
+    with it ETags) only moves for products that really changed.
+
+    Returns:
+        Tuple of (barcode -> product ID for every row, IDs of the products
+        inserted or changed)
+    """
+    ids: Dict[str, int] = {}
+    for chunk in _chunks([_product_values(row) for row in rows]):
+        stmt = insert(products_table).values(chunk)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[products_table.c.barcode],
+            set_={
+                **{column: excluded[column] for column in PRODUCT_UPDATE_COLUMNS},
+                "updated_at": func.now(),
+            },
+            where=or_(*[
+                products_table.c[column].is_distinct_from(excluded[column])
+                for column in PRODUCT_UPDATE_COLUMNS
+            ]),
+        ).returning(products_table.c.id, products_table.c.barcode)
+        result = await db.execute(stmt)
+        ids.update({barcode: product_id for product_id, barcode in result.all()})
+
+    written = set(ids.values())
+    unchanged = [row.barcode for row in rows if row.barcode not in ids]
+    if unchanged:
+        result = await db.execute(
+            select(Product.id, Product.barcode).where(Product.barcode.in_(unchanged))
+        )
+        ids.update({barcode: product_id for product_id, barcode in result.all()})
+    return ids, written
+
+
+async def _upsert_variants(db: AsyncSession, values: List[Dict[str, Any]]) -> List[int]:
+    """
+    Returns:
+        Product ID of every variant inserted or changed
+    """
+    written: List[int] = []
+    for chunk in _chunks(values):
+        stmt = insert(variants_table).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[variants_table.c.product_id, variants_table.c.size],
+            set_={"stock": stmt.excluded.stock, "updated_at": func.now()},
+            where=variants_table.c.stock.is_distinct_from(stmt.excluded.stock),
+        ).returning(variants_table.c.product_id)
+        written.extend((await db.execute(stmt)).scalars().all())
+    return written
+
+
+async def _upsert_images(db: AsyncSession, values: List[Dict[str, Any]]) -> List[int]:
+    """
+    Returns:
+        Product ID of every image inserted or changed
+    """
+    written: List[int] = []
+    for chunk in _chunks(values):
+        stmt = insert(images_table).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[images_table.c.product_id, images_table.c.image_url],
+            set_={"is_primary": stmt.excluded.is_primary},
+            where=images_table.c.is_primary.is_distinct_from(stmt.excluded.is_primary),
+        ).returning(images_table.c.product_id)
+        written.extend((await db.execute(stmt)).scalars().all())
+    return written
+
+
+async def _write_batch(
+    db: AsyncSession, rows: List[ProductImportRow], report: ImportReport
+) -> Tuple[Dict[str, int], Set[int], Set[int]]:
+    """
+    Write one batch of validated rows in a single transaction
+
+    Variants and images in the feed are upserted; existing ones that the feed
+    does not mention are kept.
+
+    Returns:
+        Tuple of (barcode -> product ID for every row, IDs of the products
+        whose own columns were written, IDs of the products with any row
+        written, including variants and images)
+    """
+    ids, written = await _upsert_products(db, rows)
+
+    variants: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    images: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    for row in rows:
+        product_id = ids[row.barcode]
+        for variant in row.variants:
+            variants[(product_id, variant.size)] = {
+                "product_id": product_id, "size": variant.size, "stock": variant.stock,
+            }
+        for image in row.images:
+            images[(product_id, image.image_url)] = {
+                "product_id": product_id, "image_url": image.image_url, "is_primary": image.is_primary,
+            }
+
+    variants_written = await _upsert_variants(db, list(variants.values()))
+    images_written = await _upsert_images(db, list(images.values()))
+    await db.commit()
+
+    report.products_written += len(written)
+    report.products_unchanged += len(rows) - len(written)
+    report.variants_written += len(variants_written)
+    report.images_written += len(images_written)
+    return ids, written, written.union(variants_written, images_written)
+
+
+async def _import_batch(
+    db: AsyncSession, batch: List[Tuple[int, ProductImportRow]], report: ImportReport
+) -> None:
+    """
+    Write a batch, falling back to one transaction per row if the batch fails
+
+    The fallback isolates the rows the database rejects so that the rest of the
+    batch is still imported. Caches and indexes are only refreshed for the
+    products the batch actually changed, so re-importing an unchanged feed
+    leaves them alone.
+    """
+    try:
+        ids, products_written, touched = await _write_batch(db, [row for _, row in batch], report)
+    except DBAPIError as e:
+        await db.rollback()
+        if len(batch) == 1:
+            line, row = batch[0]
+            report.add_error(line, row.barcode, e)
+            return
+        logger.warning(f"Product import batch failed, retrying row by row: {_error_message(e)}")
+        for item in batch:
+            await _import_batch(db, [item], report)
+        return
+
+    await invalidate_products(touched, [barcode for barcode, product_id in ids.items() if product_id in touched])
+    # The index and the delta only read product columns
+    await refresh_search_index(products_written)
+    await refresh_recommendation_delta(products_written)
+
+
+async def _load_reference_ids(db: AsyncSession) -> Tuple[Set[int], Set[int]]:
+    brand_ids = set((await db.execute(select(Brand.id))).scalars().all())
+    category_ids = set((await db.execute(select(Category.id))).scalars().all())
+    return brand_ids, category_ids
+
+
+def _check_references(row: ProductImportRow, brand_ids: Set[int], category_ids: Set[int]) -> None:
+    # 0 means "no brand/category", as in update_product
+    if row.brand_id == 0:
+        row.brand_id = None
+    if row.category_id == 0:
+        row.category_id = None
+    if row.brand_id is not None and row.brand_id not in brand_ids:
+        raise ValueError(f"Brand with ID {row.brand_id} does not exist")
+    if row.category_id is not None and row.category_id not in category_ids:
+        raise ValueError(f"Category with ID {row.category_id} does not exist")
+
+
+async def import_products(
+    db: AsyncSession,
+    stream: TextIO,
+    format: str,
+    batch_size: Optional[int] = None,
+    max_errors: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Bulk upsert products, variants and images from a CSV or JSON Lines feed
+
+    Products are matched on barcode. The feed is read as a stream and written
+    with multi-row INSERT ... ON CONFLICT statements, one transaction per batch,
+    so memory use does not grow with the size of the feed. Invalid rows are
+    reported and skipped without aborting the batch they belong to.
+
+    Args:
+        db: Database session
+        stream: Text stream with the feed contents
+        format: "csv" or "jsonl"
+        batch_size: Records per batch, defaults to PRODUCT_IMPORT_BATCH_SIZE
+        max_errors: Per-row errors kept in the report, defaults to PRODUCT_IMPORT_MAX_ERRORS
+
+    Returns:
+        Dictionary with import totals and per-row errors
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+    report = ImportReport(max_errors if max_errors is not None else settings.PRODUCT_IMPORT_MAX_ERRORS)
+    records = read_feed(stream, format)
+    brand_ids, category_ids = await _load_reference_ids(db)
+
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+
+        # Keyed by barcode: a barcode repeated within a batch keeps its last record,
+        # since one upsert statement cannot touch the same row twice
+        batch: Dict[str, Tuple[int, ProductImportRow]] = {}
+        for line, raw in chunk:
+            report.processed += 1
+            try:
+                if isinstance(raw, str):
+                    raw = json.loads(raw)
+                row = _parse_record(raw)
+                _check_references(row, brand_ids, category_ids)
+            except (ValueError, TypeError) as e:
+                barcode = raw.get("barcode") if isinstance(raw, dict) else None
+                report.add_error(line, barcode, e)
+                continue
+            batch.pop(row.barcode, None)
+            batch[row.barcode] = (line, row)
+
+        if batch:
+            await _import_batch(db, list(batch.values()), report)
+        logger.info(f"Product import: {report.processed} records processed, {report.failed} failed")
+
+    if report.products_written or report.variants_written or report.images_written:
+        invalidate_counts(PRODUCTS_NAMESPACE)
+        await bump_catalog_version()
+
+    return report.to_dict()
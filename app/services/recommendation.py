@@ -0,0 +1,757 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.text import fold_accents
+from app.services.model_artifacts import has_array_artifacts, load_array_artifacts
+
+# joblib, pandas, scipy and scikit-learn take over a second to import, so they
+# are imported where the model is loaded or scored rather than here: importing
+# the router (and with it every worker, test run or CLI) stays cheap
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+# --- Cấu hình đường dẫn đến các file model ---
+# Each version is a complete set of artifacts in MODEL_VERSIONS_DIR/<version>/
+# and CURRENT_VERSION_PATH names the version to serve. Without a CURRENT file
+# the artifacts directly in MODEL_DIR are served as the "legacy" version.
+MODEL_DIR = 'saved_model_components'
+MODEL_VERSIONS_DIR = os.path.join(MODEL_DIR, 'versions')
+CURRENT_VERSION_PATH = os.path.join(MODEL_DIR, 'CURRENT')
+LEGACY_VERSION = 'legacy'
+VECTORIZER_FILE = 'tfidf_vectorizer.joblib'
+MATRIX_FILE = 'product_tfidf_matrix.joblib'
+PRODUCT_INFO_FILE = 'product_info_df.pkl'
+# Written by app.services.recommender_training: when the products were read
+TRAINING_INFO_FILE = 'version.json'
+MODEL_FILES = (VECTORIZER_FILE, MATRIX_FILE, PRODUCT_INFO_FILE)
+
+VERSION_PATTERN = re.compile(r'^[\w.-]+$')
+
+# Weight of recent searches against the cart in a user context
+SEARCH_WEIGHT = 0.7
+
+# Contexts scored per sparse matrix product in batch scoring; bounds the size
+# of the (contexts x products) score matrix
+BATCH_CHUNK_SIZE = 128
+
+# --- Scoring executor state ---
+# Suggestions are scored in a bounded thread pool (see score_suggestions);
+# the counters are only touched on the event loop thread
+_scoring_executor: Optional[ThreadPoolExecutor] = None
+_scoring_in_flight = 0
+_scoring_rejected = 0
+
+# --- Model component state ---
+# The loaded bundle is replaced as a whole, never modified, so a request that
+# already holds it finishes on the version it started with
+_bundle: Optional[Dict[str, Any]] = None
+_reload_lock = asyncio.Lock()
+_last_error: Optional[str] = None
+# Version that last failed to load; the watcher does not retry it
+_failed_version: Optional[str] = None
+# Products changed since the loaded version was trained (a ProductDelta of
+# app.services.recommendation_delta), replaced as a whole like the bundle
+_delta = None
+
+
+def model_version_dir(version: str) -> str:
+    """
+    Directory holding the artifacts of a model version
+
+    Raises:
+        ValueError: If the version name is not a plain directory name
+    """
+    if version == LEGACY_VERSION:
+        return MODEL_DIR
+    if not VERSION_PATTERN.match(version) or version.startswith('.'):
+        raise ValueError(f"Invalid model version: {version}")
+    return os.path.join(MODEL_VERSIONS_DIR, version)
+
+
+def list_model_versions() -> List[str]:
+    """
+    Published model versions, oldest first by name
+    """
+    if not os.path.isdir(MODEL_VERSIONS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(MODEL_VERSIONS_DIR)
+        if not name.startswith('.') and os.path.isdir(os.path.join(MODEL_VERSIONS_DIR, name))
+    )
+
+
+def read_current_version() -> str:
+    """
+    The version named by the CURRENT file, or the legacy version without one
+    """
+    try:
+        with open(CURRENT_VERSION_PATH, encoding='utf-8') as f:
+            return f.read().strip() or LEGACY_VERSION
+    except FileNotFoundError:
+        return LEGACY_VERSION
+
+
+def write_current_version(version: str) -> None:
+    """
+    Point CURRENT at a version
+
+    The file is written beside CURRENT and renamed over it, so readers (the
+    watchers of other workers) never see a partial name.
+    """
+    model_version_dir(version)
+    temporary_path = f"{CURRENT_VERSION_PATH}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, CURRENT_VERSION_PATH)
+
+
+def publish_model_version(source_dir: str, version: Optional[str] = None) -> str:
+    """
+    Copy a set of artifacts into a new version directory
+
+    The files are copied into a hidden directory first and renamed into place,
+    so a version directory is always complete. The version is not activated.
+
+    Args:
+        source_dir: Directory with the model files; every file in it is copied
+        version: Version name, the current UTC time by default
+
+    Returns:
+        The published version
+
+    Raises:
+        ValueError: If files are missing or the version already exists
+    """
+    version = version or datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+    target_dir = model_version_dir(version)
+    if version == LEGACY_VERSION or os.path.exists(target_dir):
+        raise ValueError(f"Model version {version} already exists")
+    required = (VECTORIZER_FILE,) if has_array_artifacts(source_dir) else MODEL_FILES
+    missing = [name for name in required if not os.path.isfile(os.path.join(source_dir, name))]
+    if missing:
+        raise ValueError(f"Missing model files in {source_dir}: {', '.join(missing)}")
+
+    staging_dir = os.path.join(MODEL_VERSIONS_DIR, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(staging_dir)
+    try:
+        for name in os.listdir(source_dir):
+            if not name.startswith('.') and os.path.isfile(os.path.join(source_dir, name)):
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(staging_dir, name))
+        os.rename(staging_dir, target_dir)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    return version
+
+
+def load_pickled_artifacts(directory: str) -> Dict[str, Any]:
+    """
+    Product matrix, names and ID lookup from the joblib/pandas artifacts
+
+    Every worker holds its own copy of these; app.cli.export_model_arrays
+    converts them to the shared array format.
+    """
+    import joblib
+    import pandas as pd
+
+    product_matrix, term_matrix = prepare_product_matrix(joblib.load(os.path.join(directory, MATRIX_FILE)))
+    df_products = pd.read_pickle(os.path.join(directory, PRODUCT_INFO_FILE))
+    if 'product_name' not in df_products.columns:
+        raise ValueError("product_info_df has no 'product_name' column")
+
+    # Sorted product IDs for array lookups of cart items
+    if 'id' in df_products.columns:
+        sorted_product_ids, sorted_product_rows = build_id_lookup(df_products['id'].to_numpy())
+    else:
+        print("ERROR: 'id' column not found in df_products. Cart item processing might fail.")
+        sorted_product_ids, sorted_product_rows = build_id_lookup([])
+
+    return {
+        "product_tfidf_matrix": product_matrix,
+        "product_term_index": term_matrix,
+        "product_names": df_products['product_name'].to_numpy(dtype=object),
+        "sorted_product_ids": sorted_product_ids,
+        "sorted_product_rows": sorted_product_rows,
+    }
+
+
+def load_product_artifacts(directory: str) -> Dict[str, Any]:
+    """
+    Product matrices, names and ID lookup of a version directory, from the
+    array artifacts when it has them and the pickled ones otherwise
+    """
+    if has_array_artifacts(directory):
+        return load_array_artifacts(directory)
+    return load_pickled_artifacts(directory)
+
+
+def read_trained_at(directory: str) -> Optional[datetime]:
+    """
+    Database time the products of a version were read at, if it was recorded
+    """
+    try:
+        with open(os.path.join(directory, TRAINING_INFO_FILE), encoding='utf-8') as f:
+            trained_at = json.load(f).get("trained_at")
+    except FileNotFoundError:
+        return None
+    return datetime.fromisoformat(trained_at) if trained_at else None
+
+
+def load_model_bundle(version: str) -> Dict[str, Any]:
+    """
+    Load and validate the artifacts of a model version
+
+    Array artifacts (see app.services.model_artifacts) are memory-mapped and
+    preferred; otherwise the joblib matrix and pandas product_info_df are read.
+    Nothing global is changed, so a broken or half-copied version cannot affect
+    the one being served.
+
+    Raises:
+        ValueError: If the version is unknown or its artifacts are inconsistent
+    """
+    directory = model_version_dir(version)
+    if not os.path.isdir(directory):
+        raise ValueError(f"Model version {version} not found")
+    started = time.perf_counter()
+    import joblib
+
+    try:
+        vectorizer = joblib.load(os.path.join(directory, VECTORIZER_FILE))
+        artifacts = load_product_artifacts(directory)
+    except FileNotFoundError as e:
+        raise ValueError(f"Model version {version} is incomplete: {e}") from e
+    except ValueError as e:
+        raise ValueError(f"Model version {version}: {e}") from e
+    fold_vectorizer_vocabulary(vectorizer)
+
+    product_matrix = artifacts["product_tfidf_matrix"]
+    if product_matrix.shape[0] != len(artifacts["product_names"]):
+        raise ValueError(
+            f"Model version {version}: matrix has {product_matrix.shape[0]} rows "
+            f"but there are {len(artifacts['product_names'])} product names"
+        )
+    if vectorizer.vocabulary_ and max(vectorizer.vocabulary_.values()) >= product_matrix.shape[1]:
+        raise ValueError(f"Model version {version}: vectorizer vocabulary does not match the matrix columns")
+
+    bundle = {
+        "version": version,
+        "vectorizer": vectorizer,
+        **artifacts,
+        "memory_mapped": has_array_artifacts(directory),
+        "trained_at": read_trained_at(directory),
+    }
+    # Score one context end to end before the bundle can be served
+    suggest_for_contexts(bundle, [(["test"], [])], top_n=1)
+    bundle["loaded_at"] = time.time()
+    bundle["load_seconds"] = time.perf_counter() - started
+    return bundle
+
+
+def _swap_bundle(bundle: Dict[str, Any]) -> None:
+    global _bundle, _last_error, _failed_version
+    _bundle, _last_error, _failed_version = bundle, None, None
+
+
+def _record_failure(version: str, error: Exception) -> None:
+    global _last_error, _failed_version
+    _last_error, _failed_version = f"{version}: {error}", version
+
+
+# --- Load model dependencies function ---
+def load_model_components():
+    """
+    Load the current model version, keeping the loaded one if that fails
+    """
+    version = read_current_version()
+    try:
+        bundle = load_model_bundle(version)
+    except Exception as e:
+        _record_failure(version, e)
+        print(f"ERROR: Could not load model components (version {version}) - {e}")
+        print(f"Please ensure the '{MODEL_DIR}' directory (or the version directory named by CURRENT) contains:")
+        for name in MODEL_FILES:
+            print(f" - {name}")
+        return False
+
+    _swap_bundle(bundle)
+    print(f"INFO: Model components loaded successfully (version {version}, {len(bundle['product_names'])} products).")
+    return True
+
+
+async def reload_model_components(version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load a model version in a worker thread and swap it in
+
+    Requests keep being served by the loaded version while the new one loads;
+    requests already running finish on it. With a version the CURRENT file is
+    also pointed at it once it loaded, so the watchers of the other workers
+    follow; without one the version named by CURRENT is (re)loaded.
+
+    Raises:
+        ValueError: If the version cannot be loaded; the loaded one stays active
+    """
+    async with _reload_lock:
+        target = version or read_current_version()
+        try:
+            bundle = await asyncio.to_thread(load_model_bundle, target)
+        except Exception as e:
+            _record_failure(target, e)
+            raise ValueError(str(e)) from e
+        _swap_bundle(bundle)
+        if version is not None:
+            write_current_version(version)
+    print(f"INFO: Model version {target} loaded in {bundle['load_seconds']:.2f}s.")
+    return get_model_info()
+
+
+def get_model_info() -> Dict[str, Any]:
+    """
+    Loaded model version and reload state, for monitoring
+    """
+    bundle = _bundle
+    info = {
+        "ready": bundle is not None,
+        "current_version": read_current_version(),
+        "reloading": _reload_lock.locked(),
+        "last_error": _last_error,
+    }
+    if bundle is not None:
+        info.update({
+            "version": bundle["version"],
+            "loaded_at": bundle["loaded_at"],
+            "load_seconds": round(bundle["load_seconds"], 3),
+            "products": len(bundle["product_names"]),
+            "vocabulary": len(bundle["vectorizer"].vocabulary_),
+            "memory_mapped": bundle["memory_mapped"],
+        })
+        delta = get_model_delta()
+        if delta is not None and delta.version == bundle["version"]:
+            info["delta"] = delta.stats()
+    info["scoring"] = get_scoring_stats()
+    return info
+
+
+async def run_model_watcher() -> None:
+    """
+    Load the model in the background at startup, then follow CURRENT
+
+    Workers start serving (with 503 from the suggestion endpoints) without
+    waiting for the model. Afterwards CURRENT is polled every
+    RECOMMENDATION_MODEL_WATCH_SECONDS, unless RECOMMENDATION_MODEL_WATCH_ENABLED
+    is off, and the version it names is loaded when it changes. A version that
+    failed to load is not retried until CURRENT names another one. Runs until
+    cancelled; started from the application startup hook.
+    """
+    while True:
+        try:
+            version = read_current_version()
+            loaded = _bundle["version"] if _bundle is not None else None
+            if version != loaded and version != _failed_version and not _reload_lock.locked():
+                await reload_model_components()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"WARNING: Model reload failed - {e}")
+        if not settings.RECOMMENDATION_MODEL_WATCH_ENABLED:
+            return
+        await asyncio.sleep(settings.RECOMMENDATION_MODEL_WATCH_SECONDS)
+
+
+def fold_vectorizer_vocabulary(current_vectorizer):
+    """
+    Fold accents in the vocabulary so that it matches preprocess_text output
+
+    Terms that only differ by accents would collapse onto one key; the first
+    column wins and the collision is reported, since only retraining on folded
+    text can merge them properly.
+    """
+    folded = {}
+    for term, column in sorted(current_vectorizer.vocabulary_.items(), key=lambda item: item[1]):
+        folded.setdefault(fold_accents(term), column)
+    collisions = len(current_vectorizer.vocabulary_) - len(folded)
+    if collisions:
+        print(f"WARNING: {collisions} vocabulary terms collide after accent folding. Retrain the vectorizer on folded text.")
+    current_vectorizer.vocabulary_ = folded
+
+
+def get_model_components() -> Optional[Dict[str, Any]]:
+    """
+    The loaded model components, or None if loading failed
+
+    The same bundle is returned until a reload swaps it; callers should keep
+    using the one they got for the whole request. It includes the product
+    delta ("delta") built on its version, if any.
+    """
+    bundle, delta = _bundle, _delta
+    if bundle is not None and delta is not None and delta.version == bundle["version"]:
+        return {**bundle, "delta": delta}
+    return bundle
+
+
+def get_model_delta():
+    return _delta
+
+
+def set_model_delta(delta) -> None:
+    """
+    Serve a new product delta; it only applies while its version is loaded
+    """
+    global _delta
+    _delta = delta
+
+
+def preprocess_text(text):
+    if not isinstance(text, str):
+        return ""
+    text = fold_accents(text).lower()
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def prepare_product_matrix(matrix) -> Tuple["csr_matrix", "csr_matrix"]:
+    """
+    Convert the product TF-IDF matrix into the two layouts used for scoring
+
+    Rows are L2-normalized, so the dot product with a query is its cosine
+    similarity up to the query norm, which does not change the ranking.
+
+    Returns:
+        Tuple of (product x term CSR matrix for reading product rows,
+        term x product CSR matrix whose rows are posting lists for scoring)
+    """
+    from scipy.sparse import csr_matrix
+    from sklearn.preprocessing import normalize
+
+    product_matrix = normalize(csr_matrix(matrix), norm="l2", copy=False)
+    return product_matrix, product_matrix.T.tocsr()
+
+
+def build_id_lookup(product_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorted product IDs and the matrix row of each, for lookups with searchsorted
+
+    Returns:
+        Tuple of (sorted IDs, row index of each sorted ID)
+    """
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    order = np.argsort(product_ids, kind="stable")
+    return product_ids[order], order
+
+
+def lookup_rows(product_ids: Iterable[int], sorted_ids: np.ndarray, sorted_rows: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+    """
+    Matrix rows of the given product IDs
+
+    Returns:
+        Tuple of (rows of the IDs that were found, IDs that were not)
+    """
+    product_ids = np.fromiter(product_ids, dtype=np.int64)
+    if not len(product_ids) or not len(sorted_ids):
+        return np.empty(0, dtype=np.int64), product_ids.tolist()
+    positions = np.minimum(np.searchsorted(sorted_ids, product_ids), len(sorted_ids) - 1)
+    found = sorted_ids[positions] == product_ids
+    return sorted_rows[positions[found]], product_ids[~found].tolist()
+
+
+def parse_product_ids(values: Iterable[str]) -> List[int]:
+    """
+    Integer product IDs from request strings; invalid values are skipped
+    """
+    product_ids = []
+    for value in values:
+        try:
+            product_ids.append(int(value))
+        except ValueError:
+            print(f"WARNING: Cart item ID '{value}' is not a valid integer. Skipping.")
+    return product_ids
+
+
+def user_context_matrix(
+    contexts: Sequence[Tuple[Sequence[str], np.ndarray]],
+    product_matrix: "csr_matrix",
+    vectorizer,
+    search_weight: float = SEARCH_WEIGHT,
+    delta=None
+) -> "csr_matrix":
+    """
+    Sparse (contexts x vocabulary) matrix with one row per user context
+
+    A context is (recent searches, cart product rows). The searches are
+    vectorized together and weighted by search_weight; the cart is the mean of
+    its product rows, weighted by the remainder (or fully when there are no
+    searches). All search texts go through one vectorizer call and all carts
+    through one sparse averaging product; nothing is densified. Cart rows past
+    the product matrix are rows of the product delta, if one is given.
+    """
+    from scipy.sparse import csr_matrix
+
+    processed = [" ".join(preprocess_text(text) for text in search_texts) for search_texts, _ in contexts]
+    # Queries take the dtype and index width of the product matrix: scipy would
+    # otherwise convert (copy) the whole product or term matrix on every product
+    dtype, index_dtype = product_matrix.dtype, product_matrix.indices.dtype
+    search_matrix = vectorizer.transform(processed).multiply(search_weight).astype(dtype)
+
+    # Averaging matrix: row i holds the weight of each cart product of context i
+    indptr, indices, weights = [0], [], []
+    for text, (_, cart_rows) in zip(processed, contexts):
+        if len(cart_rows):
+            weight = (1 - search_weight) if text else 1.0
+            indices.append(np.asarray(cart_rows))
+            weights.append(np.full(len(cart_rows), weight / len(cart_rows)))
+        indptr.append(indptr[-1] + len(cart_rows))
+    averaging = csr_matrix(
+        (
+            np.concatenate(weights).astype(dtype) if weights else np.empty(0, dtype=dtype),
+            np.concatenate(indices).astype(index_dtype) if indices else np.empty(0, dtype=index_dtype),
+            np.asarray(indptr, dtype=index_dtype),
+        ),
+        shape=(len(contexts), product_matrix.shape[0] + (delta.rows if delta is not None else 0)),
+    )
+    if delta is None or not delta.rows:
+        return csr_matrix(search_matrix + averaging @ product_matrix, dtype=dtype)
+
+    base_rows = product_matrix.shape[0]
+    carts = averaging[:, :base_rows] @ product_matrix
+    delta_carts = delta.cart_product(averaging[:, base_rows:])
+    if delta_carts is not None:
+        carts = carts + delta_carts
+    return csr_matrix(search_matrix + carts, dtype=dtype)
+
+
+def user_context_vector(
+    search_texts: Sequence[str],
+    cart_rows: np.ndarray,
+    product_matrix: "csr_matrix",
+    vectorizer,
+    search_weight: float = SEARCH_WEIGHT
+) -> "csr_matrix":
+    """
+    Sparse (1 x vocabulary) vector describing a user's recent searches and cart
+    """
+    return user_context_matrix([(search_texts, cart_rows)], product_matrix, vectorizer, search_weight)
+
+
+def top_k_candidates(candidates: np.ndarray, values: np.ndarray, k: int) -> np.ndarray:
+    """
+    The k candidates with the highest values, best first
+
+    Uses argpartition, so only the selected candidates are sorted; ties are
+    broken by candidate so results are stable between calls.
+    """
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(values):
+        top = np.argpartition(-values, k - 1)[:k]
+    else:
+        top = np.arange(len(values))
+    return candidates[top[np.lexsort((candidates[top], -values[top]))]].astype(np.int64)
+
+
+def top_k_rows(query: "csr_matrix", term_matrix: "csr_matrix", k: int) -> np.ndarray:
+    """
+    Rows of the products most similar to a query, best first
+
+    The query is multiplied with the term x product matrix, so only the posting
+    lists of the query's terms are read and the result holds just the products
+    sharing a term with it. The top k of those are picked with argpartition
+    instead of sorting every score. Products without any common term are never
+    returned.
+    """
+    scores = (query @ term_matrix).tocsr()
+    return top_k_candidates(scores.indices, scores.data, k)
+
+
+def top_k_rows_batch(
+    queries: "csr_matrix",
+    term_matrix: "csr_matrix",
+    k: int,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    exclude: Optional[np.ndarray] = None
+) -> List[np.ndarray]:
+    """
+    top_k_rows for every row of a query matrix
+
+    Each chunk of chunk_size queries is scored with one sparse matrix-matrix
+    product; only one chunk's score matrix exists at a time.
+
+    Args:
+        exclude: Boolean mask of product rows never to return
+    """
+    results = []
+    for start in range(0, queries.shape[0], chunk_size):
+        scores = (queries[start:start + chunk_size] @ term_matrix).tocsr()
+        for row in range(scores.shape[0]):
+            begin, end = scores.indptr[row], scores.indptr[row + 1]
+            candidates, values = scores.indices[begin:end], scores.data[begin:end]
+            if exclude is not None:
+                keep = ~exclude[candidates]
+                candidates, values = candidates[keep], values[keep]
+            results.append(top_k_candidates(candidates, values, k))
+    return results
+
+
+def fallback_suggestions(current_product_names, top_n):
+    # Gợi ý ngẫu nhiên tên sản phẩm khi không có ngữ cảnh
+    sample_n = min(top_n, len(current_product_names))
+    if sample_n > 0:
+        return current_product_names[np.random.choice(len(current_product_names), sample_n, replace=False)].tolist()
+    return ["Không có gợi ý fallback nào."]
+
+
+def suggestion_names(names: Sequence[str]) -> List[str]:
+    """
+    Product names of ranked rows, without duplicates
+    """
+    unique_suggestions = []
+    for name in names:
+        if name not in unique_suggestions:
+            unique_suggestions.append(name)
+    return unique_suggestions
+
+
+def suggest_for_contexts(
+    components: Dict[str, Any],
+    contexts: Sequence[Tuple[Sequence[str], Sequence[str]]],
+    top_n: int = 10,
+    search_weight: float = SEARCH_WEIGHT,
+    chunk_size: int = BATCH_CHUNK_SIZE
+) -> List[List[str]]:
+    """
+    Search suggestions for many user contexts at once
+
+    Args:
+        components: Loaded model components (see get_model_components)
+        contexts: (recent searches, cart item IDs) per user
+        top_n: Products considered per context before removing duplicate names
+
+    Products of the delta ("delta" in components) are scored exactly and
+    merged into the ranking; the version rows they replace are skipped.
+
+    Returns:
+        List of suggestions per context, in order. Contexts without any signal,
+        or sharing no term with any product, get random fallback suggestions.
+    """
+    current_product_names = components["product_names"]
+    if current_product_names is None or len(current_product_names) == 0:
+        print("ERROR: df_products is not loaded or is invalid for suggestions.")
+        return [["Lỗi: Dữ liệu sản phẩm không có sẵn"] for _ in contexts]
+
+    delta = components.get("delta")
+    hidden = delta.hidden_base if delta is not None else None
+    resolved = []
+    for recent_searches, cart_item_ids in contexts:
+        product_ids = parse_product_ids(cart_item_ids)
+        delta_rows = np.empty(0, dtype=np.int64)
+        if delta is not None:
+            delta_rows, product_ids = delta.lookup(product_ids)
+        cart_rows, missing_ids = lookup_rows(
+            product_ids, components["sorted_product_ids"], components["sorted_product_rows"]
+        )
+        if hidden is not None:
+            cart_rows = cart_rows[~hidden[cart_rows]]
+        for item_id in missing_ids:
+            print(f"WARNING: Product ID {item_id} from cart not found in product_info_df.")
+        resolved.append((recent_searches, np.concatenate([cart_rows, delta_rows]) if len(delta_rows) else cart_rows))
+
+    product_matrix = components["product_tfidf_matrix"]
+    queries = user_context_matrix(resolved, product_matrix, components["vectorizer"], search_weight, delta)
+    ranked = top_k_rows_batch(queries, components["product_term_index"], top_n, chunk_size, exclude=hidden)
+
+    if delta is not None:
+        ranked = delta.merge_ranking(queries, ranked, product_matrix, top_n)
+        return [
+            suggestion_names(delta.names(rows, current_product_names)) if len(rows)
+            else fallback_suggestions(current_product_names, top_n)
+            for rows in ranked
+        ]
+    return [
+        suggestion_names(current_product_names[rows].tolist()) if len(rows)
+        else fallback_suggestions(current_product_names, top_n)
+        for rows in ranked
+    ]
+
+
+def _get_scoring_executor() -> ThreadPoolExecutor:
+    global _scoring_executor
+    if _scoring_executor is None:
+        _scoring_executor = ThreadPoolExecutor(
+            max_workers=settings.RECOMMENDATION_SCORING_THREADS, thread_name_prefix="recommendation-scoring"
+        )
+    return _scoring_executor
+
+
+def _scoring_done(future: asyncio.Future) -> None:
+    global _scoring_in_flight
+    _scoring_in_flight -= 1
+    # Retrieved here too, for calls whose request was cancelled meanwhile;
+    # the others raise it in score_suggestions
+    if not future.cancelled():
+        future.exception()
+
+
+async def score_suggestions(
+    components: Dict[str, Any],
+    contexts: Sequence[Tuple[Sequence[str], Sequence[str]]],
+    top_n: int = 10
+) -> Optional[List[List[str]]]:
+    """
+    suggest_for_contexts in the scoring thread pool, off the event loop
+
+    Vectorizing and sparse scoring are CPU-bound; run on the event loop, one
+    slow context would stall every other request of the worker. At most
+    RECOMMENDATION_SCORING_THREADS calls run at once and
+    RECOMMENDATION_SCORING_QUEUE_SIZE more may wait; beyond that the call is
+    rejected at once rather than queued. With RECOMMENDATION_SCORING_THREADS
+    set to 0 scoring runs inline on the event loop as before.
+
+    Returns:
+        Suggestions per context, or None if the pool and its queue are full
+    """
+    global _scoring_in_flight, _scoring_rejected
+    if settings.RECOMMENDATION_SCORING_THREADS <= 0:
+        return suggest_for_contexts(components, contexts, top_n=top_n)
+    if _scoring_in_flight >= settings.RECOMMENDATION_SCORING_THREADS + settings.RECOMMENDATION_SCORING_QUEUE_SIZE:
+        _scoring_rejected += 1
+        return None
+
+    _scoring_in_flight += 1
+    future = asyncio.get_running_loop().run_in_executor(
+        _get_scoring_executor(), suggest_for_contexts, components, contexts, top_n
+    )
+    # Released when the thread finishes, not when the request is cancelled
+    # (client disconnect): a cancelled call keeps its thread busy until then
+    future.add_done_callback(_scoring_done)
+    return await asyncio.shield(future)
+
+
+def get_scoring_stats() -> Dict[str, Any]:
+    return {
+        "threads": settings.RECOMMENDATION_SCORING_THREADS,
+        "queue_size": settings.RECOMMENDATION_SCORING_QUEUE_SIZE,
+        "in_flight": _scoring_in_flight,
+        "rejected": _scoring_rejected,
+    }
+
+
+def shutdown_scoring_executor() -> None:
+    """
+    Stop the scoring threads; queued calls are cancelled
+    """
+    global _scoring_executor
+    if _scoring_executor is not None:
+        _scoring_executor.shutdown(wait=False, cancel_futures=True)
+        _scoring_executor = None
@@ -0,0 +1,467 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import DateTime, cast, func, tuple_
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.session import async_session
+from app.models.product import Product, ProductDeletion
+from app.services import recommendation
+from app.services.recommendation import lookup_rows, prepare_product_matrix, top_k_candidates
+from app.services.recommender_training import product_rows_query, product_text
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaSegment:
+    """
+    TF-IDF rows of products written together, vectorized with the model's
+    fixed vocabulary
+    """
+
+    def __init__(self, product_ids: np.ndarray, names: np.ndarray, product_matrix: "csr_matrix", term_matrix: "csr_matrix"):
+        self.product_ids = product_ids
+        self.names = names  # object array
+        self.product_matrix = product_matrix  # rows x vocabulary
+        self.term_matrix = term_matrix  # vocabulary x rows, for scoring
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+
+class ProductDelta:
+    """
+    Products added, changed or deleted since a model version was built
+
+    Changes are appended as small segments, numbered after the rows of the
+    version's (memory-mapped) matrix. A change to a product hides its previous
+    row, in the version or an older segment; a deletion only hides. merged()
+    folds the segments into one without the hidden rows.
+
+    Never modified: every change returns a new delta that replaces the
+    previous one, so a request keeps a consistent view while updates land.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        base_rows: int,
+        segments: Tuple[DeltaSegment, ...] = (),
+        live: Optional[np.ndarray] = None,
+        hidden_base: Optional[np.ndarray] = None,
+        latest: Optional[Dict[int, int]] = None
+    ):
+        self.version = version
+        self.base_rows = base_rows
+        self.segments = segments
+        self.offsets = np.cumsum([0] + [len(segment) for segment in segments])  # segment starts, delta rows
+        self.live = live if live is not None else np.ones(0, dtype=bool)  # per delta row
+        self.hidden_base = hidden_base  # per version row, None while nothing is hidden
+        self.latest = latest or {}  # product ID -> live delta row
+
+    @property
+    def rows(self) -> int:
+        return int(self.offsets[-1])
+
+    def with_changes(
+        self,
+        vectorizer,
+        dtype,
+        changed: Sequence[Tuple[int, str, str]],
+        deleted_ids: Iterable[int],
+        sorted_product_ids: np.ndarray,
+        sorted_product_rows: np.ndarray
+    ) -> "ProductDelta":
+        """
+        A delta with changed products (id, name, text) appended as a new
+        segment and deleted products hidden
+        """
+        deleted_ids = set(deleted_ids) - {product_id for product_id, _, _ in changed}
+        touched = [product_id for product_id, _, _ in changed] + list(deleted_ids)
+        if not touched:
+            return self
+
+        live = self.live.copy()
+        latest = dict(self.latest)
+        for product_id in touched:
+            row = latest.pop(product_id, None)
+            if row is not None:
+                live[row] = False
+
+        hidden_base = self.hidden_base
+        base_rows, _ = lookup_rows(touched, sorted_product_ids, sorted_product_rows)
+        if len(base_rows):
+            hidden_base = hidden_base.copy() if hidden_base is not None else np.zeros(self.base_rows, dtype=bool)
+            hidden_base[base_rows] = True
+
+        segments = self.segments
+        if changed:
+            product_matrix, term_matrix = prepare_product_matrix(
+                vectorizer.transform([text for _, _, text in changed]).astype(dtype)
+            )
+            segment = DeltaSegment(
+                np.array([product_id for product_id, _, _ in changed], dtype=np.int64),
+                np.array([name for _, name, _ in changed], dtype=object),
+                product_matrix,
+                term_matrix,
+            )
+            for position, product_id in enumerate(segment.product_ids.tolist()):
+                latest[product_id] = self.rows + position
+            segments = segments + (segment,)
+            live = np.concatenate([live, np.ones(len(segment), dtype=bool)])
+
+        return ProductDelta(self.version, self.base_rows, segments, live, hidden_base, latest)
+
+    def merged(self) -> "ProductDelta":
+        """
+        The same delta with all live rows in one segment
+        """
+        if len(self.segments) <= 1 and self.live.all():
+            return self
+        from scipy.sparse import vstack
+
+        parts = []
+        for segment, offset in zip(self.segments, self.offsets):
+            keep = np.flatnonzero(self.live[offset:offset + len(segment)])
+            if len(keep):
+                parts.append((segment, keep))
+        if not parts:
+            return ProductDelta(self.version, self.base_rows, hidden_base=self.hidden_base)
+
+        product_matrix, term_matrix = prepare_product_matrix(
+            vstack([segment.product_matrix[keep] for segment, keep in parts], format="csr")
+        )
+        segment = DeltaSegment(
+            np.concatenate([segment.product_ids[keep] for segment, keep in parts]),
+            np.concatenate([segment.names[keep] for segment, keep in parts]),
+            product_matrix,
+            term_matrix,
+        )
+        latest = {product_id: row for row, product_id in enumerate(segment.product_ids.tolist())}
+        return ProductDelta(self.version, self.base_rows, (segment,), np.ones(len(segment), dtype=bool), self.hidden_base, latest)
+
+    def lookup(self, product_ids: Sequence[int]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Rows (numbered after the version's rows) of products in the delta
+
+        Returns:
+            Tuple of (rows of the products found, IDs of the others)
+        """
+        rows, others = [], []
+        for product_id in product_ids:
+            row = self.latest.get(product_id)
+            if row is None:
+                others.append(product_id)
+            else:
+                rows.append(self.base_rows + row)
+        return np.array(rows, dtype=np.int64), others
+
+    def _locate(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Segment and row within it of delta rows
+        local = rows - self.base_rows
+        segment = np.searchsorted(self.offsets, local, side="right") - 1
+        return segment, local - self.offsets[segment]
+
+    def cart_product(self, averaging: "csr_matrix") -> "csr_matrix":
+        """
+        averaging @ the delta rows, for an averaging matrix whose columns are
+        the delta rows
+        """
+        total = None
+        for segment, offset in zip(self.segments, self.offsets):
+            part = averaging[:, offset:offset + len(segment)]
+            if part.nnz:
+                product = part @ segment.product_matrix
+                total = product if total is None else total + product
+        return total
+
+    def top_k(self, queries: "csr_matrix", k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (rows, scores) of the best k live delta products for each query
+        """
+        candidates = [[] for _ in range(queries.shape[0])]
+        for segment, offset in zip(self.segments, self.offsets):
+            scores = (queries @ segment.term_matrix).tocsr()
+            for row in range(scores.shape[0]):
+                begin, end = scores.indptr[row], scores.indptr[row + 1]
+                if begin < end:
+                    rows = scores.indices[begin:end] + offset
+                    keep = self.live[rows]
+                    candidates[row].append((rows[keep], scores.data[begin:end][keep]))
+
+        results = []
+        for parts in candidates:
+            if not parts:
+                results.append((np.empty(0, dtype=np.int64), np.empty(0)))
+                continue
+            rows = np.concatenate([rows for rows, _ in parts])
+            values = np.concatenate([values for _, values in parts])
+            top = top_k_candidates(np.arange(len(values)), values, k)
+            results.append((rows[top] + self.base_rows, values[top]))
+        return results
+
+    def merge_ranking(
+        self, queries: "csr_matrix", ranked: List[np.ndarray], product_matrix: "csr_matrix", k: int
+    ) -> List[np.ndarray]:
+        """
+        Merge version rows ranked without the delta with the best delta rows
+
+        The version rows are few (k per query), so their scores are recomputed
+        exactly rather than carried through the ranking.
+        """
+        if not self.rows:
+            return ranked
+        merged = []
+        for row, (base_rows, (delta_rows, delta_scores)) in enumerate(zip(ranked, self.top_k(queries, k))):
+            if not len(delta_rows):
+                merged.append(base_rows)
+                continue
+            base_scores = (
+                np.asarray((product_matrix[base_rows] @ queries[row].T).todense()).ravel()
+                if len(base_rows) else np.empty(0)
+            )
+            merged.append(top_k_candidates(
+                np.concatenate([base_rows, delta_rows]), np.concatenate([base_scores, delta_scores]), k
+            ))
+        return merged
+
+    def names(self, rows: np.ndarray, base_names) -> List[str]:
+        """
+        Names of rows from the version or the delta, in order
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        names = [None] * len(rows)
+        in_base = rows < self.base_rows
+        for position, name in zip(np.flatnonzero(in_base), base_names[rows[in_base]].tolist() if in_base.any() else []):
+            names[position] = name
+        if not in_base.all():
+            positions = np.flatnonzero(~in_base)
+            for position, segment, local in zip(positions, *self._locate(rows[positions])):
+                names[position] = self.segments[segment].names[local]
+        return names
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "segments": len(self.segments),
+            "rows": self.rows,
+            "live_rows": int(self.live.sum()),
+            "hidden_version_rows": int(self.hidden_base.sum()) if self.hidden_base is not None else 0,
+        }
+
+
+_delta_lock = asyncio.Lock()
+_watermark: Optional[datetime] = None
+_deletion_watermark: Optional[datetime] = None
+# updated_at (deleted_at) already applied per product, for rows read again in
+# the overlap
+_applied: Dict[int, datetime] = {}
+_applied_deletions: Dict[int, datetime] = {}
+_last_merge = 0.0
+
+
+def _current_delta(bundle: Dict[str, Any]) -> Optional[ProductDelta]:
+    delta = recommendation.get_model_delta()
+    if delta is not None and delta.version == bundle["version"]:
+        return delta
+    return None
+
+
+async def _reset_delta(db, bundle: Dict[str, Any]) -> ProductDelta:
+    # A new version starts with an empty delta; changes are read from the
+    # moment it was trained, or from now for versions that do not record it
+    global _watermark, _deletion_watermark, _last_merge
+    _watermark = bundle.get("trained_at") or (await db.execute(select(cast(func.now(), DateTime)))).scalar()
+    _deletion_watermark = _watermark
+    _applied.clear()
+    _applied_deletions.clear()
+    _last_merge = time.monotonic()
+    delta = ProductDelta(bundle["version"], len(bundle["product_names"]))
+    recommendation.set_model_delta(delta)
+    return delta
+
+
+def _changed_rows_query():
+    return product_rows_query().add_columns(Product.updated_at)
+
+
+def _build_delta(bundle: Dict[str, Any], delta: ProductDelta, rows, deleted_ids: Iterable[int]) -> ProductDelta:
+    # rows are from _changed_rows_query
+    changed = [
+        (product_id, name, product_text(name, description, brand, category))
+        for product_id, name, description, brand, category, _ in rows
+    ]
+    delta = delta.with_changes(
+        bundle["vectorizer"],
+        bundle["product_tfidf_matrix"].dtype,
+        changed,
+        deleted_ids,
+        bundle["sorted_product_ids"],
+        bundle["sorted_product_rows"],
+    )
+    if len(delta.segments) > settings.RECOMMENDATION_DELTA_MAX_SEGMENTS:
+        delta = delta.merged()
+    return delta
+
+
+async def _apply(bundle: Dict[str, Any], delta: ProductDelta, rows, deleted_ids: Iterable[int] = ()) -> ProductDelta:
+    # Vectorizing, copying the hidden rows and merging take time proportional
+    # to the rows or the model, so the new delta is built in a worker thread;
+    # suggestions keep using the current one until it is swapped in
+    delta = await asyncio.to_thread(_build_delta, bundle, delta, rows, list(deleted_ids))
+    recommendation.set_model_delta(delta)
+    for row in rows:
+        _applied[row.id] = row.updated_at
+    return delta
+
+
+async def refresh_recommendation_delta(product_ids: Iterable[int]) -> None:
+    """
+    Re-vectorize the given products after a committed write
+
+    Makes the change visible to suggestions of this worker at once; the other
+    workers pick it up when they poll. Products that no longer exist are hidden.
+    Failures are logged rather than raised since the write itself succeeded.
+    """
+    product_ids = set(product_ids)
+    bundle = recommendation.get_model_components()
+    if not product_ids or bundle is None or not settings.RECOMMENDATION_DELTA_ENABLED:
+        return
+
+    try:
+        async with _delta_lock:
+            async with async_session() as db:
+                delta = _current_delta(bundle) or await _reset_delta(db, bundle)
+                result = await db.execute(_changed_rows_query().where(Product.id.in_(product_ids)))
+                rows = result.all()
+            await _apply(bundle, delta, rows, product_ids - {row[0] for row in rows})
+    except Exception as e:
+        logger.warning(f"Could not refresh recommendations for {len(product_ids)} products: {e}")
+
+
+async def poll_recommendation_delta() -> int:
+    """
+    Apply products written or deleted since the last poll, by any worker or
+    import
+
+    Reads products by (updated_at, id), then product_deletions by
+    (deleted_at, product_id), in batches of RECOMMENDATION_DELTA_BATCH_SIZE,
+    skipping rows already applied.
+
+    Returns:
+        Number of products applied
+    """
+    global _watermark, _deletion_watermark
+    bundle = recommendation.get_model_components()
+    if bundle is None:
+        return 0
+
+    applied = 0
+    async with _delta_lock:
+        async with async_session() as db:
+            delta = _current_delta(bundle) or await _reset_delta(db, bundle)
+            # Read again from a little before the newest change seen: updated_at
+            # is the transaction start, so a late commit can carry an older one
+            overlap = timedelta(seconds=settings.RECOMMENDATION_DELTA_OVERLAP_SECONDS)
+            position = (_watermark - overlap, 0)
+            while True:
+                result = await db.execute(
+                    _changed_rows_query()
+                    .where(tuple_(Product.updated_at, Product.id) > tuple_(*position))
+                    .order_by(None)
+                    .order_by(Product.updated_at, Product.id)
+                    .limit(settings.RECOMMENDATION_DELTA_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                position = (rows[-1].updated_at, rows[-1].id)
+                fresh = [row for row in rows if _applied.get(row.id) != row.updated_at]
+                if fresh:
+                    delta = await _apply(bundle, delta, fresh)
+                    applied += len(fresh)
+                _watermark = max(_watermark, rows[-1].updated_at)
+                if len(rows) < settings.RECOMMENDATION_DELTA_BATCH_SIZE:
+                    break
+
+            # Deletions are read the same way, after the writes that preceded them
+            position = (_deletion_watermark - overlap, 0)
+            while True:
+                result = await db.execute(
+                    select(ProductDeletion.product_id, ProductDeletion.deleted_at)
+                    .where(tuple_(ProductDeletion.deleted_at, ProductDeletion.product_id) > tuple_(*position))
+                    .order_by(ProductDeletion.deleted_at, ProductDeletion.product_id)
+                    .limit(settings.RECOMMENDATION_DELTA_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                position = (rows[-1].deleted_at, rows[-1].product_id)
+                fresh = [row for row in rows if _applied_deletions.get(row.product_id) != row.deleted_at]
+                if fresh:
+                    delta = await _apply(bundle, delta, [], [row.product_id for row in fresh])
+                    applied += len(fresh)
+                    _applied_deletions.update((row.product_id, row.deleted_at) for row in fresh)
+                _deletion_watermark = max(_deletion_watermark, rows[-1].deleted_at)
+                if len(rows) < settings.RECOMMENDATION_DELTA_BATCH_SIZE:
+                    break
+
+        # Only rows inside the overlap can be read again
+        _prune_applied(_applied, _watermark - overlap)
+        _prune_applied(_applied_deletions, _deletion_watermark - overlap)
+    return applied
+
+
+def _prune_applied(applied: Dict[int, datetime], horizon: datetime) -> None:
+    for product_id in [product_id for product_id, at in applied.items() if at <= horizon]:
+        del applied[product_id]
+
+
+async def merge_recommendation_delta() -> Dict[str, Any]:
+    """
+    Fold the delta segments into one
+
+    The merge runs in a worker thread; suggestions keep using the current
+    delta until the merged one is swapped in.
+    """
+    global _last_merge
+    bundle = recommendation.get_model_components()
+    if bundle is None:
+        return {}
+
+    async with _delta_lock:
+        delta = _current_delta(bundle)
+        if delta is None:
+            async with async_session() as db:
+                delta = await _reset_delta(db, bundle)
+        delta = await asyncio.to_thread(delta.merged)
+        recommendation.set_model_delta(delta)
+        _last_merge = time.monotonic()
+    return delta.stats()
+
+
+async def run_recommendation_delta() -> None:
+    """
+    Poll for product changes every RECOMMENDATION_DELTA_POLL_SECONDS and merge
+    the delta every RECOMMENDATION_DELTA_MERGE_SECONDS
+
+    Runs until cancelled; started from the application startup hook.
+    """
+    while True:
+        await asyncio.sleep(settings.RECOMMENDATION_DELTA_POLL_SECONDS)
+        try:
+            await poll_recommendation_delta()
+            if time.monotonic() - _last_merge >= settings.RECOMMENDATION_DELTA_MERGE_SECONDS:
+                await merge_recommendation_delta()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Recommendation delta update failed: {e}")
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from array import array
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import DateTime, cast, func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.brand import Brand
+from app.models.category import Category
+from app.models.product import Product
+from app.services.model_artifacts import PackedStrings, export_array_artifacts
+from app.services.recommendation import (
+    MODEL_DIR,
+    TRAINING_INFO_FILE,
+    VECTORIZER_FILE,
+    build_id_lookup,
+    prepare_product_matrix,
+    preprocess_text,
+    publish_model_version,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def product_rows_query():
+    """
+    (id, name, description, brand, category) of every product, by ID
+    """
+    # Ordered by ID so that both passes see the products in the same order
+    return (
+        select(Product.id, Product.product_name, Product.description, Brand.brand_name, Category.category_name)
+        .outerjoin(Brand, Brand.id == Product.brand_id)
+        .outerjoin(Category, Category.id == Product.category_id)
+        .order_by(Product.id)
+    )
+
+
+def product_text(name: Optional[str], description: Optional[str], brand: Optional[str], category: Optional[str]) -> str:
+    """
+    Text a product is vectorized from, folded like the queries at serving time
+    """
+    return preprocess_text(" ".join(part for part in (name, brand, category, description) if part))
+
+
+async def _stream_products(db: AsyncSession, batch_size: int) -> AsyncIterator[List[Tuple[int, str, str]]]:
+    """
+    Batches of (id, name, text), read with a server-side cursor
+    """
+    result = await db.stream(product_rows_query().execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield [
+            (product_id, name, product_text(name, description, brand, category))
+            for product_id, name, description, brand, category in rows
+        ]
+
+
+class _Stages:
+    """
+    Wall time per training stage, logged as each one finishes
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    def done(self, stage: str, detail: str = "") -> None:
+        now = time.perf_counter()
+        self.seconds[stage] = round(now - self._started, 2)
+        self._started = now
+        logger.info(f"{stage}: {self.seconds[stage]:.2f}s {detail}".rstrip())
+
+
+async def train_recommender(
+    db: AsyncSession,
+    version: Optional[str] = None,
+    min_df: int = 1,
+    max_df: float = 1.0,
+    max_features: Optional[int] = None,
+    batch_size: int = 5000
+) -> Dict[str, Any]:
+    """
+    Train the suggestion model on the products table and publish it as a version
+
+    The catalog is streamed twice and never held as a list of texts: the first
+    pass counts document frequencies and keeps only IDs and names (packed
+    UTF-8), the second vectorizes one batch at a time into growing CSR arrays.
+    Run it in a REPEATABLE READ transaction so both passes see the same rows.
+    The result is the vectorizer plus array artifacts and the database time
+    the products were read at, from which served models pick up later changes
+    (see app.services.recommendation_delta); it is not activated.
+
+    Args:
+        min_df: Minimum number of products a term must appear in
+        max_df: Maximum share of products a term may appear in
+        max_features: Keep only this many terms, the most frequent by products
+
+    Returns:
+        Version, sizes and seconds per stage
+
+    Raises:
+        ValueError: If there are no products or no term survives the limits
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    stages = _Stages()
+    # Transaction start, so never later than the snapshot the passes read
+    trained_at = (await db.execute(select(cast(func.now(), DateTime)))).scalar()
+    vectorizer = TfidfVectorizer(dtype=np.float32)
+    analyze = vectorizer.build_analyzer()
+
+    # Pass 1: document frequencies, IDs and names
+    document_frequency: Counter = Counter()
+    product_ids = array('q')
+    names, name_offsets = bytearray(), array('q', [0])
+    async for batch in _stream_products(db, batch_size):
+        for product_id, name, text in batch:
+            document_frequency.update(set(analyze(text)))
+            product_ids.append(product_id)
+            names += (name or "").encode('utf-8')
+            name_offsets.append(len(names))
+    products = len(product_ids)
+    if not products:
+        raise ValueError("No products to train on")
+    stages.done("document frequencies", f"({products} products, {len(document_frequency)} terms)")
+
+    # Vocabulary and idf, as TfidfVectorizer.fit would compute them
+    max_count = max_df * products
+    terms = [term for term, count in document_frequency.items() if min_df <= count <= max_count]
+    if max_features is not None and len(terms) > max_features:
+        terms.sort(key=lambda term: -document_frequency[term])
+        terms = terms[:max_features]
+    if not terms:
+        raise ValueError("No terms left after applying min_df, max_df and max_features")
+    terms.sort()
+    counts = np.array([document_frequency[term] for term in terms], dtype=np.float64)
+    del document_frequency
+    vectorizer.vocabulary_ = {term: column for column, term in enumerate(terms)}
+    vectorizer.fixed_vocabulary_ = False
+    vectorizer.idf_ = (np.log((1 + products) / (1 + counts)) + 1).astype(np.float32)
+    stages.done("vocabulary", f"({len(terms)} terms)")
+
+    # Pass 2: TF-IDF rows, appended batch by batch
+    data, indices, indptr = array('f'), array('i'), array('q', [0])
+    position = 0
+    async for batch in _stream_products(db, batch_size):
+        batch_ids = [product_id for product_id, _, _ in batch]
+        if product_ids[position:position + len(batch_ids)].tolist() != batch_ids:
+            raise ValueError("Products changed between the two passes; run in a REPEATABLE READ transaction")
+        position += len(batch_ids)
+        rows = vectorizer.transform([text for _, _, text in batch])
+        data.frombytes(rows.data.astype(np.float32).tobytes())
+        indices.frombytes(rows.indices.astype(np.int32).tobytes())
+        indptr.frombytes((rows.indptr[1:].astype(np.int64) + indptr[-1]).tobytes())
+    if position != products:
+        raise ValueError("Products changed between the two passes; run in a REPEATABLE READ transaction")
+
+    from scipy.sparse import csr_matrix
+
+    matrix = csr_matrix(
+        (np.frombuffer(data, dtype=np.float32), np.frombuffer(indices, dtype=np.int32), np.frombuffer(indptr, dtype=np.int64)),
+        shape=(products, len(terms)),
+    )
+    product_matrix, term_matrix = prepare_product_matrix(matrix)
+    stages.done("matrix", f"({product_matrix.nnz} non-zeros)")
+
+    sorted_product_ids, sorted_product_rows = build_id_lookup(np.frombuffer(product_ids, dtype=np.int64))
+    product_names = PackedStrings(np.frombuffer(names, dtype=np.uint8), np.frombuffer(name_offsets, dtype=np.int64))
+    stages.done("id map")
+
+    import joblib
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix='.train-', dir=MODEL_DIR)
+    try:
+        joblib.dump(vectorizer, os.path.join(staging_dir, VECTORIZER_FILE))
+        with open(os.path.join(staging_dir, TRAINING_INFO_FILE), 'w', encoding='utf-8') as f:
+            json.dump({"trained_at": trained_at.isoformat(), "products": products}, f)
+        manifest = export_array_artifacts(
+            staging_dir, product_matrix, term_matrix, sorted_product_ids, sorted_product_rows, product_names
+        )
+        version = publish_model_version(staging_dir, version)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    stages.done("write", f"(version {version})")
+
+    return {
+        "version": version,
+        "trained_at": trained_at.isoformat(),
+        "products": products,
+        "terms": len(terms),
+        "nnz": int(product_matrix.nnz),
+        "bytes": manifest["bytes"],
+        "stage_seconds": stages.seconds,
+    }
@@ -3,9 +3,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import or_, and_, func, desc, update, delete
 
-from app.models.product import Product, Category, Brand
-from app.models.user import SearchHistory
-from app.schemas.search import SearchHistoryCreate
+from app.models.product import Product
+from app.models.search_history import SearchHistory
+from app.core.cache import normalize_search_term
+from app.core.config import settings
+from app.services.count_cache import PRODUCTS_NAMESPACE, count_query_rows
+from app.services.facets import compute_facets
+from app.services.full_text import (
+    product_fuzzy_condition,
+    product_fuzzy_rank,
+    product_search_condition,
+    product_search_rank,
+    set_fuzzy_threshold,
+)
+from app.services.hydration import hydrate_products
+from app.services.search_cache import get_or_compute_search
+from app.services.search_log import enqueue_search_log
+from app.services.trending import get_trending
 
 
 async def search_products(
@@ -16,25 +30,89 @@ async def search_products(
     brand_id: Optional[int] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    sort_by: str = "relevance",  # relevance, price_asc, price_desc, name_asc
+    sort_by: str = "relevance",  # relevance, price_asc, price_desc, name_asc, name_desc
+    include_details: bool = False,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    count_mode: str = "exact",
+    include_facets: bool = False
 ) -> Dict[str, Any]:
     """
     Search for products with various filtering and sorting options
+
+    Matching uses the full-text index on product name and description (web
+    search syntax) plus an exact barcode match; relevance is ts_rank. When that
+    finds fewer than SEARCH_FUZZY_MIN_RESULTS products, the search switches to
+    trigram word similarity on the product name so that typos still match;
+    "match" in the response tells which one was used.
+
+    With include_facets, "facets" carries brand, category and price bucket
+    counts over the whole result set, using the same matcher.
+
+    Results are cached per normalized query and options for
+    SEARCH_CACHE_TTL_SECONDS or until the catalog changes (see
+    get_or_compute_search); the search is still logged for every request,
+    through the background history writer.
     """
-    # Format the search term for LIKE queries
-    search_term = f"%{query}%"
-
-    # Build the base search condition
-    search_condition = or_(
-        Product.product_name.ilike(search_term),
-        Product.description.ilike(search_term),
-        Product.barcode == query  # Exact match for barcode
-    )
+    async def compute() -> Dict[str, Any]:
+        return await _run_search(
+            db, query, category_id, brand_id, min_price, max_price,
+            sort_by, include_details, limit, offset, count_mode, include_facets
+        )
 
-    # Add additional filters
-    filters = [search_condition]
+    if settings.SEARCH_CACHE_ENABLED:
+        params = {
+            "query": normalize_search_term(query),
+            "category_id": category_id,
+            "brand_id": brand_id,
+            "min_price": min_price,
+            "max_price": max_price,
+            "sort_by": sort_by,
+            "include_details": include_details,
+            "limit": limit,
+            "offset": offset,
+            "count_mode": count_mode,
+            "include_facets": include_facets,
+        }
+        result = await get_or_compute_search(params, compute)
+    else:
+        result = await compute()
+
+    # If user is authenticated, log the search
+    if user_id:
+        # Only log searches that returned results or had a meaningful query
+        if len(query.strip()) > 2 and (result["total"] > 0 or len(result["items"]) > 0):
+            selected_product_id = result["items"][0]["id"] if result["items"] else None
+            enqueue_search_log(
+                user_id=user_id,
+                search_query=query,
+                result_count=result["total"],
+                selected_product_id=selected_product_id
+            )
+
+    # Cached results are shared between spellings of the same query
+    return {**result, "query": query}
+
+
+async def _run_search(
+    db: AsyncSession,
+    query: str,
+    category_id: Optional[int],
+    brand_id: Optional[int],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    sort_by: str,
+    include_details: bool,
+    limit: int,
+    offset: int,
+    count_mode: str,
+    include_facets: bool
+) -> Dict[str, Any]:
+    """
+    Run a product search against the database (see search_products)
+    """
+    # Filters other than the text match
+    filters = []
 
     if category_id:
         filters.append(Product.category_id == category_id)
@@ -43,61 +121,91 @@ async def search_products(
         filters.append(Product.brand_id == brand_id)
 
     if min_price is not None:
-        filters.append(Product.default_price >= min_price)
+        filters.append(Product.price >= min_price)
 
     if max_price is not None:
-        filters.append(Product.default_price <= max_price)
+        filters.append(Product.price <= max_price)
+
+    count_filters = {
+        "query": normalize_search_term(query),
+        "category_id": category_id,
+        "brand_id": brand_id,
+        "min_price": min_price,
+        "max_price": max_price,
+    }
 
     # Count total results
-    count_result = await db.execute(
-        select(func.count()).select_from(
-            select(Product).where(and_(*filters)).subquery()
-        )
+    match = "full_text"
+    match_filters = {"scope": "search", **count_filters}
+    filters.append(product_search_condition(query))
+    total_count, total_exact = await count_query_rows(
+        db,
+        select(Product).where(and_(*filters)),
+        PRODUCTS_NAMESPACE,
+        match_filters,
+        mode=count_mode,
     )
-    total_count = count_result.scalar_one()
+
+    # Too few full-text hits: add typo-tolerant matches on the name. The
+    # decision depends only on the full-text count, so every page of a result
+    # set uses the same matcher.
+    if total_count < settings.SEARCH_FUZZY_MIN_RESULTS:
+        match = "fuzzy"
+        filters[-1] = or_(product_search_condition(query), product_fuzzy_condition(query))
+        match_filters = {"scope": "search_fuzzy", "threshold": settings.SEARCH_FUZZY_SIMILARITY_THRESHOLD, **count_filters}
+        await set_fuzzy_threshold(db, settings.SEARCH_FUZZY_SIMILARITY_THRESHOLD)
+        total_count, total_exact = await count_query_rows(
+            db,
+            select(Product).where(and_(*filters)),
+            PRODUCTS_NAMESPACE,
+            match_filters,
+            mode=count_mode,
+        )
+
+    facets = None
+    if include_facets:
+        facets = await compute_facets(db, select(Product).where(and_(*filters)), PRODUCTS_NAMESPACE, match_filters)
 
     # Determine sorting
     if sort_by == "price_asc":
-        order_clause = Product.default_price.asc()
+        order_clause = [Product.price.asc()]
     elif sort_by == "price_desc":
-        order_clause = Product.default_price.desc()
+        order_clause = [Product.price.desc()]
     elif sort_by == "name_asc":
-        order_clause = Product.product_name.asc()
-    else:  # Default to relevance
-        # For relevance, we could use a more sophisticated ranking algorithm
-        # Here we'll just use the name match as primary factor
-        order_clause = Product.product_name.ilike(f"{query}%").desc()
-
-    # Execute the query with sorting
+        order_clause = [Product.product_name.asc()]
+    elif sort_by == "name_desc":
+        order_clause = [Product.product_name.desc()]
+    elif match == "fuzzy":  # Default to relevance
+        # Full-text hits first, then the closest spellings
+        order_clause = [product_search_condition(query).desc(), product_fuzzy_rank(query).desc()]
+    else:
+        order_clause = [product_search_rank(query).desc()]
+
+    # Execute the query with sorting; id keeps pages stable between ties
     result = await db.execute(
         select(Product)
         .where(and_(*filters))
-        .order_by(order_clause)
+        .order_by(*order_clause, Product.id)
         .limit(limit)
         .offset(offset)
     )
 
     products = result.scalars().all()
 
-    # If user is authenticated, log the search
-    if user_id:
-        # Only log searches that returned results or had a meaningful query
-        if len(query.strip()) > 2 and (total_count > 0 or len(products) > 0):
-            selected_product_id = products[0].id if products else None
-            await log_search_history(
-                db=db,
-                user_id=user_id,
-                search_query=query,
-                result_count=total_count,
-                selected_product_id=selected_product_id
-            )
+    # Variants and images are only loaded when details are requested
+    items = await hydrate_products(
+        db, products, include_variants=include_details, include_images=include_details
+    )
 
     return {
-        "items": products,
+        "items": items,
         "total": total_count,
+        "total_exact": total_exact,
         "limit": limit,
         "offset": offset,
         "query": query,
+        "match": match,
+        "facets": facets,
         "filters": {
             "category_id": category_id,
             "brand_id": brand_id,
@@ -106,29 +214,6 @@ async def search_products(
     }
 
 
-async def log_search_history(
-    db: AsyncSession,
-    user_id: int,
-    search_query: str,
-    result_count: int,
-    selected_product_id: Optional[int] = None
-) -> SearchHistory:
-    """
-    Log a search query to user's search history
-    """
-    db_search_history = SearchHistory(
-        user_id=user_id,
-        search_query=search_query,
-        result_count=result_count,
-        selected_product_id=selected_product_id
-    )
-    db.add(db_search_history)
-    await db.commit()
-    await db.refresh(db_search_history)
-
-    return db_search_history
-
-
 async def get_user_search_history(
     db: AsyncSession,
     user_id: int,
@@ -173,31 +258,8 @@ async def clear_search_history(db: AsyncSession, user_id: int) -> int:
 async def get_trending_searches(db: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
     """
     Get trending searches based on frequency and recency
-    """
-    # This is a simplified implementation. In a real app, we would use a more sophisticated
-    # algorithm that considers both frequency and recency.
-
-    from datetime import datetime, timedelta
-
-    # Get searches from the last 7 days
-    cutoff_date = datetime.utcnow() - timedelta(days=7)
 
-    result = await db.execute(
-        select(
-            SearchHistory.search_query,
-            func.count(SearchHistory.id).label("count")
-        )
-        .where(SearchHistory.search_date >= cutoff_date)
-        .group_by(SearchHistory.search_query)
-        .order_by(desc("count"))
-        .limit(limit)
-    )
-
-    trending = []
-    for row in result:
-        trending.append({
-            "query": row.search_query,
-            "count": row.count
-        })
-
-    return trending
\ No newline at end of file
+    Served from the hourly rollup maintained by app.services.search_log, with older
+    buckets decayed (see app.services.trending).
+    """
+    return await get_trending(db, limit)
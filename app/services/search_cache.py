@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core.cache import NamespacedTTLCache, normalize_params
+from app.core.config import settings
+from app.services.catalog_version import get_catalog_version
+
+SEARCH_NAMESPACE = "search"
+
+search_cache = NamespacedTTLCache(
+    maxsize=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl=settings.SEARCH_CACHE_TTL_SECONDS,
+)
+
+# Searches currently running, by cache key; concurrent misses on the same key
+# wait for the first one instead of querying the database again
+_in_flight: Dict[str, asyncio.Future] = {}
+_stats = {"coalesced": 0}
+
+
+async def get_or_compute_search(
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    Return a cached search result, computing it once on a miss
+
+    The catalog version is part of the key, so a product write on any worker
+    makes earlier results unreachable. Without a shared version (no Redis, see
+    get_catalog_version) results are not cached at all, since writes through
+    other workers could not invalidate them. Concurrent misses for the same key
+    share a single computation. Callers must not modify the returned dictionary.
+
+    Args:
+        params: Normalized search parameters identifying the result
+        compute: Runs the search; only called by the first of concurrent misses
+    """
+    version = await get_catalog_version()
+    if version is None:
+        return await compute()
+    params = {**params, "catalog_version": version}
+    key = normalize_params(params)
+
+    while True:
+        cached = search_cache.get(SEARCH_NAMESPACE, params)
+        if cached is not None:
+            return cached
+
+        pending = _in_flight.get(key)
+        if pending is None:
+            break
+        _stats["coalesced"] += 1
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # The first request was cancelled (e.g. client disconnected);
+            # retry, becoming the one that computes if nobody else did
+            if pending.cancelled():
+                continue
+            raise
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        result = await compute()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved in case nobody was waiting
+        future.exception()
+        raise
+    else:
+        search_cache.set(SEARCH_NAMESPACE, params, result)
+        future.set_result(result)
+        return result
+    finally:
+        _in_flight.pop(key, None)
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the search result cache
+    """
+    return {
+        **search_cache.stats(),
+        "in_flight": len(_in_flight),
+        "coalesced": _stats["coalesced"],
+    }
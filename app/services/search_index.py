@@ -0,0 +1,466 @@
+import asyncio
+import heapq
+import logging
+import math
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.text import fold_accents
+from app.db.session import async_session
+from app.models.brand import Brand
+from app.models.category import Category
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("and", "or")
+
+# Term frequencies are weighted per field (BM25F style), so a name match counts
+# more than a description match
+FIELD_WEIGHTS = {"name": 3.0, "brand": 2.0, "category": 1.5, "description": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Most frequent vocabulary terms a trailing prefix expands to; shorter
+# prefixes only match whole terms since they would expand to most of the index
+MAX_PREFIX_EXPANSIONS = 64
+MIN_PREFIX_LENGTH = 2
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into accent-folded, lowercase word tokens
+    """
+    return _TOKEN_RE.findall(fold_accents(text).lower()) if text else []
+
+
+class InvertedIndex:
+    """
+    Memory-resident BM25 index over product name, description, brand and category
+
+    Postings are kept per term as a sorted array of product IDs with parallel
+    arrays of weighted term frequencies and document lengths (12 bytes per
+    posting). Scoring reads them through numpy without copying, so even terms
+    found in most products are ranked in a few milliseconds.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}
+        self._frequencies: Dict[str, array] = {}
+        self._lengths: Dict[str, array] = {}
+        # Sorted vocabulary for prefix lookups
+        self._terms: List[str] = []
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._names: Dict[int, str] = {}
+        self._total_length = 0.0
+        self._max_id = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(
+        self,
+        product_id: int,
+        name: Optional[str],
+        description: Optional[str] = None,
+        brand: Optional[str] = None,
+        category: Optional[str] = None,
+        sort_terms: bool = True
+    ) -> None:
+        """
+        Index a product, replacing any previous version of it
+
+        sort_terms=False skips keeping the vocabulary sorted; call
+        finalize() once after a bulk load.
+        """
+        if product_id in self._doc_lengths:
+            self.remove(product_id)
+
+        frequencies: Dict[str, float] = defaultdict(float)
+        for field, text in (("name", name), ("description", description), ("brand", brand), ("category", category)):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] += weight
+
+        length = sum(frequencies.values())
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                self._postings[term] = array("i", [product_id])
+                self._frequencies[term] = array("f", [frequency])
+                self._lengths[term] = array("f", [length])
+                if sort_terms:
+                    insort(self._terms, term)
+                continue
+            position = bisect_left(postings, product_id)
+            postings.insert(position, product_id)
+            self._frequencies[term].insert(position, frequency)
+            self._lengths[term].insert(position, length)
+
+        self._doc_terms[product_id] = tuple(frequencies)
+        self._doc_lengths[product_id] = length
+        self._names[product_id] = name or ""
+        self._total_length += length
+        self._max_id = max(self._max_id, product_id)
+
+    def remove(self, product_id: int) -> None:
+        """
+        Drop a product from the index; unknown IDs are ignored
+        """
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            position = bisect_left(postings, product_id)
+            if position < len(postings) and postings[position] == product_id:
+                del postings[position]
+                del self._frequencies[term][position]
+                del self._lengths[term][position]
+            if not postings:
+                del self._postings[term]
+                del self._frequencies[term]
+                del self._lengths[term]
+                term_position = bisect_left(self._terms, term)
+                if term_position < len(self._terms) and self._terms[term_position] == term:
+                    del self._terms[term_position]
+
+        self._total_length -= self._doc_lengths.pop(product_id)
+        self._names.pop(product_id, None)
+
+    def finalize(self) -> None:
+        self._terms = sorted(self._postings)
+
+    def name(self, product_id: int) -> Optional[str]:
+        return self._names.get(product_id)
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        position = bisect_left(self._terms, prefix)
+        matches = []
+        while position < len(self._terms) and self._terms[position].startswith(prefix):
+            matches.append(self._terms[position])
+            position += 1
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            matches = heapq.nlargest(MAX_PREFIX_EXPANSIONS, matches, key=lambda term: len(self._postings[term]))
+        return matches
+
+    def _scores(self, term: str, positions=None) -> np.ndarray:
+        """
+        BM25 scores of the postings of term, or of the postings at positions
+        """
+        documents = len(self._doc_lengths)
+        frequency_in_docs = len(self._postings[term])
+        idf = math.log(1 + (documents - frequency_in_docs + 0.5) / (frequency_in_docs + 0.5))
+        average_length = self._total_length / documents if documents else 1.0
+
+        frequencies = np.frombuffer(self._frequencies[term], dtype=np.float32)
+        lengths = np.frombuffer(self._lengths[term], dtype=np.float32)
+        if positions is not None:
+            frequencies, lengths = frequencies[positions], lengths[positions]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+        return idf * frequencies * (BM25_K1 + 1) / (frequencies + norm)
+
+    def _accumulate(self, terms: List[str]) -> np.ndarray:
+        """
+        Dense array indexed by product ID with the best score over terms
+        """
+        best = np.zeros(self._max_id + 1, dtype=np.float32)
+        for term in terms:
+            ids = np.frombuffer(self._postings[term], dtype=np.int32)
+            best[ids] = np.maximum(best[ids], self._scores(term))
+        return best
+
+    def _group_scores(self, terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every product containing any of terms; the best term counts
+
+        Returns:
+            Tuple of (sorted product IDs, scores)
+        """
+        if len(terms) == 1:
+            return np.frombuffer(self._postings[terms[0]], dtype=np.int32), self._scores(terms[0])
+
+        postings = sum(len(self._postings[term]) for term in terms)
+        if postings * 8 > self._max_id:
+            # Large groups: a dense scratch array is cheaper than sorting
+            best = self._accumulate(terms)
+            ids = np.flatnonzero(best)
+            return ids, best[ids]
+
+        ids = np.concatenate([np.frombuffer(self._postings[term], dtype=np.int32) for term in terms])
+        scores = np.concatenate([self._scores(term) for term in terms])
+        order = np.argsort(ids, kind="stable")
+        ids, scores = ids[order], scores[order]
+        unique_ids, starts = np.unique(ids, return_index=True)
+        return unique_ids, np.maximum.reduceat(scores, starts)
+
+    def _probe_scores(self, terms: List[str], candidates: np.ndarray) -> np.ndarray:
+        """
+        Best score of each candidate for any of terms, 0 where none matches
+
+        Binary searches the postings instead of materializing the whole group.
+        """
+        best = np.zeros(len(candidates), dtype=np.float64)
+        for term in terms:
+            postings = np.frombuffer(self._postings[term], dtype=np.int32)
+            positions = np.searchsorted(postings, candidates)
+            found = positions < len(postings)
+            found[found] = postings[positions[found]] == candidates[found]
+            if found.any():
+                best[found] = np.maximum(best[found], self._scores(term, positions[found]))
+        return best
+
+    def search(
+        self, query: str, limit: int = 10, mode: str = "and", prefix: bool = True
+    ) -> List[Tuple[int, float]]:
+        """
+        Return the best matching product IDs with their BM25 scores
+
+        Args:
+            query: Free-text query, folded like the indexed text
+            limit: Maximum number of results
+            mode: "and" requires every query token, "or" any of them
+            prefix: Treat the last token as a prefix, for search-as-you-type
+
+        Raises:
+            ValueError: If the mode is not supported
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode '{mode}'")
+
+        tokens = tokenize(query)
+        groups: List[List[str]] = []
+        for position, token in enumerate(tokens):
+            if prefix and position == len(tokens) - 1 and len(token) >= MIN_PREFIX_LENGTH:
+                terms = self._expand_prefix(token)
+            else:
+                terms = [token] if token in self._postings else []
+            if terms:
+                groups.append(terms)
+            elif mode == "and":
+                return []
+        if not groups:
+            return []
+
+        if mode == "or" and len(groups) == 1:
+            ids, scores = self._group_scores(groups[0])
+        elif mode == "or":
+            total = self._accumulate(groups[0])
+            for terms in groups[1:]:
+                total += self._accumulate(terms)
+            ids = np.flatnonzero(total)
+            scores = total[ids]
+        else:
+            # Start from the rarest group and probe the others with binary searches
+            groups.sort(key=lambda terms: sum(len(self._postings[term]) for term in terms))
+            ids, scores = self._group_scores(groups[0])
+            for terms in groups[1:]:
+                extra = self._probe_scores(terms, ids)
+                matched = extra > 0
+                ids, scores = ids[matched], scores[matched] + extra[matched]
+                if not len(ids):
+                    return []
+
+        if len(ids) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            ids, scores = ids[top], scores[top]
+        # Ties go to the lower product ID so results are stable
+        order = np.lexsort((ids, -scores))
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Size of the index; byte counts are approximate for the Python containers
+        """
+        postings = sum(len(ids) for ids in self._postings.values())
+        postings_bytes = sum(
+            (ids.buffer_info()[1] + self._frequencies[term].buffer_info()[1] + self._lengths[term].buffer_info()[1]) * 4
+            for term, ids in self._postings.items()
+        )
+        container_bytes = (
+            sum(sys.getsizeof(term) + 3 * sys.getsizeof(ids) for term, ids in self._postings.items())
+            + sys.getsizeof(self._postings) + sys.getsizeof(self._frequencies) + sys.getsizeof(self._lengths)
+            + sys.getsizeof(self._terms)
+            + sum(sys.getsizeof(terms) for terms in self._doc_terms.values()) + sys.getsizeof(self._doc_terms)
+            + sys.getsizeof(self._doc_lengths) + sys.getsizeof(self._names)
+            + sum(sys.getsizeof(name) for name in self._names.values())
+        )
+        return {
+            "documents": len(self._doc_lengths),
+            "terms": len(self._postings),
+            "postings": postings,
+            "postings_bytes": postings_bytes,
+            "approx_total_bytes": postings_bytes + container_bytes,
+        }
+
+
+_index: Optional[InvertedIndex] = None
+_built_at: Optional[float] = None
+_build_seconds: Optional[float] = None
+_rebuild_lock = asyncio.Lock()
+# Held while the served index is read or modified: refreshes modify it in a
+# worker thread, one product at a time, so a search waits for one add at most
+_index_lock = threading.Lock()
+# Products changed while a rebuild is running; re-applied after the swap
+_pending: Optional[Set[int]] = None
+
+
+def _product_rows_query():
+    return (
+        select(Product.id, Product.product_name, Product.description, Brand.brand_name, Category.category_name)
+        .outerjoin(Brand, Brand.id == Product.brand_id)
+        .outerjoin(Category, Category.id == Product.category_id)
+    )
+
+
+def _build_index(rows: List[Tuple[int, str, Optional[str], Optional[str], Optional[str]]]) -> InvertedIndex:
+    index = InvertedIndex()
+    for product_id, name, description, brand, category in rows:
+        index.add(product_id, name, description, brand, category, sort_terms=False)
+    index.finalize()
+    return index
+
+
+def _apply_changes(
+    index: InvertedIndex,
+    rows: List[Tuple[int, str, Optional[str], Optional[str], Optional[str]]],
+    removed: Iterable[int]
+) -> None:
+    for product_id, name, description, brand, category in rows:
+        with _index_lock:
+            index.add(product_id, name, description, brand, category)
+    for product_id in removed:
+        with _index_lock:
+            index.remove(product_id)
+
+
+async def rebuild_search_index() -> Dict[str, Any]:
+    """
+    Build a new index from the products table and swap it in
+
+    Rows are streamed with a server-side cursor, then tokenized and indexed in
+    a worker thread so that the event loop keeps serving requests; searches
+    keep using the previous index until the new one is complete.
+    """
+    global _index, _built_at, _build_seconds, _pending
+
+    async with _rebuild_lock:
+        _pending = set()
+        started = time.perf_counter()
+        try:
+            rows = []
+            async with async_session() as db:
+                result = await db.stream(_product_rows_query().execution_options(yield_per=5000))
+                async for partition in result.partitions():
+                    rows.extend(tuple(row) for row in partition)
+            index = await asyncio.to_thread(_build_index, rows)
+        except Exception:
+            _pending = None
+            raise
+
+        _index, _built_at, _build_seconds = index, time.time(), time.perf_counter() - started
+        changed, _pending = _pending, None
+
+    if changed:
+        await refresh_search_index(changed)
+    logger.info(f"Search index built: {len(index)} products in {_build_seconds:.2f}s")
+    return get_search_index_stats()
+
+
+async def refresh_search_index(product_ids: Iterable[int]) -> None:
+    """
+    Re-index the given products after a committed write
+
+    Products that no longer exist are removed. Inserting into the postings
+    costs time proportional to their length, so the index is updated in a
+    worker thread. Failures are logged rather than raised since the write
+    itself already succeeded; the periodic rebuild repairs the index.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    if _pending is not None:
+        _pending.update(product_ids)
+    index = _index
+    if index is None:
+        return
+
+    try:
+        async with async_session() as db:
+            result = await db.execute(_product_rows_query().where(Product.id.in_(product_ids)))
+            rows = result.all()
+    except Exception as e:
+        logger.warning(f"Could not refresh search index for {len(product_ids)} products: {e}")
+        return
+
+    await asyncio.to_thread(_apply_changes, index, rows, product_ids - {row[0] for row in rows})
+
+
+def instant_search(query: str, limit: int = 10, mode: str = "and") -> Optional[List[Dict[str, Any]]]:
+    """
+    Search-as-you-type over the in-memory index
+
+    Returns:
+        List of matches with id, product_name and score, or None while the
+        index has not been built yet
+
+    Raises:
+        ValueError: If the mode is not supported
+    """
+    index = _index
+    if index is None:
+        return None
+    with _index_lock:
+        return [
+            {"id": product_id, "product_name": index.name(product_id), "score": round(score, 4)}
+            for product_id, score in index.search(query, limit=limit, mode=mode)
+        ]
+
+
+def get_search_index_stats() -> Dict[str, Any]:
+    """
+    Size and freshness of the in-memory search index
+    """
+    index = _index
+    if index is None:
+        return {"ready": False, "rebuilding": _rebuild_lock.locked()}
+    with _index_lock:
+        index_stats = index.stats()
+    return {
+        "ready": True,
+        "rebuilding": _rebuild_lock.locked(),
+        "built_at": _built_at,
+        "build_seconds": round(_build_seconds, 3),
+        **index_stats,
+    }
+
+
+async def run_search_index() -> None:
+    """
+    Build the index at startup and rebuild it every SEARCH_INDEX_REBUILD_SECONDS
+
+    The periodic rebuild picks up writes made through other workers. Runs until
+    cancelled; started from the application startup hook.
+    """
+    while True:
+        try:
+            await rebuild_search_index()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Search index build failed: {e}")
+        await asyncio.sleep(settings.SEARCH_INDEX_REBUILD_SECONDS)
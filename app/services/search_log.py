@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.db.session import async_session
+from app.models.search_history import SearchHistory
+from app.services.trending import add_search_count, write_bucket_counts
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement, kept well below the bind parameter limit (5 per row)
+INSERT_CHUNK_SIZE = 5000
+
+_pending: List[Dict[str, Any]] = []
+_flush_requested = asyncio.Event()
+_flush_lock = asyncio.Lock()
+_stats = {"queued": 0, "written": 0, "dropped": 0, "failed_flushes": 0}
+
+
+def enqueue_search_log(
+    user_id: int,
+    search_query: str,
+    result_count: int,
+    selected_product_id: Optional[int] = None
+) -> None:
+    """
+    Queue a search history entry for the background writer
+
+    Entries are written in batches every SEARCH_LOG_FLUSH_SECONDS, or sooner
+    once SEARCH_LOG_BATCH_SIZE are queued, so a crash loses at most that much
+    history. When the queue is full (the database is down), new entries are
+    dropped rather than growing memory without bound.
+    """
+    if len(_pending) >= settings.SEARCH_LOG_MAX_PENDING:
+        _stats["dropped"] += 1
+        return
+
+    _pending.append({
+        "user_id": user_id,
+        "search_query": search_query,
+        "search_date": datetime.utcnow(),
+        "result_count": result_count,
+        "selected_product_id": selected_product_id,
+    })
+    _stats["queued"] += 1
+    if len(_pending) >= settings.SEARCH_LOG_BATCH_SIZE:
+        _flush_requested.set()
+
+
+def _requeue(batch: List[Dict[str, Any]]) -> None:
+    # Put unwritten entries back in front of the ones queued meanwhile
+    global _pending
+    room = max(settings.SEARCH_LOG_MAX_PENDING - len(_pending), 0)
+    _stats["dropped"] += max(len(batch) - room, 0)
+    _pending = batch[:room] + _pending
+
+
+async def flush_search_log() -> int:
+    """
+    Write all queued entries and their trending counts in one transaction
+
+    On failure the entries are put back at the front of the queue (as far as
+    it has room) and retried with the next flush.
+
+    Returns:
+        Number of entries written
+    """
+    global _pending
+
+    async with _flush_lock:
+        batch, _pending = _pending, []
+        if not batch:
+            return 0
+
+        counts = {}
+        for entry in batch:
+            add_search_count(counts, entry["search_query"], entry["search_date"])
+
+        try:
+            async with async_session() as db:
+                for start in range(0, len(batch), INSERT_CHUNK_SIZE):
+                    await db.execute(insert(SearchHistory).values(batch[start:start + INSERT_CHUNK_SIZE]))
+                await write_bucket_counts(db, counts)
+                await db.commit()
+        except asyncio.CancelledError:
+            _requeue(batch)
+            raise
+        except Exception as e:
+            _stats["failed_flushes"] += 1
+            logger.warning(f"Could not write {len(batch)} search history entries: {e}")
+            _requeue(batch)
+            return 0
+
+        _stats["written"] += len(batch)
+        return len(batch)
+
+
+def get_search_log_stats() -> Dict[str, Any]:
+    """
+    Counters of the search history writer
+    """
+    return {"pending": len(_pending), **_stats}
+
+
+async def run_search_log_writer() -> None:
+    """
+    Flush queued search history every SEARCH_LOG_FLUSH_SECONDS or when a batch fills up
+
+    Runs until cancelled; started from the application startup hook. The
+    shutdown hook flushes what is left after cancelling it.
+    """
+    while True:
+        try:
+            await asyncio.wait_for(_flush_requested.wait(), timeout=settings.SEARCH_LOG_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _flush_requested.clear()
+        try:
+            await flush_search_log()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Search history flush failed: {e}")
@@ -14,6 +14,7 @@ from app.schemas.shipment import (
     ShipmentTrackingEventCreate,
     TrackingResponse
 )
+from app.services.count_cache import invalidate_counts, orders_namespace
 from app.services.notification import create_notification
 
 
@@ -154,6 +155,7 @@ async def update_shipment_status(
     db.add(event)
     
     # Update order status if needed
+    order = None
     if shipment.order_id:
         result = await db.execute(select(Order).where(Order.id == shipment.order_id))
         order = result.scalars().first()
@@ -181,6 +183,8 @@ async def update_shipment_status(
     
     await db.commit()
     await db.refresh(shipment)
+    if order:
+        invalidate_counts(orders_namespace(order.user_id))
     
     return shipment
 
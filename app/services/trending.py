@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, cast, delete, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from app.core.cache import normalize_search_term
+from app.core.config import settings
+from app.db.session import async_session
+from app.models.search_history import SearchHistory
+from app.models.search_trend import SearchTrendBucket
+
+logger = logging.getLogger(__name__)
+
+# Rows per bucket upsert, kept well below the bind parameter limit (4 per row)
+UPSERT_CHUNK_SIZE = 5000
+
+# (normalized query, bucket start, spelling) -> count
+BucketCounts = Dict[Tuple[str, datetime, str], int]
+
+_top: Optional[List[Dict[str, Any]]] = None
+_refreshed_at: Optional[float] = None
+
+
+def bucket_start(moment: datetime) -> datetime:
+    """
+    Start of the hourly bucket containing a moment
+    """
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def add_search_count(counts: BucketCounts, search_query: str, moment: datetime, count: int = 1) -> None:
+    """
+    Add searches of a query at a moment to a set of bucket counts
+
+    Queries differing only in case, accents or spacing are ranked together;
+    each spelling keeps its own count so that compute_trending can display
+    the most searched one.
+    """
+    normalized = normalize_search_term(search_query)
+    if not normalized:
+        return
+    key = (normalized[:255], bucket_start(moment), " ".join(search_query.split())[:255])
+    counts[key] = counts.get(key, 0) + count
+
+
+async def write_bucket_counts(db: AsyncSession, counts: BucketCounts) -> None:
+    """
+    Add bucket counts to the rollup table
+
+    Counters are incremented with multi-row upserts of UPSERT_CHUNK_SIZE rows;
+    the caller commits, so the increments land in the same transaction as the
+    history rows. Rows are written in key order, so concurrent writers lock
+    shared buckets in the same order and cannot deadlock.
+    """
+    values = [
+        {"search_query": key, "bucket_start": start, "display_query": display, "search_count": count}
+        for (key, start, display), count in sorted(counts.items(), key=lambda item: item[0])
+    ]
+    for chunk_start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        statement = insert(SearchTrendBucket).values(values[chunk_start:chunk_start + UPSERT_CHUNK_SIZE])
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[
+                SearchTrendBucket.search_query, SearchTrendBucket.bucket_start, SearchTrendBucket.display_query
+            ],
+            set_={"search_count": SearchTrendBucket.search_count + statement.excluded.search_count},
+        ))
+
+
+async def compute_trending(db: AsyncSession, limit: int) -> List[Dict[str, Any]]:
+    """
+    Rank queries by decayed search count over the trending window
+
+    Each hourly bucket counts with weight 0.5 ** (age / TRENDING_HALF_LIFE_HOURS),
+    so recent searches outrank equally frequent older ones. Reads at most
+    TRENDING_WINDOW_HOURS buckets per query and spelling from the rollup
+    table. The spelling searched most often in the window is displayed (the
+    lowest one on ties).
+    """
+    now = datetime.utcnow()
+    cutoff = bucket_start(now - timedelta(hours=settings.TRENDING_WINDOW_HOURS))
+    age_hours = func.extract("epoch", cast(literal(now), DateTime) - SearchTrendBucket.bucket_start) / 3600
+    spellings = (
+        select(
+            SearchTrendBucket.search_query,
+            SearchTrendBucket.display_query,
+            func.sum(SearchTrendBucket.search_count).label("count"),
+            func.sum(
+                SearchTrendBucket.search_count * func.power(0.5, age_hours / settings.TRENDING_HALF_LIFE_HOURS)
+            ).label("score"),
+        )
+        .where(SearchTrendBucket.bucket_start >= cutoff)
+        .group_by(SearchTrendBucket.search_query, SearchTrendBucket.display_query)
+        .subquery()
+    )
+    score = func.sum(spellings.c.score).label("score")
+    display_query = func.array_agg(
+        aggregate_order_by(spellings.c.display_query, spellings.c.count.desc(), spellings.c.display_query)
+    )[1].label("display_query")
+
+    result = await db.execute(
+        select(spellings.c.search_query, display_query, func.sum(spellings.c.count).label("count"), score)
+        .group_by(spellings.c.search_query)
+        .order_by(score.desc(), spellings.c.search_query)
+        .limit(limit)
+    )
+    return [
+        {"query": row.display_query, "count": int(row.count), "score": round(float(row.score), 3)}
+        for row in result
+    ]
+
+
+async def get_trending(db: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Top trending queries, served from memory when the cached list is fresh
+    """
+    fresh = _refreshed_at is not None and time.monotonic() - _refreshed_at < settings.TRENDING_REFRESH_SECONDS
+    if fresh and limit <= settings.TRENDING_TOP_N:
+        return _top[:limit]
+    if limit > settings.TRENDING_TOP_N:
+        return await compute_trending(db, limit)
+    _store_top(await compute_trending(db, settings.TRENDING_TOP_N))
+    return _top[:limit]
+
+
+def _store_top(top: List[Dict[str, Any]]) -> None:
+    global _top, _refreshed_at
+    _top, _refreshed_at = top, time.monotonic()
+
+
+async def prune_trend_buckets(db: AsyncSession) -> int:
+    """
+    Delete buckets that have left the trending window
+
+    Returns:
+        Number of buckets deleted
+    """
+    cutoff = bucket_start(datetime.utcnow() - timedelta(hours=settings.TRENDING_WINDOW_HOURS))
+    result = await db.execute(delete(SearchTrendBucket).where(SearchTrendBucket.bucket_start < cutoff))
+    await db.commit()
+    return result.rowcount
+
+
+async def backfill_trend_buckets(db: AsyncSession, since: datetime, batch_size: int = 5000) -> int:
+    """
+    Rebuild rollup buckets from search history recorded since a moment
+
+    Existing buckets in that range are replaced, so the backfill can be rerun.
+
+    Returns:
+        Number of buckets written
+    """
+    since = bucket_start(since)
+    hour = func.date_trunc("hour", SearchHistory.search_date).label("hour")
+    result = await db.stream(
+        select(SearchHistory.search_query, hour, func.count(SearchHistory.id))
+        .where(SearchHistory.search_date >= since)
+        .group_by(SearchHistory.search_query, hour)
+        .execution_options(yield_per=batch_size)
+    )
+    counts: BucketCounts = {}
+    async for search_query, moment, count in result:
+        add_search_count(counts, search_query, moment, count)
+
+    await db.execute(delete(SearchTrendBucket).where(SearchTrendBucket.bucket_start >= since))
+    await write_bucket_counts(db, counts)
+    await db.commit()
+    return len(counts)
+
+
+async def run_search_trends() -> None:
+    """
+    Refresh the in-memory trending list every TRENDING_REFRESH_SECONDS and drop
+    expired buckets
+
+    Runs until cancelled; started from the application startup hook.
+    """
+    while True:
+        try:
+            async with async_session() as db:
+                _store_top(await compute_trending(db, settings.TRENDING_TOP_N))
+                await prune_trend_buckets(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Trending searches refresh failed: {e}")
+        await asyncio.sleep(settings.TRENDING_REFRESH_SECONDS)
+
@@ -0,0 +1,140 @@
+"""
+Latency benchmark for product search: ILIKE scans versus the tsvector/GIN index,
+and the trigram fallback used for misspelled terms
+
+Usage:
+    python -m benchmarks.product_full_text_search --seed 1000000
+    python -m benchmarks.product_full_text_search            # reuse existing rows
+
+--seed inserts synthetic products (barcode prefix "bench-") whose names and
+descriptions are drawn from a small vocabulary, and removes them again at the
+end unless --keep is given. Each search runs the count and the first page of
+20 results, as search_products does.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import or_, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.product import Product
+from app.services.full_text import (
+    product_fuzzy_condition,
+    product_fuzzy_rank,
+    product_search_condition,
+    product_search_rank,
+    set_fuzzy_threshold,
+)
+
+TERMS = ["giày", "áo thun", "ao thun", "nike chạy bộ", "quần jean xanh", "không tồn tại", "adidsa", "quan jaen"]
+PAGE_SIZE = 20
+ROUNDS = 5
+
+
+async def seed(db: AsyncSession, rows: int) -> None:
+    await db.execute(text(
+        "INSERT INTO products (barcode, product_name, description, price, quantity, created_at, updated_at) "
+        "SELECT 'bench-' || g, "
+        "(ARRAY['Giày', 'Áo thun', 'Quần jean', 'Túi xách', 'Mũ'])[1 + g % 5] || ' ' || "
+        "(ARRAY['Nike', 'Adidas', 'Puma', 'Biti''s', 'Uniqlo', 'Zara'])[1 + g % 6] || ' ' || "
+        "(ARRAY['xanh', 'đỏ', 'đen', 'trắng', 'vàng', 'xám', 'hồng'])[1 + g % 7] || ' ' || g, "
+        "(ARRAY['Chạy bộ', 'Đi làm', 'Dạo phố', 'Thể thao'])[1 + g % 4] || ' chất liệu thoáng mát', "
+        "(random() * 10000000)::int, 10, now(), now() "
+        "FROM generate_series(1, :rows) AS g"
+    ), {"rows": rows})
+    await db.commit()
+    await db.execute(text("ANALYZE products"))
+
+
+async def cleanup(db: AsyncSession) -> None:
+    await db.execute(text("DELETE FROM products WHERE barcode LIKE 'bench-%'"))
+    await db.commit()
+
+
+async def ilike_search(db: AsyncSession, term: str) -> None:
+    """
+    The previous implementation of search_products
+    """
+    condition = or_(
+        Product.product_name.ilike(f"%{term}%"),
+        Product.description.ilike(f"%{term}%"),
+        Product.barcode == term,
+    )
+    await db.scalar(select(func.count()).select_from(select(Product.id).where(condition).subquery()))
+    await db.execute(
+        select(Product.id)
+        .where(condition)
+        .order_by(Product.product_name.ilike(f"{term}%").desc(), Product.id)
+        .limit(PAGE_SIZE)
+    )
+
+
+async def full_text_search(db: AsyncSession, term: str) -> None:
+    condition = product_search_condition(term)
+    await db.scalar(select(func.count()).select_from(select(Product.id).where(condition).subquery()))
+    await db.execute(
+        select(Product.id)
+        .where(condition)
+        .order_by(product_search_rank(term).desc(), Product.id)
+        .limit(PAGE_SIZE)
+    )
+
+
+async def fuzzy_search(db: AsyncSession, term: str) -> None:
+    condition = or_(product_search_condition(term), product_fuzzy_condition(term))
+    await set_fuzzy_threshold(db, settings.SEARCH_FUZZY_SIMILARITY_THRESHOLD)
+    await db.scalar(select(func.count()).select_from(select(Product.id).where(condition).subquery()))
+    await db.execute(
+        select(Product.id)
+        .where(condition)
+        .order_by(product_search_condition(term).desc(), product_fuzzy_rank(term).desc(), Product.id)
+        .limit(PAGE_SIZE)
+    )
+
+
+async def timed(coro_factory) -> float:
+    elapsed = 0.0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await coro_factory()
+        elapsed += time.perf_counter() - start
+    return elapsed / ROUNDS * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="Number of synthetic products to insert first")
+    parser.add_argument("--keep", action="store_true", help="Keep seeded rows after the run")
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with session_factory() as db:
+        if args.seed:
+            print(f"Seeding {args.seed} products...")
+            await seed(db, args.seed)
+
+        try:
+            total = await db.scalar(select(func.count(Product.id)))
+            print(f"{total} products")
+            print(f"{'term':>16} {'ILIKE ms':>10} {'full-text ms':>13} {'fuzzy ms':>10}")
+            for term in TERMS:
+                ilike_ms = await timed(lambda: ilike_search(db, term))
+                full_text_ms = await timed(lambda: full_text_search(db, term))
+                fuzzy_ms = await timed(lambda: fuzzy_search(db, term))
+                print(f"{term:>16} {ilike_ms:>10.2f} {full_text_ms:>13.2f} {fuzzy_ms:>10.2f}")
+        finally:
+            if args.seed and not args.keep:
+                await cleanup(db)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Query-count benchmark for product list hydration
+
+Compares the old per-product loop (one variants query and one images query
+per product) with the batched hydration layer in app.services.hydration.
+
+Usage:
+    python -m benchmarks.product_hydration_queries
+
+Runs against the database configured in .env and only reads data.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.product import Product, ProductVariant, ProductImage
+from app.services.hydration import hydrate_products, serialize_image, serialize_product, serialize_variant
+
+PAGE_SIZES = [10, 50, 100]
+ROUNDS = 5
+
+
+async def legacy_hydrate(db: AsyncSession, products: List[Product]) -> List[Dict[str, Any]]:
+    """
+    Previous behaviour: two extra queries per product
+    """
+    product_list = []
+    for product in products:
+        variants = await db.execute(select(ProductVariant).where(ProductVariant.product_id == product.id))
+        images = await db.execute(select(ProductImage).where(ProductImage.product_id == product.id))
+        product_list.append(serialize_product(
+            product,
+            variants=[serialize_variant(v) for v in variants.scalars().all()],
+            images=[serialize_image(i) for i in images.scalars().all()]
+        ))
+    return product_list
+
+
+async def main() -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    query_count = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        nonlocal query_count
+        query_count += 1
+
+    print(f"{'page size':>10} {'mode':>8} {'queries':>8} {'avg ms':>10}")
+    async with session_factory() as db:
+        for page_size in PAGE_SIZES:
+            result = await db.execute(select(Product).order_by(Product.id).limit(page_size))
+            products = result.scalars().all()
+            if len(products) < page_size:
+                print(f"WARNING: only {len(products)} products available for page size {page_size}")
+
+            for mode, hydrate in (("legacy", legacy_hydrate), ("batched", hydrate_products)):
+                elapsed = 0.0
+                queries = 0
+                for _ in range(ROUNDS):
+                    query_count = 0
+                    start = time.perf_counter()
+                    await hydrate(db, products)
+                    elapsed += time.perf_counter() - start
+                    queries = query_count
+                print(f"{page_size:>10} {mode:>8} {queries:>8} {elapsed / ROUNDS * 1000:>10.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Latency benchmark for offset versus keyset pagination of GET /products
+
+Usage:
+    python -m benchmarks.product_keyset_pagination --seed 1000000
+    python -m benchmarks.product_keyset_pagination            # reuse existing rows
+
+--seed inserts synthetic products (barcode prefix "bench-") with
+generate_series and removes them again at the end unless --keep is given.
+Page 10,000 at 100 items per page needs a catalog of at least 1M rows.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.pagination import encode_cursor
+from app.models.product import Product
+from app.services.product import PRODUCT_SORT_KEYS, _order_products_query, get_products, get_products_by_cursor
+
+PAGES = [1, 100, 10_000]
+PAGE_SIZE = 100
+ROUNDS = 5
+
+
+async def seed(db: AsyncSession, rows: int) -> None:
+    await db.execute(text(
+        "INSERT INTO products (barcode, product_name, description, price, quantity, created_at, updated_at) "
+        "SELECT 'bench-' || g, 'Benchmark product ' || g, 'Synthetic row', (random() * 10000000)::int, 10, now(), now() "
+        "FROM generate_series(1, :rows) AS g"
+    ), {"rows": rows})
+    await db.commit()
+    await db.execute(text("ANALYZE products"))
+
+
+async def cleanup(db: AsyncSession) -> None:
+    await db.execute(text("DELETE FROM products WHERE barcode LIKE 'bench-%'"))
+    await db.commit()
+
+
+async def cursor_for_page(db: AsyncSession, page: int, sort_by: str) -> str:
+    """
+    Build the cursor a client would hold after reading page - 1 (not timed)
+    """
+    if page == 1:
+        return None
+    query = _order_products_query(select(Product), sort_by, "asc")
+    result = await db.execute(query.offset((page - 1) * PAGE_SIZE - 1).limit(1))
+    boundary = result.scalars().first()
+    if boundary is None:
+        return None
+    key = boundary.id if sort_by == "id" else getattr(boundary, "product_name" if sort_by == "name" else "price") or 0
+    return encode_cursor({"sort_by": sort_by, "sort_order": "asc", "key": key, "id": boundary.id})
+
+
+async def timed(coro_factory) -> float:
+    elapsed = 0.0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await coro_factory()
+        elapsed += time.perf_counter() - start
+    return elapsed / ROUNDS * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="Number of synthetic products to insert first")
+    parser.add_argument("--keep", action="store_true", help="Keep seeded rows after the run")
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with session_factory() as db:
+        if args.seed:
+            print(f"Seeding {args.seed} products...")
+            await seed(db, args.seed)
+
+        try:
+            print(f"{'sort':>6} {'page':>7} {'offset+count ms':>16} {'keyset ms':>10}")
+            for sort_by in PRODUCT_SORT_KEYS:
+                for page in PAGES:
+                    cursor = await cursor_for_page(db, page, sort_by)
+                    if page > 1 and cursor is None:
+                        print(f"{sort_by:>6} {page:>7} {'(catalog too small)':>27}")
+                        continue
+
+                    offset_ms = await timed(lambda: get_products(
+                        db, skip=(page - 1) * PAGE_SIZE, limit=PAGE_SIZE, sort_by=sort_by
+                    ))
+                    keyset_ms = await timed(lambda: get_products_by_cursor(
+                        db, cursor=cursor, limit=PAGE_SIZE, sort_by=sort_by
+                    ))
+                    print(f"{sort_by:>6} {page:>7} {offset_ms:>16.2f} {keyset_ms:>10.2f}")
+        finally:
+            if args.seed and not args.keep:
+                await cleanup(db)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
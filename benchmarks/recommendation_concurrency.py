@@ -0,0 +1,160 @@
+"""
+Latency of an unrelated endpoint while /recommendation/suggest is under load,
+with suggestion scoring inline on the event loop versus in the scoring pool
+
+Usage:
+    python -m benchmarks.recommendation_concurrency
+    python -m benchmarks.recommendation_concurrency --products 300000 --clients 32 --seconds 10
+
+A synthetic model is served by a small app with the suggest endpoint of
+app.routers.v1.recommendation (same service call and 503 handling) and a
+/ping endpoint that does no work, so the rest of the application (database,
+Redis) is not needed. Requests go through the ASGI interface in one event loop,
+which is what a single worker runs, without HTTP parsing or a separate load
+generator competing for the CPU: --clients coroutines post suggestions back
+to back while one more pings on a fixed schedule. Ping latency counts from the
+scheduled send time, so time spent waiting for a blocked event loop is
+included, as it would be for a request waiting on the socket. Reported are
+ping p50/p99 and the suggest throughput, latency and 503 share per mode.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, HTTPException, status
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.core.config import settings
+from app.services import recommendation
+from app.services.recommendation import build_id_lookup, prepare_product_matrix, score_suggestions
+
+PING_INTERVAL = 0.005
+
+
+def synthetic_bundle(rng: np.random.Generator, products: int, vocabulary: int, terms: int):
+    # Skewed word choice, like product texts: a few words appear everywhere
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    choices = (vocabulary * rng.random((products, terms)) ** 3).astype(np.int64)
+    texts = [" ".join(row) for row in words[choices]]
+    vectorizer = TfidfVectorizer(dtype=np.float32).fit(texts)
+    product_matrix, term_matrix = prepare_product_matrix(vectorizer.transform(texts))
+    sorted_product_ids, sorted_product_rows = build_id_lookup(np.arange(1, products + 1))
+    bundle = {
+        "version": "benchmark",
+        "vectorizer": vectorizer,
+        "product_tfidf_matrix": product_matrix,
+        "product_term_index": term_matrix,
+        "product_names": np.array([f"Product {i}" for i in range(1, products + 1)], dtype=object),
+        "sorted_product_ids": sorted_product_ids,
+        "sorted_product_rows": sorted_product_rows,
+        "memory_mapped": False,
+        "trained_at": None,
+        "loaded_at": time.time(),
+        "load_seconds": 0.0,
+    }
+    return bundle, words
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/suggest")
+    async def suggest(payload: dict):
+        components = recommendation.get_model_components()
+        suggestions = await score_suggestions(components, [(payload["recent_searches"], payload["cart_item_ids"])])
+        if suggestions is None:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+        return {"suggestions": suggestions[0]}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run_load(app: FastAPI, payloads, clients: int, seconds: float):
+    suggest_latencies, rejected, ping_latencies = [], 0, []
+
+    async def suggest_client(client: httpx.AsyncClient, offset: int) -> None:
+        nonlocal rejected
+        position = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post("/suggest", json=payloads[position % len(payloads)])
+            if response.status_code == 503:
+                rejected += 1
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            else:
+                suggest_latencies.append(time.perf_counter() - started)
+            position += clients
+
+    async def ping_client(client: httpx.AsyncClient) -> None:
+        scheduled = time.perf_counter()
+        while scheduled < deadline:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await client.get("/ping")
+            ping_latencies.append(time.perf_counter() - scheduled)
+            scheduled += PING_INTERVAL
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(ping_client(client), *(suggest_client(client, i) for i in range(clients)))
+
+    ping_ms = np.array(ping_latencies) * 1000
+    suggest_ms = np.array(suggest_latencies) * 1000
+    return {
+        "ping_p50": np.percentile(ping_ms, 50),
+        "ping_p99": np.percentile(ping_ms, 99),
+        "suggest_per_s": len(suggest_ms) / seconds,
+        "suggest_p99": np.percentile(suggest_ms, 99) if len(suggest_ms) else float("nan"),
+        "rejected": rejected / max(1, rejected + len(suggest_ms)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--terms", type=int, default=15, help="Words per product text")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent suggest clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each mode")
+    parser.add_argument("--threads", type=int, nargs="+", default=[0, 1, 2, 4], help="Scoring threads per mode (0 = inline)")
+    parser.add_argument("--queue-size", type=int, default=settings.RECOMMENDATION_SCORING_QUEUE_SIZE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    started = time.perf_counter()
+    bundle, words = synthetic_bundle(rng, args.products, args.vocabulary, args.terms)
+    recommendation._swap_bundle(bundle)
+    print(f"Built a {args.products} product model in {time.perf_counter() - started:.1f}s")
+
+    # Searches of common words and carts of a few products: the heavy end of
+    # real contexts, since common terms have the longest posting lists
+    payloads = [
+        {
+            "recent_searches": [" ".join(words[(args.vocabulary * rng.random(3) ** 3).astype(np.int64)])],
+            "cart_item_ids": [str(product_id) for product_id in rng.integers(1, args.products + 1, 3)],
+        }
+        for _ in range(500)
+    ]
+
+    app = build_app()
+    settings.RECOMMENDATION_SCORING_QUEUE_SIZE = args.queue_size
+    print(f"{'threads':>8} {'ping p50':>9} {'ping p99':>9} {'suggest/s':>10} {'suggest p99':>12} {'503':>6}")
+    for threads in args.threads:
+        settings.RECOMMENDATION_SCORING_THREADS = threads
+        recommendation.shutdown_scoring_executor()
+        result = asyncio.run(run_load(app, payloads, args.clients, args.seconds))
+        print(
+            f"{threads or 'inline':>8} {result['ping_p50']:>8.1f}ms {result['ping_p99']:>8.1f}ms "
+            f"{result['suggest_per_s']:>10.0f} {result['suggest_p99']:>10.1f}ms {result['rejected']:>6.1%}"
+        )
+    recommendation.shutdown_scoring_executor()
+
+
+if __name__ == "__main__":
+    main()
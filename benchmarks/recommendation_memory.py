@@ -0,0 +1,170 @@
+"""
+Memory per worker of the pickled versus memory-mapped recommender artifacts
+
+Usage:
+    python -m benchmarks.recommendation_memory
+    python -m benchmarks.recommendation_memory --products 1000000 --workers 8
+
+Builds a synthetic model (TfidfVectorizer over random product texts), saves it
+both as the pickled artifacts (joblib matrix, pandas product_info_df) and as
+array artifacts, then starts --workers processes per format that each load the
+model, serve --queries suggestions and touch every matrix page, as a long
+running worker eventually does. All workers of a format are measured while they
+are alive at the same time, from /proc/self/smaps_rollup (Linux only):
+
+    RSS      resident pages, counting shared file pages in every worker
+    PSS      shared pages divided by the number of processes sharing them
+    private  pages only this worker has; what each additional worker costs
+
+The model columns subtract the same figures measured right after imports.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.services.model_artifacts import export_array_artifacts
+from app.services.recommendation import (
+    MATRIX_FILE,
+    MODEL_VERSIONS_DIR,
+    PRODUCT_INFO_FILE,
+    VECTORIZER_FILE,
+    load_pickled_artifacts,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json, sys
+import numpy as np
+from app.services import recommendation
+
+def memory():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+import joblib, scipy.sparse, sklearn.feature_extraction.text
+before = memory()
+bundle = recommendation.load_model_bundle(sys.argv[1])
+rng = np.random.default_rng()
+words = [f"w{i}" for i in rng.integers(0, int(sys.argv[3]), 3 * int(sys.argv[2]))]
+contexts = [([" ".join(words[i * 3:i * 3 + 3])], [str(j) for j in rng.integers(1, 1000, 2)]) for i in range(int(sys.argv[2]))]
+recommendation.suggest_for_contexts(bundle, contexts)
+for matrix in (bundle["product_tfidf_matrix"], bundle["product_term_index"]):
+    matrix.data.sum(), matrix.indices.sum(), matrix.indptr.sum()
+after = memory()
+print(json.dumps({"before": before, "after": after}), flush=True)
+sys.stdin.read()
+"""
+
+
+def build_model(directory: str, products: int, vocabulary: int, rng: np.random.Generator) -> None:
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    # Skewed term choice (cubed uniform samples), 8 terms per product name
+    texts = [" ".join(row) for row in words[(vocabulary * rng.random((products, 8)) ** 3).astype(np.int64)]]
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(texts)
+
+    pickled = os.path.join(directory, MODEL_VERSIONS_DIR, "pickled")
+    arrays = os.path.join(directory, MODEL_VERSIONS_DIR, "arrays")
+    os.makedirs(pickled)
+    os.makedirs(arrays)
+    for path in (pickled, arrays):
+        joblib.dump(vectorizer, os.path.join(path, VECTORIZER_FILE))
+    joblib.dump(matrix, os.path.join(pickled, MATRIX_FILE))
+    pd.DataFrame({
+        "id": np.arange(1, products + 1),
+        "product_name": texts,
+        "price": rng.integers(1000, 1000000, products),
+        "description": [f"Mô tả sản phẩm {text}" for text in texts],
+    }).to_pickle(os.path.join(pickled, PRODUCT_INFO_FILE))
+
+    artifacts = load_pickled_artifacts(pickled)
+    export_array_artifacts(
+        arrays,
+        artifacts["product_tfidf_matrix"],
+        artifacts["product_term_index"],
+        artifacts["sorted_product_ids"],
+        artifacts["sorted_product_rows"],
+        artifacts["product_names"],
+    )
+
+
+def measure(directory: str, version: str, workers: int, queries: int, vocabulary: int) -> List[Dict]:
+    environment = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER, version, str(queries), str(vocabulary)],
+            cwd=directory, env=environment, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    # Read the lines of all workers before letting any of them exit, so that
+    # PSS reflects pages shared by every worker
+    results = []
+    for process in processes:
+        while True:
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"Worker for {version} exited without reporting")
+            if line.startswith("{"):
+                results.append(json.loads(line))
+                break
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=300000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        build_model(directory, args.products, args.vocabulary, np.random.default_rng(42))
+        print(f"{args.products} products, {args.workers} workers; MB per worker (model = after load - after imports)")
+        print(f"{'format':>8} {'RSS':>8} {'PSS':>8} {'private':>8} {'model RSS':>10} {'model PSS':>10} {'model priv':>11}")
+        totals = {}
+        for version in ("pickled", "arrays"):
+            results = measure(directory, version, args.workers, args.queries, args.vocabulary)
+            mean = {
+                key: np.mean([result["after"][key] for result in results]) for key in ("rss", "pss", "private")
+            }
+            model = {
+                key: np.mean([result["after"][key] - result["before"][key] for result in results])
+                for key in ("rss", "pss", "private")
+            }
+            totals[version] = model["pss"] * args.workers
+            print(
+                f"{version:>8} {mean['rss']:>8.1f} {mean['pss']:>8.1f} {mean['private']:>8.1f} "
+                f"{model['rss']:>10.1f} {model['pss']:>10.1f} {model['private']:>11.1f}"
+            )
+        print(
+            f"model memory of all {args.workers} workers (sum of PSS): pickled {totals['pickled']:.1f} MB, "
+            f"arrays {totals['arrays']:.1f} MB"
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency benchmark for /recommendation/suggest scoring: the previous dense
+cosine_similarity + full argsort path, the sparse top-k path, and batch
+scoring as used by /recommendation/suggest/batch (per context)
+
+Usage:
+    python -m benchmarks.recommendation_suggest
+    python -m benchmarks.recommendation_suggest --sizes 10000 100000 --vocabulary 20000
+
+Product matrices are synthetic: each product gets --terms distinct terms drawn
+from a skewed distribution over the vocabulary, like TF-IDF rows of short
+product texts. Queries are built from the rows of a few random products, as a
+cart would be.
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.services.recommendation import prepare_product_matrix, top_k_rows, top_k_rows_batch
+
+TOP_N = 10
+QUERIES = 50
+
+
+def synthetic_matrix(rng: np.random.Generator, products: int, vocabulary: int, terms: int) -> csr_matrix:
+    # Cubing uniform samples skews term choice towards low term ids
+    indices = (vocabulary * rng.random(products * terms) ** 3).astype(np.int32)
+    indptr = np.arange(0, products * terms + 1, terms)
+    matrix = csr_matrix((rng.random(products * terms), indices, indptr), shape=(products, vocabulary))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def dense_top_k(query: csr_matrix, matrix: csr_matrix) -> np.ndarray:
+    """
+    The previous implementation: densified query, cosine_similarity and argsort
+    """
+    similarities = cosine_similarity(query.toarray(), matrix)
+    return similarities[0].argsort()[-TOP_N:][::-1]
+
+
+def timed(function, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--terms", type=int, default=15, help="Terms per product")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'products':>10} {'dense ms':>10} {'sparse ms':>10} {'batch ms':>10} {'top-k agree':>12}")
+    for size in args.sizes:
+        matrix = synthetic_matrix(rng, size, args.vocabulary, args.terms)
+        product_matrix, term_matrix = prepare_product_matrix(matrix)
+        queries = [
+            csr_matrix(product_matrix[rng.integers(0, size, 3)].mean(axis=0))
+            for _ in range(QUERIES)
+        ]
+
+        dense_ms = timed(lambda query: dense_top_k(query, product_matrix), queries)
+        sparse_ms = timed(lambda query: top_k_rows(query, term_matrix, TOP_N), queries)
+        batch_ms = timed(lambda stacked: top_k_rows_batch(stacked, term_matrix, TOP_N), [vstack(queries).tocsr()]) / len(queries)
+        agree = np.mean([
+            len(set(dense_top_k(query, product_matrix)) & set(top_k_rows(query, term_matrix, TOP_N))) / TOP_N
+            for query in queries[:10]
+        ])
+        print(f"{size:>10} {dense_ms:>10.2f} {sparse_ms:>10.2f} {batch_ms:>10.2f} {agree:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
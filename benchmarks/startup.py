@@ -0,0 +1,94 @@
+"""
+Import-time profile and startup-time benchmark of the application
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --module app.routers --runs 10 --top 30
+    python -m benchmarks.startup --max-seconds 1.5   # non-zero exit above budget, for CI
+
+Each run imports --module in a fresh interpreter, so nothing is cached between
+runs except the OS page cache and compiled .pyc files. The profile comes from
+python -X importtime: self and cumulative import time per module, slowest
+first. With --load-model the time to load the current recommendation model
+version (which the server does in the background after startup) is measured
+too.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed_import(module: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+    return time.perf_counter() - started
+
+
+def import_profile(module: str) -> List[Tuple[int, int, str]]:
+    """
+    (self us, cumulative us, module) for every module imported by module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module imported at startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules shown")
+    parser.add_argument("--load-model", action="store_true", help="Also time loading the recommendation model")
+    parser.add_argument("--max-seconds", type=float, help="Fail if the median import time is above this")
+    args = parser.parse_args()
+
+    # Warm-up run compiles .pyc files so that runs measure imports only
+    timed_import(args.module)
+    durations = [timed_import(args.module) for _ in range(args.runs)]
+    median = statistics.median(durations)
+    print(f"import {args.module}: median {median * 1000:.0f} ms, min {min(durations) * 1000:.0f} ms over {args.runs} runs")
+
+    profile = import_profile(args.module)
+    print(f"\n{'self ms':>9} {'cumul ms':>9}  module (top {args.top} by self time)")
+    for self_us, cumulative_us, name in sorted(profile, reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {name}")
+
+    packages = {}
+    for self_us, _, name in profile:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\nSelf ms per top-level package (top {args.top}):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{self_us / 1000:>9.1f}  {package}")
+
+    if args.load_model:
+        script = (
+            "import time; from app.services.recommendation import load_model_bundle, read_current_version; "
+            "t = time.perf_counter(); load_model_bundle(read_current_version()); "
+            "print(f'{time.perf_counter() - t:.3f}')"
+        )
+        result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True, capture_output=True, text=True)
+        print(f"\nrecommendation model load (background, after startup): {float(result.stdout.split()[-1]) * 1000:.0f} ms")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"\nFAIL: median import time {median:.2f}s is above the {args.max_seconds:.2f}s budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())